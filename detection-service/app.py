@@ -13,9 +13,12 @@ import json
 import threading
 import queue
 import base64
+from collections import OrderedDict
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import cv2
 import numpy as np
 import yaml
@@ -29,6 +32,24 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'engines'))
 
 from modules.yolo_detector import YOLODetector
 
+# 可选: orjson 序列化逐帧检测响应与统计信息，未安装时回退到标准库 json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _ojson(data, status: int = 200) -> Response:
+    """直接返回预序列化的 JSON 响应，替代热点接口上的 jsonify"""
+    if ORJSON_AVAILABLE:
+        body = orjson.dumps(data, default=str,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        body = json.dumps(data, ensure_ascii=False, default=str)
+    return Response(body, status=status, mimetype='application/json')
+
 # 多GPU处理功能已下线，保留占位符以兼容旧代码
 MultiGPUProcessor = None
 MULTI_GPU_AVAILABLE = False
@@ -65,6 +86,24 @@ class DetectionService:
         # 打印到日志，启动时即可确认地址是否正确
         self.logger.info(f"分析服务 URL: {self.analytics_service_url}")
         
+        # 结果回传: 固定线程池 + keep-alive 连接池，替代每条结果新建线程与 TCP 连接
+        send_workers = self.config.get('processing', {}).get('result_send_workers', 4)
+        self.result_executor = ThreadPoolExecutor(max_workers=send_workers, thread_name_prefix='result-send')
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=send_workers, max_retries=0)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+        
+        # 近重复帧去重: stream_id -> (上一帧 dHash, 上一帧结果)
+        self.dedup_threshold = self.config.get('processing', {}).get('dedup_threshold', 0)
+        self._last_frames: Dict[str, tuple] = {}
+        # 共享内存帧: 默认关闭，仅 attach 流服务帧槽池前缀的段；已 attach 的段按 LRU 保留有限个
+        processing_cfg = self.config.get('processing', {})
+        self.accept_shm_frames = bool(processing_cfg.get('accept_shm_frames', False))
+        self.shm_name_prefix = processing_cfg.get('shm_name_prefix', 'shipin_frames_')
+        self._shm_segments: "OrderedDict[str, Any]" = OrderedDict()
+        self._shm_lock = threading.Lock()
+        
         # 统计信息
         self.stats = {
             'start_time': time.time(),
@@ -73,7 +112,8 @@ class DetectionService:
             'failed_detections': 0,
             'average_inference_time': 0.0,
             'gpu_utilization': 0.0,
-            'queue_size': 0
+            'queue_size': 0,
+            'deduplicated_frames': 0
         }
         
         # -------- 先检测 algorithms.yml 是否已启用 object 引擎 --------
@@ -106,7 +146,9 @@ class DetectionService:
                 'confidence_threshold': 0.5,
                 'iou_threshold': 0.45,
                 'device': 'auto',  # 'auto', 'cpu', 'cuda:0'
-                'batch_size': 1
+                'batch_size': 1,
+                'imgsz': 640,  # 推理前预缩放的长边尺寸，0 表示不缩放
+                'export_format': None  # None / 'engine'(TensorRT) / 'onnx'，首次启动时导出并复用
             },
             'gpu': {
                 'enabled': True,
@@ -119,7 +161,10 @@ class DetectionService:
                 'queue_size': 100,
                 'batch_processing': True,
                 'max_batch_size': 8,
-                'batch_timeout': 0.1
+                'batch_timeout': 0.1,
+                'dedup_threshold': 0,  # dHash 汉明距离小于该值时复用上一帧结果，0 表示关闭
+                'accept_shm_frames': False,  # 接受同机流服务以共享内存传递的帧（application/x-shm-frame）
+                'shm_name_prefix': 'shipin_frames_'  # 只 attach 该前缀的共享内存段（流服务帧槽池的命名前缀）
             },
             'logging': {
                 'level': 'INFO',
@@ -189,7 +234,9 @@ class DetectionService:
             self.yolo_detector = YOLODetector(
                 model_path=model_config.get('model_path', 'models/yolov8n.pt'),
                 confidence_threshold=model_config.get('confidence_threshold', 0.5),
-                device=model_config.get('device', 'auto')
+                device=model_config.get('device', 'auto'),
+                imgsz=model_config.get('imgsz') or None,
+                export_format=model_config.get('export_format')
             )
             
             # 多GPUProcessor 功能已移除；始终使用单模型推理
@@ -207,7 +254,7 @@ class DetectionService:
         @self.app.route('/api/health', methods=['GET'])
         def health_check():
             """健康检查"""
-            return jsonify({
+            return _ojson({
                 'status': 'healthy',
                 'service': 'detection',
                 'timestamp': time.time(),
@@ -221,20 +268,44 @@ class DetectionService:
         def detect_frame():
             """单帧检测"""
             try:
-                data = request.get_json()
-                
-                # 验证请求数据
-                if 'image' not in data:
-                    return jsonify({'error': 'Missing image data'}), 400
+                # 优先接收共享内存帧或原始JPEG字节（请求体或 multipart），兼容旧的 JSON+base64 请求
+                frame = image_data = None
+                if request.mimetype == 'application/x-shm-frame':
+                    # 同机部署: 帧位于流服务的共享内存槽位，响应返回前该槽位保持有效，直接使用视图
+                    if not self.accept_shm_frames:
+                        return jsonify({'error': 'Shared memory frames not accepted'}), 415
+                    data = self._header_frame_meta()
+                    try:
+                        frame = self._shm_frame_view(
+                            request.headers['X-Shm-Name'],
+                            int(request.headers['X-Shm-Offset']),
+                            tuple(int(v) for v in request.headers['X-Frame-Shape'].split(',')),
+                            request.headers.get('X-Frame-Dtype', 'uint8'),
+                        )
+                    except (KeyError, ValueError, TypeError, FileNotFoundError) as e:
+                        return jsonify({'error': f'Invalid shared memory frame: {e}'}), 400
+                elif request.mimetype == 'image/jpeg':
+                    # 元数据在头部: X-Stream-Id / X-Timestamp / X-Config
+                    data = self._header_frame_meta()
+                    image_data = request.get_data(cache=False)
+                elif request.files.get('frame') is not None:
+                    data = json.loads(request.form.get('meta') or '{}')
+                    image_data = request.files['frame'].read()
+                else:
+                    data = request.get_json(silent=True) or {}
+                    # 验证请求数据
+                    if 'image' not in data:
+                        return jsonify({'error': 'Missing image data'}), 400
+                    image_data = base64.b64decode(data['image'])
                 
                 stream_id = data.get('stream_id', 'unknown')
                 timestamp = data.get('timestamp', time.time())
                 config = data.get('config', {})
                 
                 # 解码图像
-                image_data = base64.b64decode(data['image'])
-                nparr = np.frombuffer(image_data, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                if frame is None:
+                    nparr = np.frombuffer(image_data, np.uint8)
+                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
                 
                 if frame is None:
                     return jsonify({'error': 'Invalid image data'}), 400
@@ -249,7 +320,7 @@ class DetectionService:
                 # 向客户端返回简化信息（兼容旧字段，以首个object结果为准）
                 primary = next((r for r in results if r.get('algo_type') == 'object'), results[0])
 
-                return jsonify({
+                return _ojson({
                     'status': 'success',
                     'stream_id': stream_id,
                     'object_count': primary.get('total_objects', 0),
@@ -331,7 +402,8 @@ class DetectionService:
                 self.yolo_detector = YOLODetector(
                     model_path=model_path,
                     confidence_threshold=data.get('confidence_threshold', 0.5),
-                    device=data.get('device', 'auto')
+                    device=data.get('device', 'auto'),
+                    imgsz=self.config.get('model', {}).get('imgsz') or None
                 )
                 
                 # 更新配置
@@ -348,12 +420,49 @@ class DetectionService:
         @self.app.route('/api/stats', methods=['GET'])
         def get_stats():
             """获取检测服务统计信息"""
-            return jsonify(self.get_stats())
+            return _ojson(self.get_stats())
     
     def _process_single_frame(self, frame: np.ndarray, stream_id: str, timestamp: float, config: Dict) -> List[Dict]:
         """调用所有已加载的算法插件对单帧进行推理，返回原始结果列表"""
         start_time = time.time()
 
+        # 静止画面: 与上一帧 dHash 足够接近时直接复用上一帧的检测结果，跳过推理
+        frame_hash = None
+        if self.dedup_threshold > 0:
+            frame_hash = self._dhash(frame)
+            last = self._last_frames.get(stream_id)
+            if last is not None and bin(frame_hash ^ last[0]).count('1') < self.dedup_threshold:
+                self.stats['deduplicated_frames'] += 1
+                return self._reuse_results(last[1], timestamp, time.time() - start_time)
+
+        results = self._run_engines(frame, stream_id, timestamp, config, start_time)
+        if frame_hash is not None:
+            self._last_frames[stream_id] = (frame_hash, results)
+        return results
+
+    @staticmethod
+    def _dhash(frame: np.ndarray) -> int:
+        """计算 64 位差值哈希（先缩放到 9x8 再转灰度）"""
+        small = cv2.cvtColor(cv2.resize(frame, (9, 8), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        bits = np.packbits(small[:, 1:] > small[:, :-1])
+        return int.from_bytes(bits.tobytes(), 'big')
+
+    @staticmethod
+    def _reuse_results(previous: List[Dict], timestamp: float, processing_time: float) -> List[Dict]:
+        """复制上一帧结果并更新时间戳相关字段"""
+        results = []
+        for prev in previous:
+            r = dict(prev)
+            r['timestamp'] = timestamp
+            r['processing_time'] = processing_time
+            if 'detection_id' in r:
+                r['detection_id'] = f"{r['stream_id']}_{int(timestamp * 1000)}"
+            results.append(r)
+        return results
+
+    def _run_engines(self, frame: np.ndarray, stream_id: str, timestamp: float, config: Dict,
+                     start_time: float) -> List[Dict]:
+        """执行推理（插件引擎或内置 YOLODetector）"""
         if not self.engines:
             # 兼容旧模式：无插件时使用内置 YOLODetector
             detection_obj = self.yolo_detector.detect(stream_id, frame, timestamp, config)
@@ -384,6 +493,48 @@ class DetectionService:
                 self.logger.error(f"插件 {engine.__class__.__name__} 推理失败: {e}")
         return results
     
+    @staticmethod
+    def _header_frame_meta() -> Dict:
+        """从请求头读取帧元数据: X-Stream-Id / X-Timestamp / X-Config"""
+        return {
+            'stream_id': request.headers.get('X-Stream-Id', 'unknown'),
+            'timestamp': float(request.headers.get('X-Timestamp') or time.time()),
+            'config': json.loads(request.headers.get('X-Config') or '{}'),
+        }
+
+    # 同时保持 attach 的共享内存段上限（流服务每个进程一个帧槽池，重启后名称会变化）
+    MAX_SHM_SEGMENTS = 4
+
+    def _shm_frame_view(self, name: str, offset: int, shape: tuple, dtype: str) -> np.ndarray:
+        """映射流服务共享内存中的帧；校验段名前缀与越界，参数非法时抛出 ValueError"""
+        if not name.startswith(self.shm_name_prefix) or '/' in name:
+            raise ValueError(f'segment name not allowed: {name}')
+        if dtype != 'uint8' or len(shape) not in (2, 3) or min(shape) <= 0 or offset < 0:
+            raise ValueError('bad frame layout')
+
+        with self._shm_lock:
+            shm = self._shm_segments.get(name)
+            if shm is None:
+                from multiprocessing import resource_tracker, shared_memory
+                shm = shared_memory.SharedMemory(name=name)
+                # attach 方不应在退出时 unlink 该段（由创建方流服务负责），取消 resource_tracker 登记
+                resource_tracker.unregister(shm._name, 'shared_memory')
+                self._shm_segments[name] = shm
+                # 超出上限时关闭最久未用的段（通常是已重启的流服务留下的旧池）
+                while len(self._shm_segments) > self.MAX_SHM_SEGMENTS:
+                    _, old = self._shm_segments.popitem(last=False)
+                    try:
+                        old.close()
+                    except BufferError:
+                        # 仍有请求持有其视图，交给垃圾回收在视图释放后关闭
+                        pass
+            else:
+                self._shm_segments.move_to_end(name)
+
+        if offset + int(np.prod(shape)) > shm.size:
+            raise ValueError('frame exceeds shared memory segment')
+        return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+
     def _send_results_async(self, detection_result: Dict):
         """异步发送检测结果"""
         def send_worker():
@@ -391,7 +542,7 @@ class DetectionService:
                 # 所有结果都发送到 analytics-service
                 if self.analytics_service_url:
                     try:
-                        requests.post(
+                        self.http.post(
                             f"{self.analytics_service_url}/api/events/detection",
                             json=detection_result,
                             timeout=5
@@ -402,7 +553,7 @@ class DetectionService:
                 if detection_result.get('algo_type') == 'object':
                     if self.storage_service_url:
                         try:
-                            requests.post(
+                            self.http.post(
                                 f"{self.storage_service_url}/api/detections",
                                 json=detection_result,
                                 timeout=5
@@ -412,8 +563,8 @@ class DetectionService:
             except Exception as e:
                 self.logger.error(f"发送检测结果失败: {e}")
         
-        # 在后台线程中发送
-        threading.Thread(target=send_worker, daemon=True).start()
+        # 在后台线程池中发送
+        self.result_executor.submit(send_worker)
     
     def _scan_available_models(self) -> List[str]:
         """扫描可用模型"""
@@ -423,7 +574,7 @@ class DetectionService:
         
         model_files = []
         for file in os.listdir(models_dir):
-            if file.endswith(('.pt', '.onnx', '.trt')):
+            if file.endswith(('.pt', '.onnx', '.trt', '.engine')):
                 model_files.append(os.path.join(models_dir, file))
         
         return model_files
@@ -569,6 +720,9 @@ def main():
     parser.add_argument('--port', type=int, default=8082, help='服务端口')
     parser.add_argument('--host', default='0.0.0.0', help='服务主机')
     parser.add_argument('--debug', action='store_true', help='调试模式')
+    parser.add_argument('--quiet', action='store_true', help='仅输出 WARNING 及以上日志')
+    parser.add_argument('--dedup-threshold', type=int, default=None,
+                        help='近重复帧去重阈值（dHash 汉明距离），0 表示关闭')
     
     args = parser.parse_args()
     
@@ -582,6 +736,10 @@ def main():
         service.config['server']['host'] = args.host
     if args.debug:
         service.config['server']['debug'] = True
+    if args.quiet:
+        logging.getLogger().setLevel(logging.WARNING)
+    if args.dedup_threshold is not None:
+        service.dedup_threshold = args.dedup_threshold
     
     # 启动服务
     service.start()
@@ -15,7 +15,9 @@ class ObjectEngine(BaseEngine):
             model_path=model_path,
             device=device,
             confidence_threshold=confidence_threshold,
-            iou_threshold=iou_threshold
+            iou_threshold=iou_threshold,
+            imgsz=kwargs.get('imgsz'),
+            export_format=kwargs.get('export_format')
         )
 
     def infer(self, stream_id: str, frame: np.ndarray, timestamp: float, config: Dict) -> List[Dict[str, Any]]:
@@ -1,16 +1,34 @@
 import os
+import logging
+import threading
 import cv2
 import numpy as np
 from dataclasses import dataclass
 from typing import List, Dict, Optional
 import torch
+from concurrent.futures import ThreadPoolExecutor
 # 远程推送器代码已删除，保留占位
 try:
     from ultralytics import YOLO
     YOLO_AVAILABLE = True
 except ImportError:
     YOLO_AVAILABLE = False
-    print("警告: ultralytics未安装，YOLO检测功能将被禁用")
+
+logger = logging.getLogger(__name__)
+if not YOLO_AVAILABLE:
+    logger.warning("ultralytics未安装，YOLO检测功能将被禁用")
+
+# 可选: PyTurboJPEG (libjpeg-turbo SIMD) 编码检测结果图像，未安装时使用 cv2.imwrite
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_422
+    _turbo = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except Exception:
+    _turbo = None
+    TURBOJPEG_AVAILABLE = False
+
+# 检测结果图像 JPEG 质量
+JPEG_QUALITY = 85
 
 # 远程推送器功能已移除
 REMOTE_PUSHER_AVAILABLE = False
@@ -24,14 +42,23 @@ class DetectionResult:
     total_objects: int
 
 class YOLODetector:
+    # 异步保存检测图像的最大在途数（含排队），超出时改为在调用线程同步写盘
+    MAX_PENDING_SAVES = 16
+
     def __init__(self, model_path: str = "models/best.pt", 
                  confidence_threshold: float = 0.5,
                  iou_threshold: float = 0.5,
                  device: str = "auto",
-                 distributed_manager=None):  # remote_pusher 参数已移除
+                 distributed_manager=None,  # remote_pusher 参数已移除
+                 imgsz: Optional[int] = None,
+                 export_format: Optional[str] = None):
         self.model_path = model_path
         self.confidence_threshold = confidence_threshold
         self.iou_threshold = iou_threshold
+        # 推理输入尺寸；设置后在送入模型前先将长边缩放到 imgsz，减少预处理开销
+        self.imgsz = imgsz
+        # 导出格式: None(直接用 .pt) / 'engine'(TensorRT FP16) / 'onnx'
+        self.export_format = export_format
         # 自动选择设备
         if device == 'auto':
             self.device = 'cuda:0' if torch.cuda.is_available() else 'cpu'
@@ -47,25 +74,56 @@ class YOLODetector:
         # 远程推送器占位
         self.remote_pusher = None
 
+        # 将结果统一保存到项目根 static/results 目录，便于前端访问；目录只需创建一次
+        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+        self.results_dir = os.path.join(base_dir, 'static', 'results')
+        os.makedirs(self.results_dir, exist_ok=True)
+        # JPEG 编码与写盘不占用推理线程；排队中的任务各持有一整帧，在途数量有上限
+        self._save_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='frame-save')
+        self._save_slots = threading.BoundedSemaphore(self.MAX_PENDING_SAVES)
+
         if YOLO_AVAILABLE and not self.use_distributed:
             # 只有在非分布式模式下才初始化本地模型
             try:
                 if os.path.exists(model_path):
-                    self.model = YOLO(model_path)
-                    self.model.to(self.device)  # 设置设备
+                    load_path = self._export_model(model_path) if export_format else model_path
+                    self.model = YOLO(load_path, task='detect')
+                    if load_path.endswith('.pt'):
+                        self.model.to(self.device)  # 设置设备；导出模型在推理时通过 device 参数指定
                     self.class_names = self.model.names
-                    print(f"YOLO模型加载成功: {model_path}, 设备: {self.device}")
-                    print(f"📋 YOLO支持的类别数量: {len(self.class_names)}")
-                    print(f"🏷️ 支持的类别: {list(self.class_names.values())}")
+                    logger.info("YOLO模型加载成功: %s, 设备: %s", load_path, self.device)
+                    logger.info("📋 YOLO支持的类别数量: %d", len(self.class_names))
+                    logger.debug("🏷️ 支持的类别: %s", list(self.class_names.values()))
                 else:
-                    print(f"警告: YOLO模型文件不存在: {model_path}")
+                    logger.warning("YOLO模型文件不存在: %s", model_path)
             except Exception as e:
-                print(f"YOLO模型加载失败: {e}")
+                logger.error("YOLO模型加载失败: %s", e)
         elif self.use_distributed:
-            print(f"🚀 分布式推理模式已启用，将使用远程GPU服务器")
+            logger.info("🚀 分布式推理模式已启用，将使用远程GPU服务器")
             # 获取类别名称（从已有模型或配置中）
             self._init_class_names()
         
+    def _export_model(self, model_path: str) -> str:
+        """将 .pt 模型一次性导出为 TensorRT/ONNX，已存在导出文件时直接复用；失败时回退到原模型"""
+        if not model_path.endswith('.pt'):
+            return model_path
+        exported = os.path.splitext(model_path)[0] + f'.{self.export_format}'
+        if os.path.exists(exported) and os.path.getmtime(exported) >= os.path.getmtime(model_path):
+            return exported
+        try:
+            half = self.export_format == 'engine' and self.device != 'cpu'
+            logger.info("导出模型 %s -> %s (half=%s)", model_path, self.export_format, half)
+            exported = YOLO(model_path).export(
+                format=self.export_format,
+                half=half,
+                imgsz=self.imgsz or 640,
+                device=self.device
+            )
+            return str(exported)
+        except Exception as e:
+            logger.warning("模型导出失败，继续使用 PyTorch 模型: %s", e)
+            return model_path
+        
     def _init_class_names(self):
         """初始化类别名称（分布式模式下）"""
         # 默认YOLO类别（可以从配置文件加载）
@@ -85,7 +143,7 @@ class YOLODetector:
         # 分布式推理模式
         if self.use_distributed and self.distributed_manager:
             try:
-                print(f"🚀 [分布式推理] 处理帧 {stream_id}")
+                logger.debug("🚀 [分布式推理] 处理帧 %s", stream_id)
                 # 使用分布式推理
                 result = self.distributed_manager.process_frame_sync(
                     stream_id=stream_id,
@@ -95,15 +153,14 @@ class YOLODetector:
                 
                 if result and 'detections' in result:
                     detections = result['detections']
-                    print(f"✅ [分布式推理] 检测到 {len(detections)} 个对象")
+                    logger.debug("✅ [分布式推理] 检测到 %d 个对象", len(detections))
                 else:
-                    print(f"⚠️ [分布式推理] 未获取到有效结果，回退到本地处理")
+                    logger.warning("⚠️ [分布式推理] 未获取到有效结果，回退到本地处理")
                     # 回退到本地处理
                     detections = self._detect_locally(frame, risk_config)
                     
             except Exception as e:
-                print(f"❌ [分布式推理] 处理失败: {e}")
-                print(f"🔄 [回退处理] 使用本地CPU推理")
+                logger.warning("❌ [分布式推理] 处理失败: %s，回退到本地推理", e)
                 # 回退到本地处理
                 detections = self._detect_locally(frame, risk_config)
                 
@@ -135,11 +192,25 @@ class YOLODetector:
             try:
                 # 执行YOLO检测
                 confidence_threshold = risk_config.get('confidence_threshold', self.confidence_threshold) if risk_config else self.confidence_threshold
+                
+                # 预缩放: 长边缩到 imgsz 后再推理，检测框按比例还原到原图坐标
+                infer_frame, scale = frame, 1.0
+                if self.imgsz:
+                    h, w = frame.shape[:2]
+                    if max(h, w) > self.imgsz:
+                        scale = self.imgsz / max(h, w)
+                        infer_frame = cv2.resize(frame, (round(w * scale), round(h * scale)),
+                                                 interpolation=cv2.INTER_LINEAR)
+                
+                kwargs = {'imgsz': self.imgsz} if self.imgsz else {}
+                if self.export_format:
+                    kwargs['device'] = self.device
                 results = self.model(
-                    frame, 
+                    infer_frame, 
                     conf=confidence_threshold,
                     iou=self.iou_threshold,
-                    verbose=False
+                    verbose=False,
+                    **kwargs
                 )
                 
                 # 解析检测结果
@@ -151,7 +222,7 @@ class YOLODetector:
                         
                         for i in range(len(boxes)):
                             # 边界框坐标
-                            bbox = boxes.xyxy[i].cpu().numpy()
+                            bbox = boxes.xyxy[i].cpu().numpy() / scale
                             x1, y1, x2, y2 = bbox
                             
                             # 置信度
@@ -177,48 +248,75 @@ class YOLODetector:
                             detections.append(detection)
                             
             except Exception as e:
-                print(f"YOLO检测错误: {e}")
+                logger.error("YOLO检测错误: %s", e)
         
         return detections
     
     def _save_detection_frame(self, stream_id: str, frame: np.ndarray, 
                              detections: List[Dict], timestamp: float) -> str:
-        """保存检测结果图像"""
+        """保存检测结果图像，返回 Web 路径
+
+        绘制与编码写盘通常提交到线程池，返回时文件可能尚未写完；在途任务达到
+        MAX_PENDING_SAVES 时在当前线程同步写盘，磁盘跟不上时对推理形成背压而不是无限堆积帧。
+        """
         try:
-            # 将结果统一保存到项目根 static/results 目录，便于前端访问
-            base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-            results_dir = os.path.join(base_dir, 'static', 'results')
-            
-            # 确保结果目录存在
-            os.makedirs(results_dir, exist_ok=True)
-            
-            # 绘制检测框
-            annotated_frame = frame.copy()
-            for detection in detections:
-                bbox = detection['bbox']
-                x1, y1, x2, y2 = map(int, bbox)
-                
-                # 绘制边界框
-                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                
-                # 绘制标签
-                label = f"{detection['class_name']}: {detection['confidence']:.2f}"
-                cv2.putText(annotated_frame, label, (x1, y1-10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-            
-            # 保存图像
             filename = f"detection_{stream_id}_{int(timestamp)}.jpg"
             # 绝对路径写盘
-            filepath_abs = os.path.join(results_dir, filename)
-            cv2.imwrite(filepath_abs, annotated_frame)
+            filepath_abs = os.path.join(self.results_dir, filename)
+            # 复制一份再绘制，避免调用方后续复用/修改 frame 缓冲区
+            if self._save_slots.acquire(blocking=False):
+                try:
+                    self._save_executor.submit(self._write_detection_frame_async,
+                                               filepath_abs, frame.copy(), detections)
+                except Exception:
+                    self._save_slots.release()
+                    raise
+            else:
+                self._write_detection_frame(filepath_abs, frame.copy(), detections)
             
             # 返回相对 Web 路径，避免在 Windows 上带盘符
             web_path = os.path.join('static', 'results', filename).replace('\\', '/')
             return web_path
         except Exception as e:
-            print(f"保存检测图像失败: {e}")
+            logger.error("保存检测图像失败: %s", e)
             return ""
     
+    def _write_detection_frame_async(self, filepath_abs: str, annotated_frame: np.ndarray,
+                                     detections: List[Dict]):
+        """线程池任务: 写盘完成后归还在途名额"""
+        try:
+            self._write_detection_frame(filepath_abs, annotated_frame, detections)
+        finally:
+            self._save_slots.release()
+
+    def _write_detection_frame(self, filepath_abs: str, annotated_frame: np.ndarray,
+                               detections: List[Dict]):
+        """绘制检测框并编码写盘"""
+        try:
+            if detections:
+                # 所有边界框组成 (N, 4, 2) 轮廓数组，一次 polylines 调用绘制完成
+                boxes = np.array([d['bbox'] for d in detections], dtype=np.float32).astype(np.int32)
+                x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+                pts = np.stack([np.stack([x1, y1], 1), np.stack([x2, y1], 1),
+                                np.stack([x2, y2], 1), np.stack([x1, y2], 1)], axis=1)
+                cv2.polylines(annotated_frame, pts, isClosed=True, color=(0, 255, 0), thickness=2)
+                
+                # 绘制标签
+                for detection, (bx, by) in zip(detections, boxes[:, :2].tolist()):
+                    label = f"{detection['class_name']}: {detection['confidence']:.2f}"
+                    cv2.putText(annotated_frame, label, (bx, by-10), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+            
+            if _turbo is not None:
+                with open(filepath_abs, 'wb') as f:
+                    f.write(_turbo.encode(annotated_frame, quality=JPEG_QUALITY, jpeg_subsample=TJSAMP_422))
+            else:
+                # 关闭 Huffman 优化以缩短编码时间
+                cv2.imwrite(filepath_abs, annotated_frame,
+                            [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 0])
+        except Exception as e:
+            logger.error("保存检测图像失败: %s", e)
+    
     # 以下远程推送相关方法已弃用，保留占位符以兼容旧代码调用但不执行任何操作
     def _push_to_remote_server(self, *args, **kwargs):
         return
@@ -6,14 +6,31 @@
 """
 
 import os
+
+# 可选: 设置 STORAGE_GEVENT=1 时使用 gevent 协程服务器，必须在其他模块导入前打补丁
+USE_GEVENT = os.environ.get('STORAGE_GEVENT', '').lower() in ('1', 'true', 'yes')
+if USE_GEVENT:
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        USE_GEVENT = False
+
 import sys
+import re
 import time
 import logging
 import json
+import atexit
 import threading
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
-from flask import Flask, request, jsonify
+import queue
+import copy
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple
+from flask import Flask, request, Response, stream_with_context
 import redis
 import pymongo
 from pymongo import MongoClient
@@ -24,13 +41,138 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
 
 from modules.database import DatabaseManager as Database
 
+# 可选: orjson 加速 JSON 编解码，未安装时回退到标准库 json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """序列化为 UTF-8 JSON 字节串"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, default=str).encode('utf-8')
+
+
+@lru_cache(maxsize=16)
+def _parse_config_file(path: str, mtime_ns: int, size: int) -> Dict:
+    """解析 JSON 配置文件；以 (路径, 修改时间, 大小) 为键缓存，文件变更后自动失效"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _read_config_file(config_path: str) -> Dict:
+    """读取 JSON 配置文件，返回缓存结果的深拷贝，调用方修改不会污染缓存"""
+    path = os.path.abspath(config_path)
+    st = os.stat(path)
+    return copy.deepcopy(_parse_config_file(path, st.st_mtime_ns, st.st_size))
+
+
+def _json_loads(data):
+    """反序列化 JSON（接受 str 或 bytes）"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class _AtomicCounter:
+    """基于 itertools.count 的计数器: next() 在 GIL 下是原子操作，递增无需加锁"""
+    
+    __slots__ = ('_count',)
+    
+    def __init__(self):
+        self._count = itertools.count()
+    
+    def incr(self):
+        next(self._count)
+    
+    def reset(self):
+        self._count = itertools.count()
+    
+    @property
+    def value(self) -> int:
+        # repr 形如 'count(42)'，读取当前值而不推进计数
+        return int(repr(self._count)[6:-1])
+
 class StorageService:
     """数据存储服务 - 专注于数据管理"""
     
+    # Redis 中按时间戳排序的 detection_id 索引 (ZSET)
+    REDIS_DETECTION_INDEX = 'detections:by_time'
+    # Redis 中累计写入的检测记录数
+    REDIS_TOTAL_RECORDS = 'stats:total_records'
+    # 按天 (epoch 天序号) 统计活跃流的 HyperLogLog 键前缀及保留时间，覆盖最长 30 天的统计周期
+    REDIS_STREAMS_HLL_PREFIX = 'hll:streams:'
+    STREAMS_HLL_TTL = 32 * 86400
+    # 汇总统计周期对应的秒数，未知周期按 24h 处理
+    _PERIOD_SECONDS = {'24h': 86400, '7d': 7 * 86400, '30d': 30 * 86400}
+    # MongoDB 汇总聚合使用的覆盖索引名
+    SUMMARY_INDEX = 'ts_stream_ptime'
+    # /api/results/summary 聚合中与时间窗口无关的固定阶段
+    _SUMMARY_PIPELINE_TAIL = (
+        {
+            # 仅保留索引内字段，使查询可由 ts_stream_ptime 覆盖
+            '$project': {
+                '_id': 0,
+                'stream_id': 1,
+                'processing_time': 1,
+                'timestamp': 1
+            }
+        },
+        {
+            '$group': {
+                '_id': '$stream_id',
+                'total_detections': {'$sum': 1},
+                'avg_processing_time_ms': {
+                    '$avg': {
+                        '$multiply': ['$processing_time', 1000]
+                    }
+                }
+            }
+        },
+        {
+            '$project': {
+                '_id': 0,
+                'stream_id': '$_id',
+                'total_detections': 1,
+                'avg_processing_time_ms': {'$round': ['$avg_processing_time_ms', 2]}
+            }
+        }
+    )
+    # 汇总时间窗口参数解析，如 300 / 5m / 1h / 1.5d
+    _WIN_RE = re.compile(r'^(\d+(?:\.\d+)?)([smhd]?)$')
+    _WIN_UNIT = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    # 服务端排除 _id，避免传输 ObjectId 后再在 Python 中删除
+    _NO_ID_PROJECTION = {'_id': 0}
+    # 最新结果列表只返回前端使用的字段
+    _LATEST_PROJECTION = {
+        '_id': 0,
+        'detection_id': 1,
+        'stream_id': 1,
+        'stream_name': 1,
+        'timestamp': 1,
+        'detections': 1,
+        'total_objects': 1,
+        'frame_path': 1,
+        'processing_time': 1
+    }
+    
     def __init__(self, config_file: str = 'config/storage_config.json'):
         self.config_file = config_file
         self.config = self._load_config()
         
+        # 热路径上频繁读取的配置项，启动时展开为属性
+        storage_config = self.config.get('storage', {})
+        self._enable_hot_cache = storage_config.get('enable_hot_cache', True)
+        self._enable_cold_storage = storage_config.get('enable_cold_storage', True)
+        self._max_records = storage_config.get('max_records_per_query', 1000)
+        self._hot_ttl = self.config.get('redis', {}).get('hot_data_ttl', 86400)
+        self._summary_cache_ttl = storage_config.get('summary_cache_ttl', 15)
+        self._dbstats_cache_ttl = storage_config.get('dbstats_cache_ttl', 30)
+        
         # 初始化日志
         self._setup_logging()
         self.logger = logging.getLogger(__name__)
@@ -43,20 +185,38 @@ class StorageService:
         self.redis_client = None
         self.mongo_client = None
         self.mongo_db = None
+        self.mongo_db_read = None  # 读路径使用 secondaryPreferred，隔离写入压力
+        self._detections_write = None  # 检测结果写入使用独立的写关注
         self.database = None
         
         # 统计信息
         self.stats = {
             'start_time': time.time(),
-            'total_records': 0,
-            'hot_cache_hits': 0,
-            'cold_storage_queries': 0,
             'storage_usage_mb': 0
         }
+        self._dbstats_checked_at = float('-inf')  # 上次执行 dbStats 的 monotonic 时间
+        # 高频计数器，多线程递增无需加锁
+        self._records_counter = _AtomicCounter()
+        self._hot_hits_counter = _AtomicCounter()
+        self._cold_queries_counter = _AtomicCounter()
+        
+        # 检测结果写入缓冲: 路由只负责入队，后台线程批量写入各存储层
+        self._write_queue = queue.Queue(maxsize=storage_config.get('write_queue_size', 10000))
+        self._write_batch_size = storage_config.get('write_batch_size', 500)
+        self._write_flush_interval = storage_config.get('write_flush_interval', 0.05)
         
         # 初始化数据库连接
         self._initialize_databases()
         
+        # 共享 IO 线程池: 批量写入时 Redis / MongoDB / 兼容数据库三层并发执行
+        self._io_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='storage-io')
+        
+        # 启动批量写入线程
+        self._writer_thread = threading.Thread(target=self._detection_writer_loop, daemon=True)
+        self._writer_thread.start()
+        # 写入线程是守护线程，退出前等待已入队的检测结果落盘
+        atexit.register(self._flush_writes, 10.0)
+        
         # 启动清理线程
         self._start_cleanup_threads()
     
@@ -81,14 +241,24 @@ class StorageService:
                 'database': 'video_analysis',
                 'username': None,
                 'password': None,
-                'warm_data_ttl': 2592000  # 30天
+                'warm_data_ttl': 2592000,  # 30天
+                'max_pool_size': 200,
+                'min_pool_size': 20,
+                'compressors': 'zstd,snappy,zlib',
+                'detection_write_concern': 0  # 检测结果写关注: 0 不等待确认，1 等待主节点确认
             },
             'storage': {
                 'enable_hot_cache': True,
                 'enable_cold_storage': True,
                 'max_records_per_query': 1000,
                 'cleanup_interval': 3600,  # 1小时
-                'archive_threshold_days': 90
+                'archive_threshold_days': 90,
+                'write_queue_size': 10000,   # 检测结果写入缓冲队列长度
+                'write_batch_size': 500,     # 单批最多写入条数
+                'write_flush_interval': 0.05,  # 批次最长等待时间（秒）
+                'summary_cache_ttl': 15,  # 汇总统计 Redis 缓存时间（秒），0 表示不缓存
+                'dbstats_cache_ttl': 30,  # MongoDB dbStats 存储用量缓存时间（秒）
+                'sqlite_shards': 1  # 兼容 SQLite 检测结果按 stream_id 分片的文件数（已有数据后不可更改）
             },
             'logging': {
                 'level': 'INFO',
@@ -98,17 +268,16 @@ class StorageService:
         
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    # 合并默认配置
-                    for key, value in default_config.items():
-                        if key not in config:
-                            config[key] = value
-                        elif isinstance(value, dict):
-                            for sub_key, sub_value in value.items():
-                                if sub_key not in config[key]:
-                                    config[key][sub_key] = sub_value
-                    return config
+                config = _read_config_file(self.config_file)
+                # 合并默认配置
+                for key, value in default_config.items():
+                    if key not in config:
+                        config[key] = value
+                    elif isinstance(value, dict):
+                        for sub_key, sub_value in value.items():
+                            if sub_key not in config[key]:
+                                config[key][sub_key] = sub_value
+                return config
             except Exception as e:
                 print(f"加载配置文件失败: {e}，使用默认配置")
         
@@ -152,7 +321,7 @@ class StorageService:
         """初始化数据库连接"""
         try:
             # Redis连接 (热数据缓存)
-            if self.config.get('storage', {}).get('enable_hot_cache', True):
+            if self._enable_hot_cache:
                 try:
                     redis_config = self.config.get('redis', {})
                     self.redis_client = redis.Redis(
@@ -172,7 +341,7 @@ class StorageService:
                     self.redis_client = None
             
             # MongoDB连接 (温数据存储)
-            if self.config.get('storage', {}).get('enable_cold_storage', True):
+            if self._enable_cold_storage:
                 try:
                     mongo_config = self.config.get('mongodb', {})
                     
@@ -184,9 +353,22 @@ class StorageService:
                     self.mongo_client = MongoClient(
                         connection_string,
                         serverSelectionTimeoutMS=2000,
-                        connectTimeoutMS=2000
+                        connectTimeoutMS=2000,
+                        maxPoolSize=mongo_config.get('max_pool_size', 200),
+                        minPoolSize=mongo_config.get('min_pool_size', 20),
+                        # 线协议压缩；未安装的压缩库会被驱动忽略，zlib 始终可用
+                        compressors=mongo_config.get('compressors', 'zstd,snappy,zlib'),
+                        zlibCompressionLevel=-1
+                    )
+                    db_name = mongo_config.get('database', 'video_analysis')
+                    self.mongo_db = self.mongo_client[db_name]
+                    self.mongo_db_read = self.mongo_client.get_database(
+                        db_name, read_preference=pymongo.ReadPreference.SECONDARY_PREFERRED
+                    )
+                    # 检测结果批量写入: 默认 w=0 不等待服务端确认
+                    self._detections_write = self.mongo_db['detections'].with_options(
+                        write_concern=pymongo.WriteConcern(w=mongo_config.get('detection_write_concern', 0))
                     )
-                    self.mongo_db = self.mongo_client[mongo_config.get('database', 'video_analysis')]
                     
                     # 测试连接
                     self.mongo_client.admin.command('ping')
@@ -198,11 +380,16 @@ class StorageService:
                     self.logger.warning(f"MongoDB连接失败，禁用冷存储: {e}")
                     self.mongo_client = None
                     self.mongo_db = None
+                    self.mongo_db_read = None
+                    self._detections_write = None
             
             # 初始化原有数据库模块作为兼容层
-            self.database = Database()
+            self.database = Database(shards=self.config.get('storage', {}).get('sqlite_shards', 1))
             self.logger.info("SQLite数据库初始化成功")
             
+        except ValueError:
+            # 分片数与已有数据不一致，拒绝以错误配置启动
+            raise
         except Exception as e:
             self.logger.error(f"数据库初始化失败: {e}")
             # 继续运行，但功能受限
@@ -216,6 +403,11 @@ class StorageService:
             detections_collection.create_index([('stream_id', 1), ('timestamp', -1)])
             detections_collection.create_index([('detection_id', 1)], unique=True)
             detections_collection.create_index([('timestamp', -1)])
+            # 覆盖索引: 按时间窗口聚合的 $match/$project 只需读索引
+            detections_collection.create_index(
+                [('timestamp', -1), ('stream_id', 1), ('processing_time', 1)],
+                name=self.SUMMARY_INDEX
+            )
             
             # 流信息集合索引
             streams_collection = self.mongo_db['streams']
@@ -225,6 +417,10 @@ class StorageService:
         except Exception as e:
             self.logger.error(f"创建MongoDB索引失败: {e}")
     
+    def _ojson(self, obj: Any, status: int = 200) -> Response:
+        """以 JSON 响应返回（orjson 编码，替代 jsonify）"""
+        return self.app.response_class(_json_dumps(obj), status=status, mimetype='application/json')
+    
     def _setup_routes(self):
         """设置API路由"""
         
@@ -243,7 +439,7 @@ class StorageService:
                 redis_status = 'error' if self.redis_client else 'disconnected'
                 mongo_status = 'error' if self.mongo_client else 'disconnected'
             
-            return jsonify({
+            return self._ojson({
                 'status': 'healthy',
                 'service': 'storage',
                 'timestamp': time.time(),
@@ -252,34 +448,44 @@ class StorageService:
                     'redis': redis_status,
                     'mongodb': mongo_status
                 },
-                'total_records': self.stats['total_records']
+                'total_records': self._total_records()
             })
         
         @self.app.route('/api/detections', methods=['POST'])
         def store_detection():
             """存储检测结果"""
             try:
-                detection_data = request.get_json()
+                # 保留原始请求体，写入 Redis 时直接复用，省去一次重新序列化
+                raw = request.get_data(cache=False)
+                try:
+                    detection_data = _json_loads(raw) if raw else None
+                except ValueError:
+                    detection_data = None
                 
-                if not detection_data or 'detection_id' not in detection_data:
-                    return jsonify({'error': 'Invalid detection data'}), 400
+                if not isinstance(detection_data, dict) or 'detection_id' not in detection_data:
+                    return self._ojson({'error': 'Invalid detection data'}), 400
+                # 批量写入共用一个 pipeline / 事务，字段非法的记录会让同批其他请求的写入一起失败，入队前拦截
+                if not self._valid_detection(detection_data):
+                    return self._ojson({
+                        'error': 'Detection requires non-empty detection_id, stream_id and numeric timestamp'
+                    }), 400
                 
                 # 存储到不同层级
-                result = self._store_detection_multilayer(detection_data)
+                result = self._store_detection_multilayer(detection_data, raw_bytes=raw)
                 
                 if result['success']:
-                    self.stats['total_records'] += 1
-                    return jsonify({
+                    self._records_counter.incr()
+                    return self._ojson({
                         'status': 'success',
                         'detection_id': detection_data['detection_id'],
                         'storage_layers': result['layers']
                     })
                 else:
-                    return jsonify({'error': result['error']}), 500
+                    return self._ojson({'error': result['error']}), 500
                     
             except Exception as e:
                 self.logger.error(f"存储检测结果失败: {e}")
-                return jsonify({'error': str(e)}), 500
+                return self._ojson({'error': str(e)}), 500
         
         @self.app.route('/api/detections/<detection_id>', methods=['GET'])
         def get_detection(detection_id):
@@ -288,33 +494,29 @@ class StorageService:
                 result = self._get_detection_multilayer(detection_id)
                 
                 if result:
-                    return jsonify(result)
+                    return self._ojson(result)
                 else:
-                    return jsonify({'error': 'Detection not found'}), 404
+                    return self._ojson({'error': 'Detection not found'}), 404
                     
             except Exception as e:
                 self.logger.error(f"获取检测结果失败: {e}")
-                return jsonify({'error': str(e)}), 500
+                return self._ojson({'error': str(e)}), 500
         
         @self.app.route('/api/results/latest', methods=['GET'])
         def get_latest_results():
             """获取最新检测结果"""
             try:
                 limit = request.args.get('limit', 20, type=int)
-                limit = min(limit, self.config.get('storage', {}).get('max_records_per_query', 1000))
-                
-                results = self._get_latest_results(limit)
+                limit = min(limit, self._max_records)
                 
-                return jsonify({
-                    'success': True,
-                    'results': results,
-                    'count': len(results),
-                    'limit': limit
-                })
+                return self._stream_json_response(
+                    {'success': True, 'limit': limit},
+                    self._iter_latest_results(limit)
+                )
                 
             except Exception as e:
                 self.logger.error(f"获取最新结果失败: {e}")
-                return jsonify({'error': str(e)}), 500
+                return self._ojson({'error': str(e)}), 500
         
         @self.app.route('/api/results/<stream_id>', methods=['GET'])
         def get_stream_results(stream_id):
@@ -326,24 +528,16 @@ class StorageService:
                 start_time = request.args.get('start_time', type=float)
                 end_time = request.args.get('end_time', type=float)
                 
-                limit = min(limit, self.config.get('storage', {}).get('max_records_per_query', 1000))
+                limit = min(limit, self._max_records)
                 
-                results = self._get_stream_results(
-                    stream_id, limit, offset, start_time, end_time
+                return self._stream_json_response(
+                    {'success': True, 'stream_id': stream_id, 'limit': limit, 'offset': offset},
+                    self._iter_stream_results(stream_id, limit, offset, start_time, end_time)
                 )
                 
-                return jsonify({
-                    'success': True,
-                    'stream_id': stream_id,
-                    'results': results,
-                    'count': len(results),
-                    'limit': limit,
-                    'offset': offset
-                })
-                
             except Exception as e:
                 self.logger.error(f"获取流结果失败: {e}")
-                return jsonify({'error': str(e)}), 500
+                return self._ojson({'error': str(e)}), 500
         
         @self.app.route('/api/stats/summary', methods=['GET'])
         def get_summary_stats():
@@ -351,34 +545,16 @@ class StorageService:
             try:
                 period = request.args.get('period', '24h')  # 24h, 7d, 30d
                 
-                stats = self._get_summary_statistics(period)
-                
-                # 兼容前端 results.js 期望的字段
-                now_ts = time.time()
-                one_hour_ago = now_ts - 3600
-                total_results = stats.get('total_detections', 0)
-
-                # 计算 recent_results (最近1小时)
-                recent_results = 0
-                if self.mongo_db:
-                    try:
-                        recent_results = self.mongo_db['detections'].count_documents({'timestamp': {'$gte': one_hour_ago}})
-                    except Exception:
-                        pass
-
-                stats.update({
-                    'success': True,
-                    'total_results': total_results,
-                    'total_objects': total_results,  # 若无对象总数可近似使用条数
-                    'recent_results': recent_results,
-                    'avg_processing_time': 0  # 暂无，后续可在 detection-service 写入再聚合
-                })
+                stats = self._cached(
+                    f'stats:summary:{period}', self._summary_cache_ttl,
+                    lambda: self._build_summary_stats(period)
+                )
                 
-                return jsonify(stats)
+                return self._ojson(stats)
                 
             except Exception as e:
                 self.logger.error(f"获取汇总统计失败: {e}")
-                return jsonify({'error': str(e)}), 500
+                return self._ojson({'error': str(e)}), 500
         
         @self.app.route('/api/streams', methods=['GET'])
         def get_active_streams():
@@ -386,31 +562,31 @@ class StorageService:
             try:
                 streams = self._get_active_streams()
                 
-                return jsonify({
+                return self._ojson({
                     'streams': streams,
                     'count': len(streams)
                 })
                 
             except Exception as e:
                 self.logger.error(f"获取活跃流失败: {e}")
-                return jsonify({'error': str(e)}), 500
+                return self._ojson({'error': str(e)}), 500
         
         @self.app.route('/api/stats', methods=['GET'])
         def get_storage_stats():
             """获取存储服务统计信息"""
-            return jsonify(self.get_stats())
+            return self._ojson(self.get_stats())
         
         @self.app.route('/api/cleanup', methods=['POST'])
         def manual_cleanup():
             """手动触发清理"""
             try:
                 result = self._cleanup_old_data()
-                return jsonify({
+                return self._ojson({
                     'status': 'success',
                     'cleanup_result': result
                 })
             except Exception as e:
-                return jsonify({'error': str(e)}), 500
+                return self._ojson({'error': str(e)}), 500
         
         @self.app.route('/api/summary', methods=['POST'])
         def store_summary():
@@ -418,7 +594,7 @@ class StorageService:
             try:
                 summary_data = request.get_json()
                 if not summary_data or summary_data.get('event_type') != 'summary':
-                    return jsonify({'error': 'Invalid summary data'}), 400
+                    return self._ojson({'error': 'Invalid summary data'}), 400
  
                 layers = []
                 # 直接写入MongoDB（如可用）
@@ -429,17 +605,24 @@ class StorageService:
                 except Exception as e:
                     self.logger.debug(f"MongoDB 写入summary失败: {e}")
  
-                # 可扩展写入Redis或SQLite；此处简单计数
-                self.stats['total_records'] += 1
-                return jsonify({'status': 'success', 'layers': layers})
+                # 计入累计记录数: 与检测写入一致，Redis 可用时累加 _total_records 读取的 Redis 计数
+                if self.redis_client and self._enable_hot_cache:
+                    try:
+                        self.redis_client.incr(self.REDIS_TOTAL_RECORDS)
+                    except Exception as e:
+                        self.logger.debug(f"Redis 累计计数失败: {e}")
+                self._records_counter.incr()
+                return self._ojson({'status': 'success', 'layers': layers})
             except Exception as e:
                 self.logger.error(f"存储summary失败: {e}")
-                return jsonify({'error': str(e)}), 500
+                return self._ojson({'error': str(e)}), 500
         
         @self.app.route('/api/results/clear', methods=['POST'])
         def clear_all_results():
             """清空所有检测结果（热缓存 + 冷存储 + 兼容 SQLite）"""
             try:
+                # 先让已入队的写入落盘，避免清空后又被后台线程写回
+                self._flush_writes(5.0)
                 cleared = {
                     'redis': 0,
                     'mongodb': 0,
@@ -449,17 +632,22 @@ class StorageService:
                 # Redis 热缓存
                 if self.redis_client:
                     try:
-                        keys = self.redis_client.keys('detection:*')
-                        if keys:
-                            cleared['redis'] = self.redis_client.delete(*keys)
+                        cleared['redis'] = self._unlink_matching('detection:*')
+                        self.redis_client.unlink(self.REDIS_DETECTION_INDEX, self.REDIS_TOTAL_RECORDS)
+                        # 同时失效汇总缓存与按天的活跃流 HyperLogLog
+                        for pattern in ('stats:summary:*', 'results:summary:*',
+                                        f"{self.REDIS_STREAMS_HLL_PREFIX}*"):
+                            self._unlink_matching(pattern)
                     except Exception as e:
                         self.logger.warning(f"Redis 清理失败: {e}")
  
                 # MongoDB
-                if self.mongo_db:
+                if self.mongo_db is not None:
                     try:
-                        res = self.mongo_db['detections'].delete_many({})
-                        cleared['mongodb'] = res.deleted_count
+                        # 整表清空: drop 集合并重建索引，远快于逐条 delete_many({})
+                        cleared['mongodb'] = self.mongo_db['detections'].estimated_document_count()
+                        self.mongo_db.drop_collection('detections')
+                        self._create_mongodb_indexes()
                     except Exception as e:
                         self.logger.warning(f"MongoDB 清理失败: {e}")
  
@@ -471,94 +659,29 @@ class StorageService:
                         self.logger.warning(f"SQLite 清理失败: {e}")
  
                 # 更新内部统计
-                self.stats['total_records'] = 0
-                self.stats['hot_cache_hits'] = 0
-                self.stats['cold_storage_queries'] = 0
+                self._records_counter.reset()
+                self._hot_hits_counter.reset()
+                self._cold_queries_counter.reset()
  
-                return jsonify({'success': True, 'cleared': cleared})
+                return self._ojson({'success': True, 'cleared': cleared})
             except Exception as e:
                 self.logger.error(f"清空检测结果失败: {e}")
-                return jsonify({'success': False, 'error': str(e)}), 500
+                return self._ojson({'success': False, 'error': str(e)}), 500
         
         @self.app.route('/api/results/summary', methods=['GET'])
         def get_results_summary():
             """按时间窗口聚合检测结果 (默认5分钟) - 供管理端汇总页面使用"""
             try:
                 window_param = request.args.get('window', '5m')  # 5m, 1h, 24h, etc.
-                multiplier = 60  # 默认分钟
-                if window_param.endswith('m'):
-                    multiplier = 60
-                    base_val = window_param[:-1]
-                elif window_param.endswith('h'):
-                    multiplier = 3600
-                    base_val = window_param[:-1]
-                elif window_param.endswith('d'):
-                    multiplier = 86400
-                    base_val = window_param[:-1]
-                else:
-                    # 纯数字视为秒
-                    base_val = window_param
-                    multiplier = 1
-                try:
-                    window_seconds = int(float(base_val) * multiplier)
-                except ValueError:
-                    window_seconds = 300  # fallback 5 min
-                end_ts = time.time()
-                start_ts = end_ts - window_seconds
-
-                summary_rows = []
-
-                # 优先使用 MongoDB 聚合
-                if self.mongo_db:
-                    try:
-                        detections_col = self.mongo_db['detections']
-                        pipeline = [
-                            {
-                                '$match': {
-                                    'timestamp': {
-                                        '$gte': start_ts,
-                                        '$lte': end_ts
-                                    }
-                                }
-                            },
-                            {
-                                '$group': {
-                                    '_id': '$stream_id',
-                                    'total_detections': {'$sum': 1},
-                                    'avg_processing_time_ms': {
-                                        '$avg': {
-                                            '$multiply': ['$processing_time', 1000]
-                                        }
-                                    }
-                                }
-                            },
-                            {
-                                '$project': {
-                                    '_id': 0,
-                                    'stream_id': '$_id',
-                                    'total_detections': 1,
-                                    'avg_processing_time_ms': {'$round': ['$avg_processing_time_ms', 2]}
-                                }
-                            }
-                        ]
-                        cursor = detections_col.aggregate(pipeline)
-                        for doc in cursor:
-                            doc['window_start'] = start_ts
-                            doc['window_end'] = end_ts
-                            doc['anomaly_count'] = doc.get('anomaly_count', 0)
-                            summary_rows.append(doc)
-                    except Exception as e:
-                        self.logger.error(f"MongoDB 聚合汇总失败: {e}")
-
-                # 若 MongoDB 不可用或无数据，降级到 Redis 或内存聚合
-                if not summary_rows and self.redis_client:
-                    try:
-                        # Redis简易扫描键: detection:* 结构未定，跳过
-                        pass
-                    except Exception:
-                        pass
+                # 纯数字视为秒；无法解析时回退到 5 分钟
+                m = self._WIN_RE.match(window_param)
+                window_seconds = int(float(m.group(1)) * self._WIN_UNIT[m.group(2)]) if m else 300
+                summary_rows = self._cached(
+                    f'results:summary:{window_seconds}', self._summary_cache_ttl,
+                    lambda: self._get_results_summary_rows(window_seconds)
+                )
 
-                return jsonify({
+                return self._ojson({
                     'success': True,
                     'window': window_param,
                     'summary': summary_rows,
@@ -567,54 +690,116 @@ class StorageService:
 
             except Exception as e:
                 self.logger.error(f"获取汇总结果失败: {e}")
-                return jsonify({'success': False, 'error': str(e)}), 500
+                return self._ojson({'success': False, 'error': str(e)}), 500
     
-    def _store_detection_multilayer(self, detection_data: Dict) -> Dict:
-        """多层存储检测结果"""
-        layers_stored = []
+    def _build_summary_stats(self, period: str) -> Dict:
+        """汇总统计 + 前端兼容字段"""
+        stats = self._get_summary_statistics(period)
         
+        # 兼容前端 results.js 期望的字段
+        now_ts = time.time()
+        one_hour_ago = now_ts - 3600
+        total_results = stats.get('total_detections', 0)
+
+        # 计算 recent_results (最近1小时)
+        recent_results = 0
+        if self.mongo_db is not None:
+            try:
+                # 走 timestamp 索引计数，避免回表
+                recent_results = self.mongo_db_read['detections'].count_documents(
+                    {'timestamp': {'$gte': one_hour_ago}}, hint=[('timestamp', -1)]
+                )
+            except Exception:
+                pass
+
+        stats.update({
+            'success': True,
+            'total_results': total_results,
+            'total_objects': total_results,  # 若无对象总数可近似使用条数
+            'recent_results': recent_results,
+            'avg_processing_time': 0  # 暂无，后续可在 detection-service 写入再聚合
+        })
+        return stats
+    
+    def _get_results_summary_rows(self, window_seconds: int) -> List[Dict]:
+        """按流聚合最近 window_seconds 秒内的检测结果"""
+        end_ts = time.time()
+        start_ts = end_ts - window_seconds
+
+        summary_rows = []
+
+        # 优先使用 MongoDB 聚合
+        if self.mongo_db is not None:
+            try:
+                detections_col = self.mongo_db_read['detections']
+                # 仅 $match 随时间窗口变化，其余阶段复用类常量
+                pipeline = [{'$match': {'timestamp': {'$gte': start_ts, '$lte': end_ts}}}]
+                pipeline.extend(self._SUMMARY_PIPELINE_TAIL)
+                cursor = detections_col.aggregate(pipeline, hint=self.SUMMARY_INDEX, allowDiskUse=False)
+                for doc in cursor:
+                    doc['window_start'] = start_ts
+                    doc['window_end'] = end_ts
+                    doc['anomaly_count'] = doc.get('anomaly_count', 0)
+                    summary_rows.append(doc)
+            except Exception as e:
+                self.logger.error(f"MongoDB 聚合汇总失败: {e}")
+
+        # 若 MongoDB 不可用或无数据，降级到 Redis 或内存聚合
+        if not summary_rows and self.redis_client:
+            try:
+                # Redis简易扫描键: detection:* 结构未定，跳过
+                pass
+            except Exception:
+                pass
+
+        return summary_rows
+    
+    def _cached(self, key: str, ttl: int, producer):
+        """Redis 短 TTL 缓存: 命中直接返回，未命中调用 producer 计算并回写"""
+        if not self.redis_client or ttl <= 0:
+            return producer()
         try:
-            # Layer 1: Redis热缓存 (最新数据)
-            if self.redis_client and self.config.get('storage', {}).get('enable_hot_cache', True):
-                redis_key = f"detection:{detection_data['detection_id']}"
-                redis_data = json.dumps(detection_data)
-                ttl = self.config.get('redis', {}).get('hot_data_ttl', 86400)
-                
-                self.redis_client.setex(redis_key, ttl, redis_data)
-                
-                # 更新流最新检测时间
-                stream_key = f"stream:{detection_data['stream_id']}:latest"
-                self.redis_client.setex(stream_key, ttl, detection_data['timestamp'])
-                
-                layers_stored.append('redis')
-            
-            # Layer 2: MongoDB温存储 (历史数据)
-            if self.mongo_db and self.config.get('storage', {}).get('enable_cold_storage', True):
-                detections_collection = self.mongo_db['detections']
-                
-                # 添加存储时间戳
-                mongo_data = detection_data.copy()
-                mongo_data['stored_at'] = datetime.utcnow()
-                
-                detections_collection.insert_one(mongo_data)
-                layers_stored.append('mongodb')
-            
-            # Layer 3: 兼容原有数据库 (可选)
-            if self.database:
-                try:
-                    if hasattr(self.database, 'store_detection_result'):
-                        # 兼容旧方法名
-                        self.database.store_detection_result(detection_data)
-                    else:
-                        # 新方法名 save_detection_result
-                        self.database.save_detection_result(detection_data)
-                    layers_stored.append('legacy_db')
-                except Exception as e:
-                    self.logger.warning(f"兼容数据库存储失败: {e}")
+            cached = self.redis_client.get(key)
+            if cached:
+                return _json_loads(cached)
+        except Exception as e:
+            self.logger.debug(f"Redis 读取缓存 {key} 失败: {e}")
+        
+        value = producer()
+        try:
+            self.redis_client.setex(key, ttl, _json_dumps(value))
+        except Exception as e:
+            self.logger.debug(f"Redis 写入缓存 {key} 失败: {e}")
+        return value
+    
+    @staticmethod
+    def _valid_detection(detection_data: Any) -> bool:
+        """detection_id / stream_id 为非空字符串或整数，timestamp 为数值"""
+        if not isinstance(detection_data, dict):
+            return False
+        for key in ('detection_id', 'stream_id'):
+            value = detection_data.get(key)
+            if isinstance(value, bool) or not isinstance(value, (str, int)) or value == '':
+                return False
+        timestamp = detection_data.get('timestamp')
+        return not isinstance(timestamp, bool) and isinstance(timestamp, (int, float))
+
+    def _store_detection_multilayer(self, detection_data: Dict, raw_bytes: Optional[bytes] = None) -> Dict:
+        """多层存储检测结果（入队后由后台线程批量写入；队列满时同步写入）
+
+        raw_bytes 为请求原始 JSON，提供时直接写入 Redis 热缓存。
+        """
+        item = (detection_data, raw_bytes)
+        try:
+            try:
+                self._write_queue.put_nowait(item)
+            except queue.Full:
+                self.logger.warning("检测结果写入队列已满，改为同步写入")
+                self._write_detection_batch([item])
             
             return {
                 'success': True,
-                'layers': layers_stored
+                'layers': self._enabled_storage_layers()
             }
             
         except Exception as e:
@@ -622,9 +807,176 @@ class StorageService:
             return {
                 'success': False,
                 'error': str(e),
-                'layers': layers_stored
+                'layers': []
             }
     
+    def _unlink_matching(self, pattern: str, chunk_size: int = 1000) -> int:
+        """SCAN 增量遍历匹配的键，按块通过 pipeline 发送 UNLINK（后台释放内存，不阻塞 Redis）"""
+        removed = 0
+        chunk = []
+        for key in self.redis_client.scan_iter(match=pattern, count=chunk_size):
+            chunk.append(key)
+            if len(chunk) >= chunk_size:
+                removed += self._unlink_chunk(chunk)
+                chunk = []
+        if chunk:
+            removed += self._unlink_chunk(chunk)
+        return removed
+    
+    def _unlink_chunk(self, keys: List[str]) -> int:
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.unlink(*keys)
+        return sum(pipe.execute())
+    
+    def _total_records(self) -> int:
+        """累计记录数: 优先读取 Redis 计数（跨重启/多进程共享），不可用时使用进程内计数"""
+        if self.redis_client and self._enable_hot_cache:
+            try:
+                return int(self.redis_client.get(self.REDIS_TOTAL_RECORDS) or 0)
+            except Exception:
+                pass
+        return self._records_counter.value
+    
+    def _enabled_storage_layers(self) -> List[str]:
+        """当前可写入的存储层"""
+        layers = []
+        if self.redis_client and self._enable_hot_cache:
+            layers.append('redis')
+        if self.mongo_db is not None and self._enable_cold_storage:
+            layers.append('mongodb')
+        if self.database:
+            layers.append('legacy_db')
+        return layers
+    
+    def _flush_writes(self, timeout: Optional[float] = None) -> bool:
+        """等待写入队列中已入队的检测结果全部写完，超时返回 False"""
+        q = self._write_queue
+        with q.all_tasks_done:
+            done = q.all_tasks_done.wait_for(lambda: q.unfinished_tasks == 0, timeout)
+        if not done:
+            self.logger.warning(f"等待检测结果写入超时，仍有 {q.unfinished_tasks} 条未写入")
+        return done
+    
+    def _detection_writer_loop(self):
+        """后台批量写入循环: 攒满 write_batch_size 条或等待 write_flush_interval 后写入一批"""
+        while True:
+            batch = [self._write_queue.get()]
+            deadline = time.time() + self._write_flush_interval
+            while len(batch) < self._write_batch_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._write_detection_batch(batch)
+            except Exception as e:
+                self.logger.error(f"批量写入检测结果失败: {e}")
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    def _write_detection_batch(self, items: List[Tuple[Dict, Optional[bytes]]]) -> List[str]:
+        """将一批 (检测结果, 原始 JSON) 并发写入 Redis / MongoDB / 兼容数据库，返回写入成功的层"""
+        batch = [detection_data for detection_data, _ in items]
+        
+        # 三层写入互不依赖，提交到共享 IO 线程池并发执行，批次耗时取决于最慢的一层
+        try:
+            futures = [
+                self._io_pool.submit(self._write_batch_redis, items),
+                self._io_pool.submit(self._write_batch_mongo, batch),
+                self._io_pool.submit(self._write_batch_legacy, batch)
+            ]
+        except RuntimeError:
+            # 解释器退出时线程池已关闭（退出前的队列冲刷），改为在当前线程依次写入
+            results = [self._write_batch_redis(items), self._write_batch_mongo(batch),
+                       self._write_batch_legacy(batch)]
+            return [layer for layer in results if layer]
+        return [layer for layer in (f.result() for f in futures) if layer]
+    
+    def _write_batch_redis(self, items: List[Tuple[Dict, Optional[bytes]]]) -> Optional[str]:
+        """写入 Redis 热缓存，成功返回层名称，失败或未启用返回 None"""
+        # Layer 1: Redis热缓存 (最新数据)，整批命令通过一个非事务 pipeline 一次往返发送
+        if not (self.redis_client and self._enable_hot_cache):
+            return None
+        batch = [detection_data for detection_data, _ in items]
+        try:
+            ttl = self._hot_ttl
+            pipe = self.redis_client.pipeline(transaction=False)
+            for detection_data, raw_bytes in items:
+                redis_key = f"detection:{detection_data['detection_id']}"
+                pipe.setex(redis_key, ttl, raw_bytes if raw_bytes is not None else _json_dumps(detection_data))
+                
+                # 更新流最新检测时间
+                stream_key = f"stream:{detection_data['stream_id']}:latest"
+                pipe.setex(stream_key, ttl, detection_data['timestamp'])
+            
+            # 按时间排序的检测索引，替代 KEYS 全量扫描；同时裁掉已随 TTL 过期的成员
+            pipe.zadd(self.REDIS_DETECTION_INDEX,
+                      {d['detection_id']: d['timestamp'] for d in batch})
+            pipe.zremrangebyscore(self.REDIS_DETECTION_INDEX, '-inf', time.time() - ttl)
+            pipe.expire(self.REDIS_DETECTION_INDEX, ttl * 2)
+            # 按天的活跃流 HyperLogLog，供汇总统计近似计数唯一流
+            streams_by_day: Dict[str, set] = {}
+            for d in batch:
+                day_key = f"{self.REDIS_STREAMS_HLL_PREFIX}{int(d['timestamp'] // 86400)}"
+                streams_by_day.setdefault(day_key, set()).add(d['stream_id'])
+            for day_key, stream_ids in streams_by_day.items():
+                pipe.pfadd(day_key, *stream_ids)
+                pipe.expire(day_key, self.STREAMS_HLL_TTL)
+            # 持久化的写入计数，随同一 pipeline 发送，不增加往返
+            pipe.incrby(self.REDIS_TOTAL_RECORDS, len(batch))
+            pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Redis 批量写入失败: {e}")
+            return None
+        return 'redis'
+    
+    def _write_batch_mongo(self, batch: List[Dict]) -> Optional[str]:
+        """写入 MongoDB 温存储，成功返回层名称，失败或未启用返回 None"""
+        # Layer 2: MongoDB温存储 (历史数据)，无序批量写入，单条失败不影响其余文档
+        if not (self.mongo_db is not None and self._enable_cold_storage):
+            return None
+        stored_at = datetime.utcnow()
+        ops = [pymongo.InsertOne(dict(detection_data, stored_at=stored_at)) for detection_data in batch]
+        try:
+            self._detections_write.bulk_write(ops, ordered=False)
+        except pymongo.errors.BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            duplicates = sum(1 for err in write_errors if err.get('code') == 11000)
+            self.logger.warning(
+                f"MongoDB 批量写入部分失败: {len(write_errors)} 条 (重复 detection_id {duplicates} 条)"
+            )
+        except Exception as e:
+            self.logger.warning(f"MongoDB 批量写入失败: {e}")
+            return None
+        return 'mongodb'
+    
+    def _write_batch_legacy(self, batch: List[Dict]) -> Optional[str]:
+        """写入兼容数据库，成功返回层名称，失败或未启用返回 None"""
+        # Layer 3: 兼容原有数据库 (可选)
+        if not self.database:
+            return None
+        try:
+            if hasattr(self.database, 'store_detection_result'):
+                # 兼容旧方法名
+                for detection_data in batch:
+                    self.database.store_detection_result(detection_data)
+            elif not self.database.save_detection_results(batch):
+                # 整批事务回滚，逐条重试，只丢弃本身写不进去的记录
+                failed = [d.get('detection_id') for d in batch if not self.database.save_detection_result(d)]
+                if failed:
+                    self.logger.warning(f"兼容数据库逐条重试后仍有 {len(failed)} 条写入失败: {failed}")
+                    if len(failed) == len(batch):
+                        return None
+        except Exception as e:
+            self.logger.warning(f"兼容数据库存储失败: {e}")
+            return None
+        return 'legacy_db'
+    
     def _get_detection_multilayer(self, detection_id: str) -> Optional[Dict]:
         """多层查询检测结果"""
         # Layer 1: 优先从Redis热缓存查询
@@ -634,21 +986,20 @@ class StorageService:
                 redis_data = self.redis_client.get(redis_key)
                 
                 if redis_data:
-                    self.stats['hot_cache_hits'] += 1
-                    return json.loads(redis_data)
+                    self._hot_hits_counter.incr()
+                    return _json_loads(redis_data)
             except Exception as e:
                 self.logger.warning(f"Redis查询失败: {e}")
         
         # Layer 2: 从MongoDB查询
-        if self.mongo_db:
+        if self.mongo_db is not None:
             try:
-                detections_collection = self.mongo_db['detections']
-                result = detections_collection.find_one({'detection_id': detection_id})
+                detections_collection = self.mongo_db_read['detections']
+                # 服务端排除 _id 字段
+                result = detections_collection.find_one({'detection_id': detection_id}, self._NO_ID_PROJECTION)
                 
                 if result:
-                    self.stats['cold_storage_queries'] += 1
-                    # 移除MongoDB的_id字段
-                    result.pop('_id', None)
+                    self._cold_queries_counter.incr()
                     return result
             except Exception as e:
                 self.logger.warning(f"MongoDB查询失败: {e}")
@@ -664,55 +1015,69 @@ class StorageService:
     
     def _get_latest_results(self, limit: int) -> List[Dict]:
         """获取最新检测结果"""
-        results = []
+        return list(self._iter_latest_results(limit))
+    
+    def _iter_latest_results(self, limit: int) -> Iterator[Dict]:
+        """按 MongoDB → Redis → SQLite 顺序逐条产出最新检测结果"""
+        count = 0
         
         # 优先从MongoDB获取最新结果
-        if self.mongo_db:
+        if self.mongo_db is not None:
             try:
-                detections_collection = self.mongo_db['detections']
-                cursor = detections_collection.find().sort('timestamp', -1).limit(limit)
-                
+                detections_collection = self.mongo_db_read['detections']
+                cursor = (
+                    detections_collection.find({}, self._LATEST_PROJECTION)
+                    .hint([('timestamp', -1)])
+                    .sort('timestamp', -1)
+                    .limit(limit)
+                    .batch_size(limit)
+                )
                 for doc in cursor:
-                    doc.pop('_id', None)  # 移除MongoDB的_id字段
-                    results.append(doc)
+                    count += 1
+                    yield doc
                     
             except Exception as e:
                 self.logger.error(f"MongoDB查询最新结果失败: {e}")
         
         # 如果MongoDB没有足够结果，尝试从Redis补充
-        if len(results) < limit and self.redis_client:
+        if count < limit and self.redis_client:
             try:
-                # 获取Redis中的最新检测keys
-                redis_keys = self.redis_client.keys('detection:*')
-                redis_keys.sort(reverse=True)
+                # 从时间索引中按时间倒序取最新的 detection_id
+                detection_ids = self.redis_client.zrevrange(
+                    self.REDIS_DETECTION_INDEX, 0, limit - count - 1
+                )
                 
-                for key in redis_keys[:limit - len(results)]:
-                    redis_data = self.redis_client.get(key)
-                    
-                    if redis_data:
-                        results.append(json.loads(redis_data))
+                # 一次 MGET 取回所有文档，已过期的键返回 None
+                if detection_ids:
+                    values = self.redis_client.mget([f"detection:{i}" for i in detection_ids])
+                    for redis_data in values:
+                        if redis_data:
+                            count += 1
+                            yield _json_loads(redis_data)
             except Exception as e:
                 self.logger.warning(f"Redis查询最新结果失败: {e}")
         
         # 如果仍不足，尝试从兼容SQLite数据库读取
-        if len(results) < limit and self.database:
+        if count < limit and self.database:
             try:
-                legacy_results = self.database.get_latest_results(limit - len(results))
-                # SQLite 返回无 _id 字段
-                results.extend(legacy_results)
+                # SQLite 返回无 _id 字段；走带短 TTL 缓存的查询，仪表盘并发轮询时共享结果
+                yield from self.database.get_latest_results(limit - count)
             except Exception as e:
                 self.logger.warning(f"SQLite 查询最新结果失败: {e}")
-        
-        return results
     
     def _get_stream_results(self, stream_id: str, limit: int, offset: int, 
                            start_time: Optional[float], end_time: Optional[float]) -> List[Dict]:
         """获取指定流的检测结果"""
-        results = []
+        return list(self._iter_stream_results(stream_id, limit, offset, start_time, end_time))
+    
+    def _iter_stream_results(self, stream_id: str, limit: int, offset: int,
+                             start_time: Optional[float], end_time: Optional[float]) -> Iterator[Dict]:
+        """逐条产出指定流的检测结果"""
+        count = 0
         
-        if self.mongo_db:
+        if self.mongo_db is not None:
             try:
-                detections_collection = self.mongo_db['detections']
+                detections_collection = self.mongo_db_read['detections']
                 
                 # 构建查询条件
                 query = {'stream_id': stream_id}
@@ -726,25 +1091,41 @@ class StorageService:
                     query['timestamp'] = time_query
                 
                 # 执行查询
-                cursor = detections_collection.find(query).sort('timestamp', -1).skip(offset).limit(limit)
+                cursor = (
+                    detections_collection.find(query, self._NO_ID_PROJECTION)
+                    .sort('timestamp', -1).skip(offset).limit(limit)
+                )
                 
                 for doc in cursor:
-                    doc.pop('_id', None)
-                    results.append(doc)
+                    count += 1
+                    yield doc
                     
             except Exception as e:
                 self.logger.error(f"MongoDB流查询失败: {e}")
         
         # 如果MongoDB未启用，则直接从SQLite查询
-        if not results and self.database:
+        if not count and self.database:
             try:
-                all_legacy = self.database.get_latest_results(limit + offset, stream_id)
-                # 简易分页
-                results = all_legacy[offset:offset+limit]
+                if offset:
+                    # 翻页请求分页下推到 SQL (LIMIT/OFFSET)，逐行产出
+                    yield from self.database.get_latest_results_iter(limit, stream_id, offset)
+                else:
+                    # 首页是高频轮询路径，走带短 TTL 缓存的查询
+                    yield from self.database.get_latest_results(limit, stream_id)
             except Exception as e:
                 self.logger.warning(f"SQLite 流查询失败: {e}")
+    
+    def _stream_json_response(self, head: Dict, results: Iterable[Dict]) -> Response:
+        """以流式 JSON 返回 {**head, "results": [...], "count": n}，边读游标边输出，不整体物化结果列表"""
+        def generate():
+            yield _json_dumps(head)[:-1] + b',"results":['
+            count = 0
+            for doc in results:
+                yield (b',' if count else b'') + _json_dumps(doc)
+                count += 1
+            yield b'],"count":%d}' % count
         
-        return results
+        return Response(stream_with_context(generate()), mimetype='application/json')
     
     def _get_summary_statistics(self, period: str) -> Dict:
         """获取汇总统计"""
@@ -756,46 +1137,30 @@ class StorageService:
             'hourly_distribution': {}
         }
         
-        # 计算时间范围
-        end_time = datetime.utcnow()
-        if period == '24h':
-            start_time = end_time - timedelta(hours=24)
-        elif period == '7d':
-            start_time = end_time - timedelta(days=7)
-        elif period == '30d':
-            start_time = end_time - timedelta(days=30)
-        else:
-            start_time = end_time - timedelta(hours=24)
+        # 计算时间范围（epoch 秒，与存储的 timestamp 一致）
+        end_ts = time.time()
+        start_ts = end_ts - self._PERIOD_SECONDS.get(period, 86400)
         
-        if self.mongo_db:
+        if self.mongo_db is not None:
             try:
-                detections_collection = self.mongo_db['detections']
+                detections_collection = self.mongo_db_read['detections']
                 
                 # 总检测数
                 total_count = detections_collection.count_documents({
                     'timestamp': {
-                        '$gte': start_time.timestamp(),
-                        '$lte': end_time.timestamp()
+                        '$gte': start_ts,
+                        '$lte': end_ts
                     }
-                })
+                }, hint=[('timestamp', -1)])
                 stats['total_detections'] = total_count
                 
-                # 唯一流数
-                unique_streams = detections_collection.distinct('stream_id', {
-                    'timestamp': {
-                        '$gte': start_time.timestamp(),
-                        '$lte': end_time.timestamp()
-                    }
-                })
-                stats['unique_streams'] = len(unique_streams)
-                
-                # 按流分布统计
+                # 按流分布统计: 单次 $match + $group，唯一流数直接取分组数，不再额外 distinct 扫描
                 pipeline = [
                     {
                         '$match': {
                             'timestamp': {
-                                '$gte': start_time.timestamp(),
-                                '$lte': end_time.timestamp()
+                                '$gte': start_ts,
+                                '$lte': end_ts
                             }
                         }
                     },
@@ -807,33 +1172,51 @@ class StorageService:
                     }
                 ]
                 
-                for result in detections_collection.aggregate(pipeline):
+                # (timestamp, stream_id, ...) 复合索引同时覆盖 $match 和 $group 键，聚合只读索引
+                for result in detections_collection.aggregate(pipeline, hint=self.SUMMARY_INDEX):
                     stats['detection_distribution'][result['_id']] = result['count']
+                stats['unique_streams'] = len(stats['detection_distribution'])
                 
             except Exception as e:
                 self.logger.error(f"统计查询失败: {e}")
+        else:
+            # 无 MongoDB 时唯一流数使用 Redis HyperLogLog 近似计数
+            unique_count = self._count_unique_streams_hll(start_ts, end_ts)
+            if unique_count is not None:
+                stats['unique_streams'] = unique_count
         
         return stats
     
+    def _count_unique_streams_hll(self, start_ts: float, end_ts: float) -> Optional[int]:
+        """用按天 HyperLogLog 合并计数时间范围内的唯一流（按整天粒度，约 0.81% 误差）；Redis 不可用时返回 None"""
+        if not self.redis_client or not self._enable_hot_cache:
+            return None
+        try:
+            day_keys = [f"{self.REDIS_STREAMS_HLL_PREFIX}{day}"
+                        for day in range(int(start_ts // 86400), int(end_ts // 86400) + 1)]
+            return self.redis_client.pfcount(*day_keys)
+        except Exception as e:
+            self.logger.debug(f"Redis HyperLogLog 计数失败: {e}")
+            return None
+    
     def _get_active_streams(self) -> List[Dict]:
         """获取活跃流列表"""
         streams = []
         
         if self.redis_client:
             try:
-                # 从Redis获取最近活跃的流
-                stream_keys = self.redis_client.keys('stream:*:latest')
+                # 从Redis获取最近活跃的流: SCAN 增量遍历（不阻塞 Redis），每批键一次 MGET
+                stream_keys = list(self.redis_client.scan_iter(match='stream:*:latest', count=1000))
                 
-                for key in stream_keys:
-                    stream_id = key.split(':')[1]
-                    last_detection_time = self.redis_client.get(key)
-                    
-                    if last_detection_time:
-                        streams.append({
-                            'stream_id': stream_id,
-                            'last_detection_time': float(last_detection_time),
-                            'status': 'active'
-                        })
+                for start in range(0, len(stream_keys), 1000):
+                    chunk = stream_keys[start:start + 1000]
+                    for key, last_detection_time in zip(chunk, self.redis_client.mget(chunk)):
+                        if last_detection_time:
+                            streams.append({
+                                'stream_id': key[7:-7],  # 去掉 'stream:' 前缀与 ':latest' 后缀
+                                'last_detection_time': float(last_detection_time),
+                                'status': 'active'
+                            })
                         
             except Exception as e:
                 self.logger.error(f"获取活跃流失败: {e}")
@@ -867,16 +1250,17 @@ class StorageService:
         
         try:
             # MongoDB数据归档
-            if self.mongo_db:
+            if self.mongo_db is not None:
                 archive_threshold = self.config.get('storage', {}).get('archive_threshold_days', 90)
-                archive_time = datetime.utcnow() - timedelta(days=archive_threshold)
+                archive_ts = time.time() - archive_threshold * 86400
                 
                 detections_collection = self.mongo_db['detections']
+                archive_query = {'timestamp': {'$lt': archive_ts}}
                 
-                # 统计要归档的数据
-                archive_count = detections_collection.count_documents({
-                    'timestamp': {'$lt': archive_time.timestamp()}
-                })
+                # 先用 limit=1 判断是否存在过期数据，存在时再走 timestamp 索引精确计数
+                archive_count = 0
+                if detections_collection.count_documents(archive_query, limit=1, hint=[('timestamp', -1)]):
+                    archive_count = detections_collection.count_documents(archive_query, hint=[('timestamp', -1)])
                 
                 if archive_count > 0:
                     # 可以在这里实现数据归档逻辑
@@ -893,15 +1277,20 @@ class StorageService:
     
     def get_stats(self) -> Dict[str, Any]:
         """获取存储服务统计信息"""
-        storage_usage = 0
+        # 计算存储使用量: dbStats 代价较高，结果缓存 dbstats_cache_ttl 秒
+        if self.mongo_db is not None:
+            now = time.monotonic()
+            if now - self._dbstats_checked_at >= self._dbstats_cache_ttl:
+                self._dbstats_checked_at = now
+                try:
+                    db_stats = self.mongo_db.command("dbStats")
+                    self.stats['storage_usage_mb'] = db_stats.get('dataSize', 0) / 1024 / 1024  # MB
+                except Exception:
+                    pass
+        storage_usage = self.stats['storage_usage_mb']
         
-        # 计算存储使用量
-        if self.mongo_db:
-            try:
-                db_stats = self.mongo_db.command("dbStats")
-                storage_usage = db_stats.get('dataSize', 0) / 1024 / 1024  # MB
-            except Exception:
-                pass
+        hot_cache_hits = self._hot_hits_counter.value
+        cold_storage_queries = self._cold_queries_counter.value
         
         return {
             'service': 'storage',
@@ -911,15 +1300,15 @@ class StorageService:
                 'mongodb_connected': self.mongo_client is not None
             },
             'storage': {
-                'total_records': self.stats['total_records'],
-                'hot_cache_hits': self.stats['hot_cache_hits'],
-                'cold_storage_queries': self.stats['cold_storage_queries'],
+                'total_records': self._total_records(),
+                'hot_cache_hits': hot_cache_hits,
+                'cold_storage_queries': cold_storage_queries,
                 'storage_usage_mb': storage_usage
             },
             'performance': {
                 'cache_hit_rate': (
-                    self.stats['hot_cache_hits'] / 
-                    max(1, self.stats['hot_cache_hits'] + self.stats['cold_storage_queries'])
+                    hot_cache_hits / 
+                    max(1, hot_cache_hits + cold_storage_queries)
                 ) * 100
             },
             'timestamp': time.time()
@@ -936,6 +1325,13 @@ class StorageService:
         self.logger.info(f"Redis状态: {'启用' if self.redis_client else '禁用'}")
         self.logger.info(f"MongoDB状态: {'启用' if self.mongo_client else '禁用'}")
         
+        if USE_GEVENT and not debug:
+            # 协程服务器: 大量并发请求的 Redis/MongoDB I/O 等待可以相互重叠
+            from gevent.pywsgi import WSGIServer
+            self.logger.info("使用 gevent WSGIServer")
+            WSGIServer((host, port), self.app).serve_forever()
+            return
+        
         self.app.run(
             host=host,
             port=port,
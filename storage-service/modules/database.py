@@ -5,56 +5,204 @@
 负责检测结果的存储和查询
 """
 
+import os
+import copy
 import sqlite3
 import json
+import heapq
+import struct
 import time
 import threading
-from typing import List, Dict, Optional, Any
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Iterator
 from contextlib import contextmanager
 import logging
 
+# 可选: orjson 加速 JSON 编解码，未安装时回退到标准库 json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _json_text(obj: Any) -> str:
+    """编码为 JSON 文本（保留非 ASCII 字符，写入 TEXT 列）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
+
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# 可选: msgpack 二进制存储 detections，未安装时仍写入 JSON 文本列
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+# 预定义插入语句，sqlite3 按 SQL 文本缓存已编译语句，保持文本不变即可复用
+_INSERT_DETECTION_SQL = '''
+    INSERT INTO detection_results (
+        stream_id, stream_name, timestamp, processing_time,
+        total_objects, detections, frame_shape, frame_path,
+        detections_mp, frame_shape_mp
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def _pack_frame_shape(shape) -> Optional[bytes]:
+    """帧尺寸编码为小端 int32 序列（[720, 1280, 3] -> 12 字节），非整数尺寸返回 None"""
+    if not shape or not all(isinstance(v, int) for v in shape):
+        return None
+    return struct.pack(f'<{len(shape)}i', *shape)
+
+
+def _unpack_frame_shape(data: bytes) -> List[int]:
+    return list(struct.unpack(f'<{len(data) // 4}i', data))
+
+
+def _detection_row(result: Dict) -> tuple:
+    """将检测结果字典转换为 INSERT 参数元组
+
+    JSON 文本列始终写入，保持旧读取方与 json_each 类别查询可用；msgpack 可用时另写
+    detections_mp BLOB 列，frame_shape 另写 frame_shape_mp 定长二进制列，读取时优先使用。
+    """
+    detections = result.get('detections', [])
+    frame_shape = result.get('frame_shape')
+    detections_mp = msgpack.packb(detections, use_bin_type=True) if MSGPACK_AVAILABLE else None
+    frame_shape_mp = _pack_frame_shape(frame_shape)
+    return (
+        result.get('stream_id'),
+        result.get('stream_name'),
+        result.get('timestamp'),
+        result.get('processing_time'),
+        result.get('total_objects', 0),
+        _json_text(detections),
+        _json_text(frame_shape) if frame_shape else None,
+        result.get('frame_path'),
+        detections_mp,
+        frame_shape_mp
+    )
+
+
+_UPSERT_STREAM_CONFIG_SQL = '''
+    INSERT OR REPLACE INTO stream_configs (
+        stream_id, name, url, type, risk_level, description, enabled, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+'''
+
+
+def _stream_config_row(config: Dict) -> tuple:
+    """将视频流配置字典转换为 INSERT 参数元组"""
+    return (
+        config.get('stream_id'),
+        config.get('name'),
+        config.get('url'),
+        config.get('type', 'file'),
+        config.get('risk_level', '中'),
+        config.get('description', ''),
+        config.get('enabled', True)
+    )
+
+
+# 列表查询的显式投影: 头部列始终返回，detections/frame_shape 仅在需要详情时读取
+_RESULT_HEADER_COLUMNS = 'id, stream_id, stream_name, timestamp, processing_time, total_objects, frame_path, created_at'
+_RESULT_DETAIL_COLUMNS = _RESULT_HEADER_COLUMNS + ', detections, frame_shape, detections_mp, frame_shape_mp'
+
+
+def _result_columns(include_detections: bool) -> str:
+    return _RESULT_DETAIL_COLUMNS if include_detections else _RESULT_HEADER_COLUMNS
+
+
+def _row_timestamp(row: tuple) -> float:
+    """结果行元组中的 timestamp（第 4 列），用于多分片归并排序"""
+    return row[3]
+
+
+def _row_to_result(row: tuple, include_detections: bool = True) -> Dict:
+    """将 detection_results 行（按 _RESULT_*_COLUMNS 顺序的元组）转换为检测结果字典"""
+    id_, stream_id, stream_name, timestamp, processing_time, total_objects, frame_path, created_at = row[:8]
+    result = {
+        'id': id_,
+        'stream_id': stream_id,
+        'stream_name': stream_name,
+        'timestamp': timestamp,
+        'processing_time': processing_time,
+        'total_objects': total_objects,
+        'frame_path': frame_path,
+        'created_at': created_at
+    }
+    if include_detections:
+        detections, frame_shape, detections_mp, frame_shape_mp = row[8:]
+        # 优先读取二进制列；旧数据或未安装 msgpack 时回退到始终写入的 JSON 文本列
+        if detections_mp is not None and MSGPACK_AVAILABLE:
+            result['detections'] = msgpack.unpackb(detections_mp, raw=False)
+        else:
+            result['detections'] = _json_loads(detections) if detections else []
+        if frame_shape_mp is not None:
+            result['frame_shape'] = _unpack_frame_shape(frame_shape_mp)
+        else:
+            result['frame_shape'] = _json_loads(frame_shape) if frame_shape else None
+    return result
+
 class DatabaseManager:
-    """数据库管理器"""
+    """数据库管理器
+
+    shards > 1 时检测结果按 stream_id 的 CRC32 分散到多个 SQLite 文件
+    (results_shard0.db ...)，各分片独立加写锁；流配置与流状态仍在主库。
+    返回的结果 id 为 分片内自增 id * 分片数 + 分片序号，跨分片全局唯一（单分片时即原 id）。
+    分片数记录在主库 db_meta 表中，与已有数据不一致时拒绝启动（ValueError），
+    调整分片数需先导出并清空检测结果。
+    """
     
-    def __init__(self, db_path: str = "results.db"):
+    # 统计信息缓存时间（秒），并发轮询共享同一次查询结果
+    STATS_TTL = 5.0
+    # 最新结果查询缓存: 有效期（秒）与最大条目数，写入对应流时失效
+    LATEST_CACHE_TTL = 0.5
+    LATEST_CACHE_SIZE = 256
+    
+    def __init__(self, db_path: str = "results.db", shards: int = 1):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
         self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats_cache = (0.0, None)
+        # (stream_id, limit, include_detections) -> (缓存时间, 结果列表)，按 LRU 淘汰
+        self._latest_cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._latest_cache_lock = threading.Lock()
+        # 写入失效计数: 查询期间发生过失效则不回填缓存，避免旧结果覆盖新写入
+        self._latest_generation = 0
+        
+        # 检测结果分片文件；单分片时即主库
+        if shards > 1:
+            base, ext = os.path.splitext(db_path)
+            self._shard_paths = [f"{base}_shard{i}{ext or '.db'}" for i in range(shards)]
+            self._shard_pool = ThreadPoolExecutor(max_workers=shards, thread_name_prefix='sqlite-shard')
+        else:
+            self._shard_paths = [db_path]
+            self._shard_pool = None
+        self._shard_index = {path: i for i, path in enumerate(self._shard_paths)}
         self._init_database()
     
     def _init_database(self):
         """初始化数据库表"""
         try:
+            self._check_shard_count()
+            for shard_path in self._shard_paths:
+                with self.get_connection(shard_path) as conn:
+                    self._init_detection_table(conn.cursor())
+                    conn.commit()
+            
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # 检测结果表
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS detection_results (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        stream_id TEXT NOT NULL,
-                        stream_name TEXT,
-                        timestamp REAL NOT NULL,
-                        processing_time REAL,
-                        total_objects INTEGER DEFAULT 0,
-                        detections TEXT,  -- JSON格式存储检测详情
-                        frame_shape TEXT, -- JSON格式存储帧尺寸
-                        frame_path TEXT,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # 创建索引
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_stream_timestamp 
-                    ON detection_results(stream_id, timestamp DESC)
-                ''')
-                
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_timestamp
-                    ON detection_results(timestamp DESC)
-                ''')
-                
                 # 流状态表
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS stream_status (
@@ -90,6 +238,11 @@ class DatabaseManager:
                     ON stream_configs(enabled)
                 ''')
                 
+                cursor.execute(
+                    "INSERT OR IGNORE INTO db_meta (key, value) VALUES ('detection_shards', ?)",
+                    (str(len(self._shard_paths)),)
+                )
+                
                 conn.commit()
                 self.logger.info("数据库初始化完成")
                 
@@ -97,181 +250,335 @@ class DatabaseManager:
             self.logger.error(f"数据库初始化失败: {e}")
             raise
     
-    @contextmanager
-    def get_connection(self):
-        """获取数据库连接（线程安全）"""
-        if not hasattr(self._local, 'connection'):
-            self._local.connection = sqlite3.connect(
-                self.db_path, 
-                check_same_thread=False,
-                timeout=10.0
+    def _check_shard_count(self):
+        """校验分片数与已有数据一致: 分片数变化后 CRC32 路由改变，旧结果会被孤立且 id 编码冲突"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS db_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            row = cursor.execute("SELECT value FROM db_meta WHERE key = 'detection_shards'").fetchone()
+            if row is not None:
+                stored = int(row['value'])
+            else:
+                # 旧库未记录分片数: 主库已有检测结果说明此前为单分片
+                has_results = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'detection_results'"
+                ).fetchone() and cursor.execute('SELECT 1 FROM detection_results LIMIT 1').fetchone()
+                stored = 1 if has_results else len(self._shard_paths)
+            conn.commit()
+        
+        if stored != len(self._shard_paths):
+            raise ValueError(
+                f"检测结果分片数不一致: 数据库为 {stored}，配置为 {len(self._shard_paths)}；"
+                f"请恢复 sqlite_shards={stored}，或导出并清空检测结果后再调整"
             )
-            self._local.connection.row_factory = sqlite3.Row
+    
+    def _init_detection_table(self, cursor):
+        """创建检测结果表及索引"""
+        # 检测结果表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS detection_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stream_id TEXT NOT NULL,
+                stream_name TEXT,
+                timestamp REAL NOT NULL,
+                processing_time REAL,
+                total_objects INTEGER DEFAULT 0,
+                detections TEXT,  -- JSON格式存储检测详情
+                frame_shape TEXT, -- JSON格式存储帧尺寸
+                frame_path TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                detections_mp BLOB,  -- msgpack 格式检测详情
+                frame_shape_mp BLOB  -- 小端 int32 帧尺寸
+            )
+        ''')
+        
+        # 旧库迁移: 补充二进制列
+        existing = {row['name'] for row in cursor.execute('PRAGMA table_info(detection_results)')}
+        for column in ('detections_mp', 'frame_shape_mp'):
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE detection_results ADD COLUMN {column} BLOB')
+        
+        # 创建索引
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_stream_timestamp 
+            ON detection_results(stream_id, timestamp DESC)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_timestamp
+            ON detection_results(timestamp DESC)
+        ''')
+    
+    @contextmanager
+    def get_connection(self, path: Optional[str] = None):
+        """获取数据库连接（线程安全）；path 为分片文件路径，默认主库"""
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+            self._local.insert_cursors = {}
+        path = path or self.db_path
+        conn = connections.get(path)
+        if conn is None:
+            conn = self._create_connection(path)
         
         try:
-            yield self._local.connection
+            yield conn
         except Exception as e:
-            self._local.connection.rollback()
+            conn.rollback()
             raise
     
+    def _create_connection(self, path: str) -> sqlite3.Connection:
+        """创建当前线程到 path 的连接并设置 PRAGMA"""
+        conn = sqlite3.connect(
+            path, 
+            check_same_thread=False,
+            timeout=10.0
+        )
+        conn.row_factory = sqlite3.Row
+        # WAL 允许读写并发；synchronous=NORMAL 在 WAL 下无需每次提交都 fsync
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        # 64MB 页缓存、256MB 内存映射读取、临时表放内存，约每 1000 页自动检查点
+        conn.execute('PRAGMA cache_size=-65536')
+        conn.execute('PRAGMA mmap_size=268435456')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA wal_autocheckpoint=1000')
+        # 写入路径复用的长生命周期游标（每线程每个文件一个）
+        self._local.insert_cursors[path] = conn.cursor()
+        self._local.connections[path] = conn
+        return conn
+    
+    def _shard_path(self, stream_id: Optional[str]) -> str:
+        """按 stream_id 路由到分片文件（CRC32 跨进程稳定）"""
+        if len(self._shard_paths) == 1:
+            return self._shard_paths[0]
+        return self._shard_paths[zlib.crc32((stream_id or '').encode('utf-8')) % len(self._shard_paths)]
+    
+    def _map_shards(self, func) -> List[Any]:
+        """对每个分片执行 func(分片路径)，多分片时并发执行"""
+        if self._shard_pool is None:
+            return [func(path) for path in self._shard_paths]
+        return list(self._shard_pool.map(func, self._shard_paths))
+    
     def save_detection_result(self, result: Dict) -> bool:
         """保存检测结果"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    INSERT INTO detection_results (
-                        stream_id, stream_name, timestamp, processing_time,
-                        total_objects, detections, frame_shape, frame_path
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    result.get('stream_id'),
-                    result.get('stream_name'),
-                    result.get('timestamp'),
-                    result.get('processing_time'),
-                    result.get('total_objects', 0),
-                    json.dumps(result.get('detections', []), ensure_ascii=False),
-                    json.dumps(result.get('frame_shape'), ensure_ascii=False) if result.get('frame_shape') else None,
-                    result.get('frame_path')
-                ))
-                
+            path = self._shard_path(result.get('stream_id'))
+            with self.get_connection(path) as conn:
+                self._local.insert_cursors[path].execute(_INSERT_DETECTION_SQL, _detection_row(result))
                 conn.commit()
+                self._invalidate_latest({result.get('stream_id')})
                 return True
                 
         except Exception as e:
             self.logger.error(f"保存检测结果失败: {e}")
             return False
     
-    def get_latest_results(self, limit: int = 100, stream_id: Optional[str] = None) -> List[Dict]:
-        """获取最新检测结果"""
+    def save_detection_results(self, results: List[Dict]) -> bool:
+        """批量保存检测结果（每个分片单事务 executemany）"""
+        if not results:
+            return True
+        
+        rows_by_shard: Dict[str, List[tuple]] = {}
+        for r in results:
+            rows_by_shard.setdefault(self._shard_path(r.get('stream_id')), []).append(_detection_row(r))
+        
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                if stream_id:
-                    query = '''
-                        SELECT * FROM detection_results 
-                        WHERE stream_id = ? 
-                        ORDER BY timestamp DESC 
-                        LIMIT ?
-                    '''
-                    cursor.execute(query, (stream_id, limit))
-                else:
-                    query = '''
-                        SELECT * FROM detection_results 
-                        ORDER BY timestamp DESC 
-                        LIMIT ?
-                    '''
-                    cursor.execute(query, (limit,))
-                
-                rows = cursor.fetchall()
-                results = []
-                
-                for row in rows:
-                    result = {
-                        'id': row['id'],
-                        'stream_id': row['stream_id'],
-                        'stream_name': row['stream_name'],
-                        'timestamp': row['timestamp'],
-                        'processing_time': row['processing_time'],
-                        'total_objects': row['total_objects'],
-                        'detections': json.loads(row['detections']) if row['detections'] else [],
-                        'frame_shape': json.loads(row['frame_shape']) if row['frame_shape'] else None,
-                        'frame_path': row['frame_path'],
-                        'created_at': row['created_at']
-                    }
-                    results.append(result)
-                
-                return results
+            for path, rows in rows_by_shard.items():
+                with self.get_connection(path) as conn:
+                    self._local.insert_cursors[path].executemany(_INSERT_DETECTION_SQL, rows)
+                    conn.commit()
+            self._invalidate_latest({r.get('stream_id') for r in results})
+            return True
                 
+        except Exception as e:
+            self.logger.error(f"批量保存检测结果失败: {e}")
+            return False
+    
+    def _shard_columns(self, path: str, include_detections: bool) -> str:
+        """分片查询的投影: 多分片时将分片内自增 id 编码为全局唯一 id"""
+        columns = _result_columns(include_detections)
+        count = len(self._shard_paths)
+        if count == 1:
+            return columns
+        return f'id * {count} + {self._shard_index[path]} AS id' + columns[len('id'):]
+    
+    def _tuple_cursor(self, conn) -> sqlite3.Cursor:
+        """返回按位置取值的游标（不经 sqlite3.Row 按列名查找）"""
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        return cursor
+    
+    def _iter_results(self, cursor, include_detections: bool = True) -> Iterator[Dict]:
+        """逐行产出检测结果，不一次性物化整个结果集"""
+        for row in cursor:
+            yield _row_to_result(row, include_detections)
+    
+    def _invalidate_latest(self, stream_ids: Optional[set] = None):
+        """写入后失效最新结果缓存: 涉及的流及不区分流的查询；stream_ids 为 None 时全部清空"""
+        with self._latest_cache_lock:
+            self._latest_generation += 1
+            if stream_ids is None:
+                self._latest_cache.clear()
+                return
+            stream_ids = stream_ids | {None}
+            for key in [k for k in self._latest_cache if k[0] in stream_ids]:
+                del self._latest_cache[key]
+    
+    def get_latest_results(self, limit: int = 100, stream_id: Optional[str] = None,
+                           include_detections: bool = True) -> List[Dict]:
+        """获取最新检测结果（include_detections=False 时只返回头部字段）
+
+        结果在 LATEST_CACHE_TTL 内复用，仪表盘高频轮询同一流时不重复查询；返回的是缓存结果的
+        深拷贝，调用方修改 detections 等嵌套字段也不影响缓存。
+        """
+        key = (stream_id or None, limit, include_detections)
+        now = time.monotonic()
+        with self._latest_cache_lock:
+            entry = self._latest_cache.get(key)
+            if entry is not None and now - entry[0] < self.LATEST_CACHE_TTL:
+                self._latest_cache.move_to_end(key)
+                return copy.deepcopy(entry[1])
+            generation = self._latest_generation
+        
+        try:
+            results = list(self.get_latest_results_iter(limit, stream_id, include_detections=include_detections))
         except Exception as e:
             self.logger.error(f"获取检测结果失败: {e}")
             return []
+        
+        with self._latest_cache_lock:
+            # 查询期间有写入使缓存失效时，本次结果可能已过期，不回填
+            if generation == self._latest_generation:
+                self._latest_cache[key] = (now, results)
+                self._latest_cache.move_to_end(key)
+                if len(self._latest_cache) > self.LATEST_CACHE_SIZE:
+                    self._latest_cache.popitem(last=False)
+        return copy.deepcopy(results)
     
-    def get_results_by_time_range(self, start_time: float, end_time: float, 
-                                  stream_id: Optional[str] = None) -> List[Dict]:
-        """根据时间范围获取检测结果"""
-        try:
+    def get_latest_results_iter(self, limit: int = 100, stream_id: Optional[str] = None,
+                                offset: int = 0, include_detections: bool = True) -> Iterator[Dict]:
+        """按时间倒序逐条产出最新检测结果（供流式响应使用）"""
+        if stream_id:
+            path = self._shard_path(stream_id)
+            with self.get_connection(path) as conn:
+                query = f'''
+                    SELECT {self._shard_columns(path, include_detections)} FROM detection_results 
+                    WHERE stream_id = ? 
+                    ORDER BY timestamp DESC 
+                    LIMIT ? OFFSET ?
+                '''
+                cursor = self._tuple_cursor(conn).execute(query, (stream_id, limit, offset))
+            return self._iter_results(cursor, include_detections)
+        
+        query = '''
+            SELECT {columns} FROM detection_results 
+            ORDER BY timestamp DESC 
+            LIMIT ? OFFSET ?
+        '''
+        if len(self._shard_paths) == 1:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
+                cursor = self._tuple_cursor(conn).execute(
+                    query.format(columns=_result_columns(include_detections)), (limit, offset)
+                )
+            return self._iter_results(cursor, include_detections)
+        
+        # 多分片: 各分片取前 offset+limit 条（已按时间倒序），归并后再分页
+        cursors = []
+        for path in self._shard_paths:
+            with self.get_connection(path) as conn:
+                cursors.append(self._tuple_cursor(conn).execute(
+                    query.format(columns=self._shard_columns(path, include_detections)), (offset + limit, 0)
+                ))
+        merged = heapq.merge(*cursors, key=_row_timestamp, reverse=True)
+        return self._iter_results(islice(merged, offset, offset + limit), include_detections)
+    
+    def get_results_by_time_range(self, start_time: float, end_time: float, 
+                                  stream_id: Optional[str] = None,
+                                  include_detections: bool = True) -> List[Dict]:
+        """根据时间范围获取检测结果（include_detections=False 时只返回头部字段）"""
+        def query_shard(path: str) -> List[tuple]:
+            columns = self._shard_columns(path, include_detections)
+            with self.get_connection(path) as conn:
+                cursor = self._tuple_cursor(conn)
                 
                 if stream_id:
-                    query = '''
-                        SELECT * FROM detection_results 
+                    query = f'''
+                        SELECT {columns} FROM detection_results 
                         WHERE stream_id = ? AND timestamp BETWEEN ? AND ?
                         ORDER BY timestamp DESC
                     '''
                     cursor.execute(query, (stream_id, start_time, end_time))
                 else:
-                    query = '''
-                        SELECT * FROM detection_results 
+                    query = f'''
+                        SELECT {columns} FROM detection_results 
                         WHERE timestamp BETWEEN ? AND ?
                         ORDER BY timestamp DESC
                     '''
                     cursor.execute(query, (start_time, end_time))
                 
-                rows = cursor.fetchall()
-                results = []
-                
-                for row in rows:
-                    result = {
-                        'id': row['id'],
-                        'stream_id': row['stream_id'],
-                        'stream_name': row['stream_name'],
-                        'timestamp': row['timestamp'],
-                        'processing_time': row['processing_time'],
-                        'total_objects': row['total_objects'],
-                        'detections': json.loads(row['detections']) if row['detections'] else [],
-                        'frame_shape': json.loads(row['frame_shape']) if row['frame_shape'] else None,
-                        'frame_path': row['frame_path'],
-                        'created_at': row['created_at']
-                    }
-                    results.append(result)
-                
-                return results
+                return cursor.fetchall()
+        
+        try:
+            if stream_id:
+                rows = query_shard(self._shard_path(stream_id))
+            else:
+                # 各分片并发查询，结果均已按时间倒序，归并即可
+                rows = heapq.merge(*self._map_shards(query_shard), key=_row_timestamp, reverse=True)
+            return list(self._iter_results(rows, include_detections))
                 
         except Exception as e:
             self.logger.error(f"获取时间范围检测结果失败: {e}")
             return []
     
     def get_statistics(self) -> Dict:
-        """获取统计信息"""
+        """获取统计信息（TTL 缓存 + 单飞: 缓存过期时只有一个线程执行查询，其余线程等待后复用结果）"""
+        cached_at, stats = self._stats_cache
+        if stats is not None and time.time() - cached_at < self.STATS_TTL:
+            return dict(stats)
+        
+        with self._stats_lock:
+            # 获得锁后再次检查，等待期间其他线程可能已刷新缓存
+            cached_at, stats = self._stats_cache
+            if stats is None or time.time() - cached_at >= self.STATS_TTL:
+                stats = self._query_statistics()
+                self._stats_cache = (time.time(), stats)
+        return dict(stats)
+    
+    def _query_statistics(self) -> Dict:
+        """查询统计信息（每个分片一条条件聚合语句，结果在 Python 侧合并）"""
+        one_hour_ago = time.time() - 3600
+        
+        def query_shard(path: str) -> tuple:
+            with self.get_connection(path) as conn:
+                return tuple(conn.execute('''
+                    SELECT
+                        COUNT(*),
+                        COALESCE(SUM(total_objects), 0),
+                        COALESCE(SUM(CASE WHEN timestamp > ? THEN 1 ELSE 0 END), 0),
+                        COALESCE(SUM(processing_time), 0),
+                        COUNT(processing_time),
+                        COUNT(DISTINCT stream_id)
+                    FROM detection_results
+                ''', (one_hour_ago,)).fetchone())
+        
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # 总检测结果数
-                cursor.execute('SELECT COUNT(*) as total FROM detection_results')
-                total_results = cursor.fetchone()['total']
-                
-                # 总检测对象数
-                cursor.execute('SELECT SUM(total_objects) as total FROM detection_results')
-                total_objects = cursor.fetchone()['total'] or 0
-                
-                # 最近1小时的结果数
-                one_hour_ago = time.time() - 3600
-                cursor.execute(
-                    'SELECT COUNT(*) as recent FROM detection_results WHERE timestamp > ?',
-                    (one_hour_ago,)
-                )
-                recent_results = cursor.fetchone()['recent']
-                
-                # 平均处理时间
-                cursor.execute('SELECT AVG(processing_time) as avg_time FROM detection_results')
-                avg_processing_time = cursor.fetchone()['avg_time'] or 0
-                
-                # 活跃流数量
-                cursor.execute('SELECT COUNT(DISTINCT stream_id) as streams FROM detection_results')
-                unique_streams = cursor.fetchone()['streams']
-                
-                return {
-                    'total_results': total_results,
-                    'total_objects': total_objects,
-                    'recent_results': recent_results,
-                    'avg_processing_time': avg_processing_time,
-                    'unique_streams': unique_streams
-                }
+            # 同一 stream_id 只落在一个分片，唯一流数可直接相加
+            total, total_objects, recent, time_sum, time_count, streams = (
+                sum(column) for column in zip(*self._map_shards(query_shard))
+            )
+            return {
+                'total_results': total,
+                'total_objects': total_objects,
+                'recent_results': recent,
+                'avg_processing_time': time_sum / time_count if time_count else 0,
+                'unique_streams': streams
+            }
                 
         except Exception as e:
             self.logger.error(f"获取统计信息失败: {e}")
@@ -286,8 +593,8 @@ class DatabaseManager:
     def clear_results(self, stream_id: Optional[str] = None, 
                      before_timestamp: Optional[float] = None) -> int:
         """清除检测结果"""
-        try:
-            with self.get_connection() as conn:
+        def clear_shard(path: str) -> int:
+            with self.get_connection(path) as conn:
                 cursor = conn.cursor()
                 
                 if stream_id and before_timestamp:
@@ -308,41 +615,65 @@ class DatabaseManager:
                 else:
                     cursor.execute('DELETE FROM detection_results')
                 
-                deleted_count = cursor.rowcount
+                deleted = cursor.rowcount
                 conn.commit()
-                
-                self.logger.info(f"已清除 {deleted_count} 条检测结果")
-                return deleted_count
+                return deleted
+        
+        try:
+            if stream_id:
+                deleted_count = clear_shard(self._shard_path(stream_id))
+            else:
+                deleted_count = sum(self._map_shards(clear_shard))
+            self._stats_cache = (0.0, None)
+            self._invalidate_latest()
+            
+            self.logger.info(f"已清除 {deleted_count} 条检测结果")
+            return deleted_count
                 
         except Exception as e:
             self.logger.error(f"清除检测结果失败: {e}")
             return 0
     
     def get_detection_classes(self) -> List[str]:
-        """获取所有检测到的类别"""
+        """获取所有检测到的类别（JSON 文本列由 JSON1 json_each 在 SQLite 内展开去重）"""
+        def collect_shard(path: str) -> set:
+            with self.get_connection(path) as conn:
+                try:
+                    rows = conn.execute('''
+                        SELECT DISTINCT json_extract(d.value, '$.class_name') AS cls
+                        FROM detection_results, json_each(detection_results.detections) AS d
+                        WHERE json_valid(detection_results.detections) AND cls IS NOT NULL
+                    ''').fetchall()
+                    classes = {row['cls'] for row in rows}
+                except sqlite3.OperationalError:
+                    # SQLite 未编译 JSON1 时回退到 Python 侧解析
+                    classes = self._collect_detection_classes(conn)
+                
+                return classes
+        
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('SELECT DISTINCT detections FROM detection_results WHERE detections IS NOT NULL')
-                rows = cursor.fetchall()
-                
-                classes = set()
-                for row in rows:
-                    try:
-                        detections = json.loads(row['detections'])
-                        for detection in detections:
-                            if 'class_name' in detection:
-                                classes.add(detection['class_name'])
-                    except (json.JSONDecodeError, TypeError):
-                        continue
-                
-                return sorted(list(classes))
+            return sorted(set().union(*self._map_shards(collect_shard)))
                 
         except Exception as e:
             self.logger.error(f"获取检测类别失败: {e}")
             return []
     
+    def _collect_detection_classes(self, conn) -> set:
+        """逐行解析 detections JSON 收集类别"""
+        cursor = conn.execute('SELECT DISTINCT detections FROM detection_results WHERE detections IS NOT NULL')
+        
+        classes = set()
+        for row in cursor:
+            try:
+                detections = _json_loads(row['detections'])
+                for detection in detections:
+                    if 'class_name' in detection:
+                        classes.add(detection['class_name'])
+            except (json.JSONDecodeError, TypeError):
+                continue
+        
+        return classes
+    
     # 视频流配置管理方法
     
     def save_stream_config(self, config: Dict) -> bool:
@@ -351,19 +682,7 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    INSERT OR REPLACE INTO stream_configs (
-                        stream_id, name, url, type, risk_level, description, enabled, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                ''', (
-                    config.get('stream_id'),
-                    config.get('name'),
-                    config.get('url'),
-                    config.get('type', 'file'),
-                    config.get('risk_level', '中'),
-                    config.get('description', ''),
-                    config.get('enabled', True)
-                ))
+                cursor.execute(_UPSERT_STREAM_CONFIG_SQL, _stream_config_row(config))
                 
                 conn.commit()
                 return True
@@ -456,39 +775,27 @@ class DatabaseManager:
             return False
     
     def bulk_save_stream_configs(self, configs: List[Dict]) -> int:
-        """批量保存视频流配置"""
+        """批量保存视频流配置（单事务 executemany）"""
+        rows = []
+        for config in configs:
+            # 确保有必要的字段
+            if 'stream_id' not in config and 'name' in config:
+                config['stream_id'] = config['name']
+            # 预先剔除违反 NOT NULL 约束的配置，避免单条失败回滚整批
+            if not (config.get('stream_id') and config.get('name') and config.get('url')):
+                self.logger.error(f"保存配置失败 {config.get('name', 'unknown')}: 缺少 stream_id/name/url")
+                continue
+            rows.append(_stream_config_row(config))
+        
         success_count = 0
+        if not rows:
+            return success_count
         
         try:
             with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                for config in configs:
-                    try:
-                        # 确保有必要的字段
-                        if 'stream_id' not in config and 'name' in config:
-                            config['stream_id'] = config['name']
-                        
-                        cursor.execute('''
-                            INSERT OR REPLACE INTO stream_configs (
-                                stream_id, name, url, type, risk_level, description, enabled, updated_at
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                        ''', (
-                            config.get('stream_id'),
-                            config.get('name'),
-                            config.get('url'),
-                            config.get('type', 'file'),
-                            config.get('risk_level', '中'),
-                            config.get('description', ''),
-                            config.get('enabled', True)
-                        ))
-                        success_count += 1
-                        
-                    except Exception as e:
-                        self.logger.error(f"保存配置失败 {config.get('name', 'unknown')}: {e}")
-                        continue
-                
+                conn.executemany(_UPSERT_STREAM_CONFIG_SQL, rows)
                 conn.commit()
+                success_count = len(rows)
                 self.logger.info(f"批量保存视频流配置完成: {success_count}/{len(configs)}")
                 
         except Exception as e:
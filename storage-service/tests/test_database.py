@@ -58,3 +58,139 @@ def test_retrieve_order(tmp_path):
     assert len(results) == 2
     assert results[0]['timestamp'] >= results[1]['timestamp']
 
+
+
+def test_save_batch(tmp_path):
+    db_path = tmp_path / 'test.db'
+    manager = DatabaseManager(db_path=str(db_path))
+    base = time.time()
+
+    batch = [
+        {
+            'stream_id': 'cam3',
+            'stream_name': 'Camera 3',
+            'timestamp': base + i,
+            'processing_time': 0.1,
+            'total_objects': 1,
+            'detections': [{'class': 'car', 'confidence': 0.8}],
+            'frame_shape': [720, 1280, 3],
+            'frame_path': None,
+        }
+        for i in range(5)
+    ]
+
+    assert manager.save_detection_results(batch) is True
+
+    results = manager.get_latest_results(limit=10, stream_id='cam3')
+    assert len(results) == 5
+    assert results[0]['timestamp'] == base + 4
+    assert results[0]['detections'][0]['class'] == 'car'
+
+
+def test_iter_results_offset(tmp_path):
+    db_path = tmp_path / 'test.db'
+    manager = DatabaseManager(db_path=str(db_path))
+    base = time.time()
+
+    manager.save_detection_results([
+        {'stream_id': 'cam4', 'timestamp': base + i, 'total_objects': i, 'detections': []}
+        for i in range(5)
+    ])
+
+    page = list(manager.get_latest_results_iter(limit=2, stream_id='cam4', offset=1))
+    assert [r['total_objects'] for r in page] == [3, 2]
+
+
+def test_fetch_headers_only(tmp_path):
+    db_path = tmp_path / 'test.db'
+    manager = DatabaseManager(db_path=str(db_path))
+
+    manager.save_detection_result({
+        'stream_id': 'cam5', 'timestamp': time.time(), 'total_objects': 1,
+        'detections': [{'class': 'person'}], 'frame_shape': [720, 1280, 3],
+    })
+
+    results = manager.get_latest_results(limit=1, include_detections=False)
+    assert results[0]['stream_id'] == 'cam5'
+    assert 'detections' not in results[0]
+
+
+
+def test_latest_cache_returns_copies(tmp_path):
+    manager = DatabaseManager(db_path=str(tmp_path / 'test.db'))
+    manager.save_detection_result({
+        'stream_id': 'cam6', 'timestamp': time.time(), 'total_objects': 2,
+        'detections': [{'class': 'person'}],
+    })
+
+    first = manager.get_latest_results(limit=1, stream_id='cam6')
+    first[0]['total_objects'] = 99
+    first[0]['detections'][0]['class'] = 'car'
+    cached = manager.get_latest_results(limit=1, stream_id='cam6')[0]
+    assert cached['total_objects'] == 2
+    assert cached['detections'][0]['class'] == 'person'
+
+
+def test_latest_cache_skips_fill_after_concurrent_write(tmp_path):
+    manager = DatabaseManager(db_path=str(tmp_path / 'test.db'))
+    manager.save_detection_result({'stream_id': 'cam8', 'timestamp': time.time(), 'total_objects': 1})
+
+    # Simulate a write landing while the query is in flight
+    query = manager.get_latest_results_iter
+
+    def racing_query(*args, **kwargs):
+        rows = list(query(*args, **kwargs))
+        manager.save_detection_result({'stream_id': 'cam8', 'timestamp': time.time() + 1, 'total_objects': 2})
+        return iter(rows)
+
+    manager.get_latest_results_iter = racing_query
+    assert manager.get_latest_results(limit=1, stream_id='cam8')[0]['total_objects'] == 1
+    manager.get_latest_results_iter = query
+    assert manager.get_latest_results(limit=1, stream_id='cam8')[0]['total_objects'] == 2
+
+
+def test_sharded_fetch(tmp_path):
+    manager = DatabaseManager(db_path=str(tmp_path / 'test.db'), shards=4)
+    base = time.time()
+
+    manager.save_detection_results([
+        {'stream_id': f'cam{i % 5}', 'timestamp': base + i, 'total_objects': i, 'detections': []}
+        for i in range(20)
+    ])
+
+    results = manager.get_latest_results(limit=5)
+    assert [r['total_objects'] for r in results] == [19, 18, 17, 16, 15]
+    assert len(manager.get_results_by_time_range(base, base + 20)) == 20
+    assert manager.get_statistics()['unique_streams'] == 5
+
+
+def test_blob_rows_fall_back_to_json_without_msgpack(monkeypatch):
+    # Rows written with msgpack must stay readable where msgpack is not installed
+    monkeypatch.setattr(db_module, 'MSGPACK_AVAILABLE', False)
+    row = (1, 'cam7', None, 1.0, 0.1, 1, None, None,
+           '[{"class": "person"}]', '[720, 1280, 3]', b'\x91\x81', None)
+
+    result = db_module._row_to_result(row)
+    assert result['detections'] == [{'class': 'person'}]
+    assert result['frame_shape'] == [720, 1280, 3]
+
+
+def test_sharded_ids_unique_and_shard_count_locked(tmp_path):
+    db_path = str(tmp_path / 'test.db')
+    manager = DatabaseManager(db_path=db_path, shards=4)
+    manager.save_detection_results([
+        {'stream_id': f'cam{i}', 'timestamp': time.time(), 'total_objects': i} for i in range(12)
+    ])
+
+    ids = [r['id'] for r in manager.get_latest_results(limit=12)]
+    assert len(set(ids)) == 12
+
+    # Changing the shard count would orphan existing rows, so startup must fail
+    for shards in (1, 2):
+        try:
+            DatabaseManager(db_path=db_path, shards=shards)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('shard count change should be refused')
+    DatabaseManager(db_path=db_path, shards=4)
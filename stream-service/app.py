@@ -10,19 +10,26 @@ import sys
 import time
 import logging
 import json
-import threading
+import copy
+import atexit
+import asyncio
+import heapq
 import base64
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import csv
 import io
 import uuid
-from typing import Dict, List, Optional, Any
+import zlib
+from typing import Dict, List, Optional, Any, Tuple
 from flask import Flask, request, jsonify, render_template, send_from_directory, Response
 from werkzeug.utils import secure_filename
 import cv2
 import numpy as np
 from dataclasses import asdict
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 
 # 添加模块路径
 sys.path.append(os.path.join(os.path.dirname(__file__), 'modules'))
@@ -36,6 +43,139 @@ from filters.frame_filter import get_frame_filter
 from models import init_engine, Stream  # noqa: E402
 from sqlalchemy.orm import Session
 
+# 可选: PyTurboJPEG (libjpeg-turbo SIMD) 编码快照，未安装时使用 cv2.imencode
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420
+    _turbo = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except Exception:
+    _turbo = None
+    TURBOJPEG_AVAILABLE = False
+
+# 可选: xxHash 计算帧内容摘要（比 zlib.crc32 更快），未安装时使用 crc32
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    xxhash = None
+    XXHASH_AVAILABLE = False
+
+
+def _frame_digest(frame: np.ndarray) -> int:
+    """计算整帧像素内容的摘要，用于判断与上一帧是否逐字节相同"""
+    buf = np.ascontiguousarray(frame).data
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_64_intdigest(buf)
+    return zlib.crc32(buf)
+
+# 可选: orjson 序列化高频 GET 响应，未安装时回退到标准库 json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+# 统计数据中可能混入 NumPy 标量/数组（帧过滤器槽位等），orjson 原生序列化，无需逐个转换
+_ORJSON_OPTS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if ORJSON_AVAILABLE else 0
+
+
+def _json_dumps(data) -> str:
+    """序列化为 JSON 文本（保留非 ASCII 字符）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=str, option=_ORJSON_OPTS).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _ojson(data, status: int = 200) -> Response:
+    """直接返回预序列化的 JSON 响应，替代热点接口上的 jsonify"""
+    if ORJSON_AVAILABLE:
+        body = orjson.dumps(data, default=str, option=_ORJSON_OPTS)
+    else:
+        body = json.dumps(data, ensure_ascii=False, default=str)
+    return Response(body, status=status, mimetype='application/json')
+
+# 可选: aiohttp 异步发送帧，stream.async_send 开启时使用，未安装时使用线程池 + requests
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+# 可选: pyarrow C 实现的 CSV 解析器，用于大批量导入，未安装时使用 csv.DictReader
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = pa_csv = None
+    PYARROW_AVAILABLE = False
+
+
+def _parse_csv_rows(data: bytes) -> List[Dict[str, str]]:
+    """将上传的 CSV 字节解析为行字典列表，所有列均保持字符串"""
+    if PYARROW_AVAILABLE and data.strip():
+        # 显式指定全部列为字符串，避免端口、间隔等列被推断为数值后改变原始文本
+        header_line = data.split(b'\n', 1)[0].decode('UTF-8').rstrip('\r')
+        header = next(csv.reader([header_line]))
+        table = pa_csv.read_csv(
+            io.BytesIO(data),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                strings_can_be_null=False,
+            ),
+        )
+        return table.to_pylist()
+    return list(csv.DictReader(io.StringIO(data.decode('UTF-8'), newline=None)))
+
+_RUNNING = StreamStatus.RUNNING.value
+
+
+@lru_cache(maxsize=16)
+def _parse_config_file(path: str, mtime_ns: int, size: int) -> Dict:
+    """解析 JSON 配置文件；以 (路径, 修改时间, 大小) 为键缓存，文件变更后自动失效"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _read_config_file(config_path: str) -> Dict:
+    """读取 JSON 配置文件，返回缓存结果的深拷贝，调用方修改不会污染缓存"""
+    path = os.path.abspath(config_path)
+    st = os.stat(path)
+    return copy.deepcopy(_parse_config_file(path, st.st_mtime_ns, st.st_size))
+
+
+# 风险等级别名 -> 规范值（中英文、大小写）
+_RL_MAP = {
+    '高': 'HIGH', '中': 'MEDIUM', '低': 'LOW',
+    'high': 'HIGH', 'medium': 'MEDIUM', 'low': 'LOW'
+}
+
+
+def _normalize_risk_level(value) -> str:
+    """将风险等级规范为 HIGH/MEDIUM/LOW，未知取值转大写原样返回"""
+    text = str(value).strip()
+    return _RL_MAP.get(text, text.upper())
+
+# 预览快照 JPEG 质量
+SNAPSHOT_JPEG_QUALITY = 80
+
+
+def _encode_snapshot(frame) -> bytes:
+    """将 BGR 帧编码为预览用 JPEG
+
+    直接在请求线程中调用：app.run 已开启 threaded=True，cv2.imencode 与 turbojpeg(ctypes)
+    编码期间均释放 GIL，多个预览请求本身即可在多核上并行编码。
+    """
+    if _turbo is not None:
+        return _turbo.encode(frame, quality=SNAPSHOT_JPEG_QUALITY, jpeg_subsample=TJSAMP_420)
+    # 关闭 Huffman 优化以缩短编码时间
+    _, buf = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), SNAPSHOT_JPEG_QUALITY,
+                                          int(cv2.IMWRITE_JPEG_OPTIMIZE), 0])
+    return buf.tobytes()
+
 class StreamService:
     """视频流服务 - 专注于流管理和预过滤"""
     
@@ -53,7 +193,9 @@ class StreamService:
         
         # 核心组件
         self.frame_filter = get_frame_filter()
-        self.stream_manager = StreamManager()
+        self.stream_manager = StreamManager(
+            decoder=self.config.get('stream', {}).get('decoder', 'opencv')
+        )
         
         # 服务配置
         self.detection_service_url = self.config.get('services', {}).get('detection_service', 'http://localhost:8082')
@@ -65,15 +207,82 @@ class StreamService:
             'total_frames_received': 0,
             'total_frames_filtered': 0,
             'total_frames_processed': 0,
+            'frames_dropped': 0,
             'active_streams': 0
         }
         
+        # 每个流最近一次编码的预览快照 (编码时间, JPEG, ETag)
+        self._snapshot_cache: Dict[str, Tuple[float, bytes, str]] = {}
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_ttl = self.config.get('stream', {}).get('snapshot_ttl_ms', 200) / 1000.0
+        self._thumbnail_ttl = self.config.get('stream', {}).get('thumbnail_ttl', 300)
+        
+        # 未运行流的预览抓帧复用 VideoCapture：url -> [capture, 最近使用时间, 锁]
+        self._cap_pool: Dict[str, list] = {}
+        self._cap_pool_lock = threading.Lock()
+        self._cap_idle_timeout = self.config.get('stream', {}).get('capture_idle_timeout', 30)
+        
+        # 流配置行缓存：stream_id/name -> (查询时间, 行字典)，写路径上整体失效
+        self._stream_row_cache: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._stream_row_lock = threading.Lock()
+        self._stream_row_ttl = 5.0
+        # 批量操作单飞：同类请求并发到达时只执行一次，其余等待并复用结果
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # 流总数缓存，供列表分页使用；None 表示需重新 COUNT
+        self._stream_count: Optional[int] = None
+        self._stream_rows_gen = 0
+        
         # 线程停止控制事件需在启动任何后台线程前创建
         self.stop_event = threading.Event()
+        # 唤醒帧调度器重建调度堆（流启停、状态变化、帧间隔变化）
+        self._schedule_wake = threading.Event()
+        self.stream_manager.add_status_listener(self._schedule_wake.set)
 
         # 发送线程池，用于并行编解码与HTTP
         send_workers = self.config.get('stream', {}).get('send_workers', 4)
         self.send_executor = ThreadPoolExecutor(max_workers=send_workers)
+        # 在途发送上限：检测服务变慢时丢弃新帧，而不是让持有整帧的任务无限堆积
+        self._send_slots = threading.BoundedSemaphore(self.config.get('stream', {}).get('max_in_flight', 64))
+
+        # 出站 HTTP 复用连接池 (keep-alive)，避免每帧新建 TCP 连接；失败不重试，由下一帧覆盖
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=send_workers, pool_maxsize=send_workers * 4, max_retries=0)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+        stream_cfg = self.config.get('stream', {})
+        self.frame_transport = stream_cfg.get('frame_transport', 'raw')
+        self.send_jpeg_quality = int(stream_cfg.get('send_jpeg_quality', 80))
+        self._nvjpeg = None
+        self.jpeg_encoder = self._init_jpeg_encoder(stream_cfg.get('jpeg_encoder', 'opencv'))
+        # 静止画面复用上一帧的 JPEG: stream_id -> (帧摘要, JPEG 字节)
+        self.jpeg_dedup = bool(stream_cfg.get('jpeg_dedup', True))
+        self._last_jpeg: Dict[str, Tuple[int, bytes]] = {}
+
+        # 可选 aiohttp 异步发送：一个事件循环线程承载所有在途 POST
+        # 同机部署可选共享内存传输：原始帧写入共享内存槽位，请求只携带槽位位置
+        self.frame_pool = None
+        if self.frame_transport == 'shm':
+            try:
+                from modules.frame_shm import SharedFramePool
+                self.frame_pool = SharedFramePool(
+                    slots=int(stream_cfg.get('shm_slots', 32)),
+                    slot_bytes=int(stream_cfg.get('shm_slot_bytes', 1920 * 1080 * 3)),
+                )
+                atexit.register(self.frame_pool.close)
+            except Exception as e:
+                self.logger.warning(f"创建共享内存帧槽池失败，改用 raw 传输: {e}")
+                self.frame_transport = 'raw'
+
+        self._async_loop = None
+        if stream_cfg.get('async_send', False):
+            if self.frame_pool is not None:
+                self.logger.warning("共享内存传输仅支持线程池发送，忽略 stream.async_send")
+            elif AIOHTTP_AVAILABLE:
+                self._start_async_sender(send_workers, int(stream_cfg.get('async_send_limit', 256)))
+            else:
+                self.logger.warning("未安装 aiohttp，stream.async_send 回退为线程池发送")
 
         # 启动处理线程
         self._start_processing_threads()
@@ -99,7 +308,20 @@ class StreamService:
             'stream': {
                 'max_concurrent_streams': 20,
                 'frame_buffer_size': 100,
-                'default_frame_interval': 2.0
+                'default_frame_interval': 2.0,
+                'decoder': 'opencv',  # opencv / ffmpegcv / nvdec / keyframe(PyAV 仅解码关键帧，适用于长间隔文件抽帧)
+                'snapshot_ttl_ms': 200,  # 预览快照 JPEG 缓存时间，窗口内的请求复用同一次编码
+                'thumbnail_ttl': 300,  # 本地文件流缩略图落盘有效期（秒），期内直接由 sendfile 返回
+                'capture_idle_timeout': 30,  # 预览抓帧复用的 VideoCapture 空闲多久后关闭（秒）
+                'frame_transport': 'raw',  # 发往检测服务的帧传输方式: raw(JPEG 请求体+头部元数据) / multipart / base64(旧版 JSON) / shm(同机共享内存，检测服务需开启 processing.accept_shm_frames)
+                'shm_slots': 32,  # shm 传输的帧槽位数
+                'shm_slot_bytes': 6220800,  # 每个槽位字节数，默认容纳 1080p BGR 帧；更大的帧回退为 JPEG
+                'send_jpeg_quality': 80,  # 发往检测服务的 JPEG 质量
+                'jpeg_encoder': 'opencv',  # 发送帧的 JPEG 编码器: opencv / turbojpeg / nvjpeg(GPU，需安装 pynvjpeg)
+                'jpeg_dedup': True,  # 帧内容与该流上一帧逐字节相同时复用上次的 JPEG，跳过编码
+                'async_send': False,  # 使用 aiohttp 事件循环发送帧（需安装 aiohttp），编码仍在 send_workers 线程池
+                'async_send_limit': 256,  # 异步发送的最大在途请求数
+                'max_in_flight': 64  # 已提交未完成的发送任务上限，超出时丢帧（每个任务持有一整帧）
             },
             'logging': {
                 'level': 'INFO',
@@ -109,17 +331,16 @@ class StreamService:
         
         if os.path.exists(config_path):
             try:
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    # 合并默认配置
-                    for key, value in default_config.items():
-                        if key not in config:
-                            config[key] = value
-                        elif isinstance(value, dict):
-                            for sub_key, sub_value in value.items():
-                                if sub_key not in config[key]:
-                                    config[key][sub_key] = sub_value
-                    return config
+                config = _read_config_file(config_path)
+                # 合并默认配置
+                for key, value in default_config.items():
+                    if key not in config:
+                        config[key] = value
+                    elif isinstance(value, dict):
+                        for sub_key, sub_value in value.items():
+                            if sub_key not in config[key]:
+                                config[key][sub_key] = sub_value
+                return config
             except Exception as e:
                 print(f"加载配置文件失败: {e}，使用默认配置")
         
@@ -165,7 +386,7 @@ class StreamService:
         @self.app.route('/api/health', methods=['GET'])
         def health_check():
             """健康检查"""
-            return jsonify({
+            return _ojson({
                 'status': 'healthy',
                 'service': 'stream',
                 'timestamp': time.time(),
@@ -178,10 +399,21 @@ class StreamService:
             """获取视频流列表 (分页 & 运行状态)"""
             offset = int(request.args.get('offset', 0))
             limit = int(request.args.get('limit', 100))
+            # 无限滚动等场景可传 total=0 跳过计数
+            want_total = request.args.get('total', '1') != '0'
 
             session: Session = self.Session()
             try:
-                total = session.query(Stream).count()
+                total = None
+                if want_total:
+                    total = self._stream_count
+                    if total is None:
+                        gen = self._stream_rows_gen
+                        total = session.query(Stream).count()
+                        with self._stream_row_lock:
+                            # 计数期间若有写入则不缓存，避免保存过期总数
+                            if gen == self._stream_rows_gen:
+                                self._stream_count = total
                 db_streams = (
                     session.query(Stream)
                     .order_by(Stream.created_at.desc())
@@ -189,25 +421,20 @@ class StreamService:
                     .limit(limit)
                     .all()
                 )
+                # 运行状态一次性快照，避免逐行查询 StreamManager
+                statuses = self.stream_manager.snapshot_statuses()
+                get_filter_stats = self.frame_filter.get_stream_stats
                 streams_list = []
                 for db_stream in db_streams:
-                    stream_id = db_stream.stream_id
-                    runtime_info = self.stream_manager.get_stream(stream_id)
-
-                    is_running = False
-                    status_value = 'stopped'
-                    if runtime_info:
-                        is_running = runtime_info.status == StreamStatus.RUNNING
-                        status_value = runtime_info.status.value
-
+                    status_value = statuses.get(db_stream.stream_id, 'stopped')
                     streams_list.append({
                         **db_stream.as_dict(),
-                        'is_running': is_running,
+                        'is_running': status_value == _RUNNING,
                         'status': status_value,
-                        'filter_stats': self.frame_filter.get_stream_stats(stream_id),
+                        'filter_stats': get_filter_stats(db_stream.stream_id),
                     })
 
-                return jsonify({
+                return _ojson({
                     'success': True,
                     'streams': streams_list,
                     'total': total,
@@ -224,10 +451,14 @@ class StreamService:
                 data = request.get_json()
                 
                 if 'streams' in data:
-                    # 批量配置
-                    for stream_config in data['streams']:
-                        self._configure_single_stream(stream_config)
-                    return jsonify({'status': 'success', 'message': f'配置了 {len(data["streams"])} 个流'})
+                    # 批量配置：部分失败返回 207，全部失败返回 400，并附上逐条错误
+                    added, errors = self._configure_streams_bulk(data['streams'])
+                    body = {'status': 'success', 'message': f'配置了 {added} 个流',
+                            'added_count': added, 'errors': errors}
+                    if errors:
+                        body['status'] = 'partial' if added else 'error'
+                        return jsonify(body), 207 if added else 400
+                    return jsonify(body)
                 else:
                     # 单个流配置
                     self._configure_single_stream(data)
@@ -250,24 +481,26 @@ class StreamService:
             
             if file and file.filename.endswith('.csv'):
                 try:
-                    # 将文件流解码为文本
-                    stream = io.StringIO(file.stream.read().decode('UTF-8'), newline=None)
-                    csv_reader = csv.DictReader(stream)
-                    
-                    added_count = 0
-                    for row in csv_reader:
+                    stream_configs = []
+                    for row in _parse_csv_rows(file.stream.read()):
                         # 清理可能的空值
                         stream_config = {k: v for k, v in row.items() if v is not None and v != ''}
                         if 'url' in stream_config and 'name' in stream_config:
-                            self._configure_single_stream(stream_config)
-                            added_count += 1
+                            stream_configs.append(stream_config)
+                    
+                    # 所有行在一个事务内批量写入
+                    added_count, errors = self._configure_streams_bulk(stream_configs)
                     
-                    self.logger.info(f"通过CSV成功配置了 {added_count} 个流")
-                    return jsonify({
-                        'success': True, 
+                    self.logger.info(f"通过CSV成功配置了 {added_count} 个流，失败 {len(errors)} 个")
+                    body = {
+                        'success': not errors,
                         'message': f'成功添加 {added_count} 个视频流配置',
-                        'added_count': added_count
-                    })
+                        'added_count': added_count,
+                        'errors': errors
+                    }
+                    if errors:
+                        return jsonify(body), 207 if added_count else 400
+                    return jsonify(body)
 
                 except Exception as e:
                     self.logger.error(f"处理CSV文件失败: {e}", exc_info=True)
@@ -321,17 +554,11 @@ class StreamService:
 
                 # -------- 规范 risk_level 字段并补全间隔 --------
                 if config and 'risk_level' in config:
-                    rl_map = {
-                        '高': 'HIGH', '中': 'MEDIUM', '低': 'LOW',
-                        'high': 'HIGH', 'medium': 'MEDIUM', 'low': 'LOW'
-                    }
-                    orig_rl = str(config['risk_level']).strip()
-                    config['risk_level'] = rl_map.get(orig_rl, orig_rl.upper())
+                    config['risk_level'] = _normalize_risk_level(config['risk_level'])
 
                 # 若未显式提供 frame_interval，根据风险等级默认值补全
                 if config and 'frame_interval' not in config and 'risk_level' in config:
-                    lvl = str(config['risk_level']).upper()
-                    config['frame_interval'] = self.frame_filter.risk_intervals.get(lvl, 2.0)
+                    config['frame_interval'] = self._default_interval(config['risk_level'])
 
                 # 更新过滤器配置
                 if config:
@@ -346,6 +573,7 @@ class StreamService:
                         stream_obj.config.update(config)
                     # 同时同步基本字段，例如 risk_level / name / interval
                     self.stream_manager.update_stream_config(stream_id, config)
+                    self._schedule_wake.set()
 
                 # 更新数据库
                 session: Session = self.Session()
@@ -358,6 +586,7 @@ class StreamService:
                         session.commit()
                 finally:
                     session.close()
+                self._invalidate_stream_rows()
                 
                 return jsonify({'status': 'success', 'message': f'流 {stream_id} 配置更新成功'})
                 
@@ -382,7 +611,7 @@ class StreamService:
                     }
                 }
                 
-                return jsonify(stats)
+                return _ojson(stats)
                 
             except Exception as e:
                 self.logger.error(f"获取流统计失败: {e}")
@@ -391,7 +620,7 @@ class StreamService:
         @self.app.route('/api/stats', methods=['GET'])
         def get_api_stats():
             """获取服务统计信息"""
-            return jsonify(self.get_stats())
+            return _ojson(self.get_stats())
         
         @self.app.route('/api/filter/config', methods=['GET', 'POST'])
         def manage_filter_config():
@@ -414,25 +643,39 @@ class StreamService:
         
         @self.app.route('/api/streams/updates')
         def stream_updates():
-            """Server-Sent Events: 推送流状态变更，每 1 秒。"""
+            """Server-Sent Events: 流状态变更时推送增量，空闲 15 秒发送一次保活注释。"""
+            manager = self.stream_manager
+
+            def sse_state(status) -> str:
+                return 'running' if status is StreamStatus.RUNNING else 'stopped'
 
             def event_stream():
-                last_snapshot = {}
+                # 先取版本再做快照，快照之后的变更都会被 wait_status_changes 返回
+                version = manager.status_version
+                last_sent = {sid: sse_state(info.status) for sid, info in list(manager.streams.items())}
+                if last_sent:
+                    yield f'data: {_json_dumps(last_sent)}\n\n'
                 while True:
-                    # 构建当前快照
-                    current = {}
-                    for stream_id, stream_info in self.stream_manager.streams.items():
-                        current[stream_id] = 'running' if stream_info.status.value == 'running' else 'stopped'
-
-                    # 对比差异
-                    changed = {
-                        sid: state for sid, state in current.items()
-                        if last_snapshot.get(sid) != state
-                    }
+                    version, changes = manager.wait_status_changes(version, timeout=15)
+                    if changes is None:
+                        # 落后过多，变更日志已覆盖，改用全量快照对比
+                        changes = {sid: info.status for sid, info in list(manager.streams.items())}
+                    elif not changes:
+                        yield ':\n\n'
+                        continue
+
+                    # 同一批内的多次变更已合并为每个流的最终状态；已删除的流不推送
+                    changed = {}
+                    for sid, status in changes.items():
+                        if status is None:
+                            last_sent.pop(sid, None)
+                            continue
+                        state = sse_state(status)
+                        if last_sent.get(sid) != state:
+                            changed[sid] = state
                     if changed:
-                        yield f'data: {json.dumps(changed, ensure_ascii=False)}\n\n'
-                        last_snapshot = current.copy()
-                    time.sleep(1)
+                        last_sent.update(changed)
+                        yield f'data: {_json_dumps(changed)}\n\n'
 
             return Response(event_stream(), mimetype='text/event-stream')
 
@@ -440,50 +683,52 @@ class StreamService:
         @self.app.route('/api/streams/<stream_id>/snapshot', methods=['GET'])
         def snapshot_stream(stream_id):
             """返回指定流最近一帧 JPEG，用于前端预览"""
-            # 先尝试从正在运行的流缓冲区读取
+            # 缓存窗口内的请求直接复用最近一次编码结果
+            with self._snapshot_lock:
+                cached = self._snapshot_cache.get(stream_id)
+            if cached and time.time() - cached[0] < self._snapshot_ttl:
+                return self._snapshot_response(cached[1], cached[2])
+
+            # 先尝试从正在运行的流缓冲区读取（采集器归 StreamWorker 线程独占，不在此处直接读取）
             stream_info = self.stream_manager.get_stream(stream_id)
 
             frame = None
-            if stream_info and stream_info.capture:
+            if stream_info and stream_info.is_running():
                 frame = self.stream_manager.get_frame_from_buffer(stream_id)
-                if frame is None:
-                    ret, cap_frame = stream_info.capture.read()
-                    if ret:
-                        frame = cap_frame
 
             # 若流未运行或仍无帧，则临时打开一次 VideoCapture
             if frame is None:
                 # 从数据库读取 URL
-                session: Session = self.Session()
-                try:
-                    db_stream = session.query(Stream).filter_by(stream_id=stream_id).first()
-                    if not db_stream:
-                        # 兼容前端使用 name 作为 id 的情况
-                        db_stream = session.query(Stream).filter_by(name=stream_id).first()
-                    if not db_stream:
-                        return jsonify({'error': 'stream not found'}), 404
-                    stream_url = db_stream.url
-                finally:
-                    session.close()
+                row = self._lookup_stream(stream_id)
+                if not row:
+                    return jsonify({'error': 'stream not found'}), 404
+                stream_url = row['url']
+
+                # 本地文件流优先返回已落盘的缩略图，跳过解码+编码
+                thumb_path = self._thumbnail_path(stream_id) if row.get('type') == 'file' else None
+                if thumb_path and self._thumbnail_fresh(thumb_path):
+                    return send_from_directory(os.path.dirname(thumb_path), os.path.basename(thumb_path),
+                                               mimetype='image/jpeg', conditional=True, max_age=0)
 
                 try:
-                    import cv2
                     # 若为本地文件，解析绝对路径
-                    stream_url = self._resolve_media_path(stream_url)
-                    cap = cv2.VideoCapture(stream_url)
-                    ret, cap_frame = cap.read()
-                    cap.release()
-                    if ret:
-                        frame = cap_frame
+                    frame = self._grab_pooled_frame(self._resolve_media_path(stream_url))
                 except Exception as e:
                     self.logger.error(f'临时抓帧失败: {e}')
+            else:
+                thumb_path = None
 
             if frame is None:
                 return jsonify({'error': 'no frame available'}), 404
 
             try:
-                _, buf = cv2.imencode('.jpg', frame)
-                return Response(buf.tobytes(), mimetype='image/jpeg')
+                jpeg = _encode_snapshot(frame)
+                etag = f'{zlib.crc32(jpeg):08x}'
+                with self._snapshot_lock:
+                    self._snapshot_cache[stream_id] = (time.time(), jpeg, etag)
+                if thumb_path:
+                    self._write_thumbnail(thumb_path, jpeg)
+                return self._snapshot_response(jpeg, etag)
             except Exception as e:
                 self.logger.error(f'编码快照失败: {e}')
                 return jsonify({'error': 'encode error'}), 500
@@ -504,10 +749,18 @@ class StreamService:
                     session.commit()
             finally:
                 session.close()
+            self._invalidate_stream_rows()
 
             # 清理缓存/内存
             if stream_id in self.stream_manager.streams:
                 del self.stream_manager.streams[stream_id]
+            with self._snapshot_lock:
+                self._snapshot_cache.pop(stream_id, None)
+            self._last_jpeg.pop(stream_id, None)
+            try:
+                os.remove(self._thumbnail_path(stream_id))
+            except OSError:
+                pass
 
             return jsonify({'success': True, 'message': 'stream deleted'})
 
@@ -520,99 +773,19 @@ class StreamService:
             """批量启动所有流，可通过 frame_config 调整全局风险等级间隔"""
             payload = request.get_json(silent=True) or {}
             frame_cfg = payload.get('frame_config') or {}
-
-            # 如果提供了高/中/低风险间隔则更新全局 risk_intervals
-            key_map = {
-                'highRiskInterval': 'HIGH',
-                'mediumRiskInterval': 'MEDIUM',
-                'lowRiskInterval': 'LOW'
-            }
-            updated = False
-            for k, level in key_map.items():
-                if k in frame_cfg:
-                    try:
-                        self.frame_filter.risk_intervals[level] = float(frame_cfg[k])
-                        updated = True
-                    except ValueError:
-                        pass
-            if updated:
-                self.logger.info(f"批量启动更新 risk_intervals 为: {self.frame_filter.risk_intervals}")
-
-            started = 0
-            errors = {}
-            session: Session = self.Session()
-            try:
-                all_db_streams = session.query(Stream).all()
-                for db_stream in all_db_streams:
-                    sid = db_stream.stream_id
-                    if self.stream_manager.get_stream(sid) and self.stream_manager.get_stream(sid).is_running():
-                        continue  # 已运行
-                    # 根据流风险等级确定间隔
-                    override_interval = None
-                    level = str(db_stream.risk_level or '').lower()
-                    if level in ['高', 'high'] and 'highRiskInterval' in frame_cfg:
-                        override_interval = frame_cfg['highRiskInterval']
-                    elif level in ['中', 'medium'] and 'mediumRiskInterval' in frame_cfg:
-                        override_interval = frame_cfg['mediumRiskInterval']
-                    elif level in ['低', 'low'] and 'lowRiskInterval' in frame_cfg:
-                        override_interval = frame_cfg['lowRiskInterval']
-
-                    result = self._start_single_stream(sid, override_interval)
-                    if result.get('success'):
-                        started += 1
-                    else:
-                        errors[sid] = result.get('error', 'unknown')
-                msg = f"成功启动 {started} 路视频流"
-                return jsonify({'success': True, 'message': msg, 'errors': errors})
-            finally:
-                session.close()
+            # 重复点击或控制端重试时，并发请求复用正在执行的那一次结果
+            return jsonify(self._single_flight('start_all', lambda: self._start_all(frame_cfg)))
 
         @self.app.route('/api/streams/stop_all', methods=['POST'])
         def stop_all_streams():
             """停止所有正在运行的流"""
-            stopped = 0
-            errors = {}
-            for sid, sinfo in list(self.stream_manager.streams.items()):
-                if not sinfo.is_running():
-                    continue
-                result = self._stop_single_stream(sid)
-                if result.get('success'):
-                    stopped += 1
-                else:
-                    errors[sid] = result.get('error', 'unknown')
-            msg = f"成功停止 {stopped} 路视频流"
-            return jsonify({'success': True, 'message': msg, 'errors': errors})
+            return jsonify(self._single_flight('stop_all', self._stop_all))
 
         @self.app.route('/api/streams/clear', methods=['POST'])
         def clear_all_streams():
             """停止并删除所有流配置（包括数据库与内存）"""
             try:
-                # 统计停止数量
-                stopped = 0
-                for sid in list(self.stream_manager.streams.keys()):
-                    try:
-                        self._stop_single_stream(sid)
-                    except Exception:
-                        pass
-                    # 移除过滤器缓存
-                    try:
-                        self.frame_filter.remove_stream(sid)
-                    except Exception:
-                        pass
-                    stopped += 1
-                # 清空管理器内部状态
-                self.stream_manager.streams.clear()
-                self.stream_manager.workers.clear()
-
-                # 清空数据库
-                session: Session = self.Session()
-                try:
-                    deleted = session.query(Stream).delete()
-                    session.commit()
-                finally:
-                    session.close()
-
-                return jsonify({'success': True, 'stopped': stopped, 'deleted': deleted}), 200
+                return jsonify(self._single_flight('clear', self._clear_all)), 200
             except Exception as e:
                 self.logger.error(f"清空流配置失败: {e}")
                 return jsonify({'success': False, 'error': str(e)}), 500
@@ -626,122 +799,284 @@ class StreamService:
                 if not streams_list or not isinstance(streams_list, list):
                     return jsonify({'success': False, 'error': 'Missing "streams" list'}), 400
 
-                added = 0
-                errors = []
-                for cfg in streams_list:
-                    try:
-                        self._configure_single_stream(cfg)
-                        added += 1
-                    except Exception as e:
-                        errors.append({'stream': cfg.get('stream_id') or cfg.get('name'), 'error': str(e)})
-
-                return jsonify({'success': True, 'added_count': added, 'errors': errors}), 200
+                # 与其他批量配置接口一致: 部分失败返回 207，全部失败返回 400
+                added, errors = self._configure_streams_bulk(streams_list)
+                body = {'success': not errors, 'added_count': added, 'errors': errors}
+                if errors:
+                    return jsonify(body), 207 if added else 400
+                return jsonify(body)
             except Exception as e:
                 self.logger.error(f"导入流配置失败: {e}")
                 return jsonify({'success': False, 'error': str(e)}), 500
     
-    def _configure_single_stream(self, stream_config: Dict[str, Any]):
-        """将配置持久化到数据库 (UPSERT)."""
+    def _snapshot_response(self, jpeg: bytes, etag: str) -> Response:
+        """快照响应: 带 ETag，客户端 If-None-Match 命中时返回 304"""
+        response = Response(jpeg, mimetype='image/jpeg')
+        response.headers['Cache-Control'] = 'max-age=0, must-revalidate'
+        response.set_etag(etag)
+        return response.make_conditional(request)
+
+    def _default_interval(self, risk_level: str) -> float:
+        """按风险等级取默认帧间隔"""
+        return self.frame_filter.risk_intervals.get(str(risk_level).upper(), 2.0)
+
+    def _normalize_stream_config(self, stream_config: Dict[str, Any]) -> Dict[str, Any]:
+        """补全 stream_id、规范 risk_level 与 interval，返回映射到 Stream 模型的字段"""
         if 'stream_id' not in stream_config or not stream_config['stream_id']:
             stream_config['stream_id'] = str(uuid.uuid4())
 
-        stream_id = stream_config['stream_id']
-
         # -------- 规范 risk_level 并补全 interval --------
-        rl_map = {
-            '高': 'HIGH', '中': 'MEDIUM', '低': 'LOW',
-            'high': 'HIGH', 'medium': 'MEDIUM', 'low': 'LOW'
-        }
         rl_val = stream_config.get('risk_level')
         if rl_val is not None:
-            stream_config['risk_level'] = rl_map.get(str(rl_val).strip(), str(rl_val).upper())
+            stream_config['risk_level'] = _normalize_risk_level(rl_val)
 
         # 根据风险等级自动补全 interval，如果未提供
         if 'interval' not in stream_config and 'risk_level' in stream_config:
-            lvl = str(stream_config['risk_level']).upper()
-            stream_config['interval'] = self.frame_filter.risk_intervals.get(lvl, 2.0)
+            stream_config['interval'] = self._default_interval(stream_config['risk_level'])
 
-        self.logger.info(f"持久化流配置: {stream_id}")
+        # 映射字段到模型
+        return {
+            'stream_id': stream_config.get('stream_id'),
+            'name': stream_config.get('name'),
+            'url': stream_config.get('url'),
+            'risk_level': stream_config.get('risk_level', '中'),
+            'description': stream_config.get('description'),
+            'type': stream_config.get('type'),
+            'push_endpoint': stream_config.get('push_endpoint'),
+            'push_type': stream_config.get('push_type'),
+            'push_port': (
+                int(str(stream_config.get('push_port', '')).strip())
+                if str(stream_config.get('push_port', '')).strip().isdigit()
+                else None
+            ),
+        }
 
+    def _configure_single_stream(self, stream_config: Dict[str, Any]):
+        """将配置持久化到数据库 (UPSERT)."""
+        _, errors = self._configure_streams_bulk([stream_config])
+        if errors:
+            raise ValueError(errors[0]['error'])
+
+    def _configure_streams_bulk(self, stream_configs: List[Dict[str, Any]]):
+        """批量持久化流配置: 一次 IN 查询区分新增/更新，批量写入后单次提交
+
+        返回 (成功条数, 错误列表)。同一 stream_id 多次出现时按顺序合并。
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for stream_config in stream_configs:
+            mapped_fields = self._normalize_stream_config(stream_config)
+            merged = rows.setdefault(mapped_fields['stream_id'], {})
+            merged.update({k: v for k, v in mapped_fields.items() if v is not None})
+        if not rows:
+            return 0, []
+
+        self.logger.info(f"持久化流配置: {len(rows)} 个")
+
+        errors = []
         session: Session = self.Session()
         try:
-            existing = session.query(Stream).filter_by(stream_id=stream_id).first()
-
-            # 映射字段到模型
-            mapped_fields = {
-                'stream_id': stream_config.get('stream_id'),
-                'name': stream_config.get('name'),
-                'url': stream_config.get('url'),
-                'risk_level': stream_config.get('risk_level', '中'),
-                'description': stream_config.get('description'),
-                'type': stream_config.get('type'),
-                'push_endpoint': stream_config.get('push_endpoint'),
-                'push_type': stream_config.get('push_type'),
-                'push_port': (
-                    int(str(stream_config.get('push_port', '')).strip())
-                    if str(stream_config.get('push_port', '')).strip().isdigit()
-                    else None
-                ),
+            existing_ids = {
+                sid for (sid,) in
+                session.query(Stream.stream_id).filter(Stream.stream_id.in_(list(rows))).all()
             }
 
-            if existing:
-                for k, v in mapped_fields.items():
-                    if v is not None:
-                        setattr(existing, k, v)
-            else:
-                new_stream = Stream(**mapped_fields)
-                session.add(new_stream)
+            new_rows, update_rows = [], []
+            for stream_id, fields in rows.items():
+                if stream_id in existing_ids:
+                    update_rows.append(fields)
+                elif not fields.get('name') or not fields.get('url'):
+                    errors.append({'stream': stream_id, 'error': '新增流缺少 name 或 url'})
+                else:
+                    new_rows.append(fields)
 
+            if new_rows:
+                session.bulk_insert_mappings(Stream, new_rows)
+            if update_rows:
+                session.bulk_update_mappings(Stream, update_rows)
             session.commit()
+            return len(new_rows) + len(update_rows), errors
+        finally:
+            session.close()
+            self._invalidate_stream_rows()
+    
+    def _lookup_stream(self, stream_id: str) -> Optional[Dict[str, Any]]:
+        """按 stream_id（兼容 name）查询流配置，返回带短TTL缓存的普通字典副本"""
+        now = time.time()
+        with self._stream_row_lock:
+            cached = self._stream_row_cache.get(stream_id)
+        if cached and now - cached[0] < self._stream_row_ttl:
+            return dict(cached[1]) if cached[1] else None
+
+        session: Session = self.Session()
+        try:
+            db_stream = session.query(Stream).filter_by(stream_id=stream_id).first()
+            if not db_stream:
+                # 兼容前端使用 name 作为 id 的情况
+                db_stream = session.query(Stream).filter_by(name=stream_id).first()
+            row = db_stream.as_dict() if db_stream else None
         finally:
             session.close()
+
+        with self._stream_row_lock:
+            self._stream_row_cache[stream_id] = (now, row)
+        return dict(row) if row else None
+    
+    def _invalidate_stream_rows(self):
+        """流配置写入/删除后清空行缓存与总数缓存（name 与 stream_id 均可作为键，整体失效最简单）"""
+        with self._stream_row_lock:
+            self._stream_row_cache.clear()
+            self._stream_count = None
+            self._stream_rows_gen += 1
     
-    def _start_single_stream(self, stream_id: str, override_interval: float = None) -> Dict[str, Any]:
-        """启动单个视频流进程"""
+    def _single_flight(self, key: str, fn):
+        """同一 key 的调用并发到达时只执行一次 fn，其余调用方等待并复用结果（含异常）"""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def _start_all(self, frame_cfg: Dict[str, Any]) -> Dict[str, Any]:
+        """批量启动数据库中所有未运行的流"""
+        # 如果提供了高/中/低风险间隔则更新全局 risk_intervals
+        key_map = {
+            'highRiskInterval': 'HIGH',
+            'mediumRiskInterval': 'MEDIUM',
+            'lowRiskInterval': 'LOW'
+        }
+        updated = False
+        for k, level in key_map.items():
+            if k in frame_cfg:
+                try:
+                    self.frame_filter.risk_intervals[level] = float(frame_cfg[k])
+                    updated = True
+                except ValueError:
+                    pass
+        if updated:
+            self.logger.info(f"批量启动更新 risk_intervals 为: {self.frame_filter.risk_intervals}")
+
+        started = 0
+        errors = {}
+        session: Session = self.Session()
+        try:
+            all_db_streams = session.query(Stream).all()
+            for db_stream in all_db_streams:
+                sid = db_stream.stream_id
+                if self.stream_manager.get_stream(sid) and self.stream_manager.get_stream(sid).is_running():
+                    continue  # 已运行
+                # 根据流风险等级确定间隔
+                override_interval = None
+                level = str(db_stream.risk_level or '').lower()
+                if level in ['高', 'high'] and 'highRiskInterval' in frame_cfg:
+                    override_interval = frame_cfg['highRiskInterval']
+                elif level in ['中', 'medium'] and 'mediumRiskInterval' in frame_cfg:
+                    override_interval = frame_cfg['mediumRiskInterval']
+                elif level in ['低', 'low'] and 'lowRiskInterval' in frame_cfg:
+                    override_interval = frame_cfg['lowRiskInterval']
+
+                result = self._start_single_stream(sid, override_interval, preloaded_cfg=db_stream.as_dict())
+                if result.get('success'):
+                    started += 1
+                else:
+                    errors[sid] = result.get('error', 'unknown')
+            msg = f"成功启动 {started} 路视频流"
+            return {'success': True, 'message': msg, 'errors': errors}
+        finally:
+            session.close()
+
+    def _stop_all(self) -> Dict[str, Any]:
+        """停止所有正在运行的流"""
+        stopped = 0
+        errors = {}
+        for sid, sinfo in list(self.stream_manager.streams.items()):
+            if not sinfo.is_running():
+                continue
+            result = self._stop_single_stream(sid)
+            if result.get('success'):
+                stopped += 1
+            else:
+                errors[sid] = result.get('error', 'unknown')
+        msg = f"成功停止 {stopped} 路视频流"
+        return {'success': True, 'message': msg, 'errors': errors}
+
+    def _clear_all(self) -> Dict[str, Any]:
+        """停止并删除所有流配置（包括数据库与内存）"""
+        # 统计停止数量
+        stopped = 0
+        for sid in list(self.stream_manager.streams.keys()):
+            try:
+                self._stop_single_stream(sid)
+            except Exception:
+                pass
+            # 移除过滤器缓存
+            try:
+                self.frame_filter.remove_stream(sid)
+            except Exception:
+                pass
+            stopped += 1
+        # 清空管理器内部状态
+        self.stream_manager.streams.clear()
+        self.stream_manager.workers.clear()
+        self._last_jpeg.clear()
+
+        # 清空数据库
+        session: Session = self.Session()
+        try:
+            deleted = session.query(Stream).delete()
+            session.commit()
+        finally:
+            session.close()
+        self._invalidate_stream_rows()
+
+        return {'success': True, 'stopped': stopped, 'deleted': deleted}
+
+    def _start_single_stream(self, stream_id: str, override_interval: float = None,
+                             preloaded_cfg: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """启动单个视频流进程；preloaded_cfg 为调用方已查询到的流配置字典，提供时不再查库"""
         try:
             # 如果流在运行时尚未加载，则从数据库载入配置
             if not self.stream_manager.get_stream(stream_id):
-                session: Session = self.Session()
-                try:
-                    db_stream = session.query(Stream).filter_by(stream_id=stream_id).first()
-                    if not db_stream:
-                        # 兼容前端使用 name 作为 id 的情况
-                        db_stream = session.query(Stream).filter_by(name=stream_id).first()
-                    if not db_stream:
-                        return {'success': False, 'error': '未找到流配置'}
-
-                    stream_dict = db_stream.as_dict()
-                    # 若为本地文件流，解析绝对路径
-                    if db_stream.type == 'file':
-                        stream_dict['url'] = self._resolve_media_path(stream_dict['url'])
-
-                    # 根据风险等级或覆盖值确定帧间隔
-                    if override_interval is not None:
-                        stream_dict['interval'] = float(override_interval)
-                    else:
-                        rl_val = stream_dict.get('risk_level', 'MEDIUM')
-                        rl_map = {
-                            '高': 'HIGH', '中': 'MEDIUM', '低': 'LOW',
-                            'high': 'HIGH', 'medium': 'MEDIUM', 'low': 'LOW',
-                            'HIGH': 'HIGH', 'MEDIUM': 'MEDIUM', 'LOW': 'LOW'
-                        }
-                        risk_level_key = rl_map.get(str(rl_val).strip(), str(rl_val).upper())
-                        stream_dict['risk_level'] = risk_level_key  # 规范化存回
-                        stream_dict['interval'] = self.frame_filter.risk_intervals.get(risk_level_key, 2.0)
-
-                    self.stream_manager.add_stream(stream_dict)
-
-                    # 配置过滤器（使用 stream_dict['interval']）
-                    risk_cfg = RiskConfig(
-                        level=stream_dict.get('risk_level', 'medium'),
-                        frame_interval=stream_dict.get('interval', 1.0),
-                        confidence_threshold=stream_dict.get('confidence_threshold', 0.5),
-                        max_objects=stream_dict.get('max_objects', 10),
-                        detection_classes=stream_dict.get('detection_classes'),
-                    )
-                    self.frame_filter.configure_stream(stream_id, asdict(risk_cfg))
-                finally:
-                    session.close()
+                stream_dict = preloaded_cfg if preloaded_cfg is not None else self._lookup_stream(stream_id)
+                if not stream_dict:
+                    return {'success': False, 'error': '未找到流配置'}
+
+                # 若为本地文件流，解析绝对路径
+                if stream_dict.get('type') == 'file':
+                    stream_dict['url'] = self._resolve_media_path(stream_dict['url'])
+
+                # 根据风险等级或覆盖值确定帧间隔
+                if override_interval is not None:
+                    stream_dict['interval'] = float(override_interval)
+                else:
+                    risk_level_key = _normalize_risk_level(stream_dict.get('risk_level', 'MEDIUM'))
+                    stream_dict['risk_level'] = risk_level_key  # 规范化存回
+                    stream_dict['interval'] = self._default_interval(risk_level_key)
+
+                self.stream_manager.add_stream(stream_dict)
+
+                # 配置过滤器（使用 stream_dict['interval']）
+                risk_cfg = RiskConfig(
+                    level=stream_dict.get('risk_level', 'medium'),
+                    frame_interval=stream_dict.get('interval', 1.0),
+                    confidence_threshold=stream_dict.get('confidence_threshold', 0.5),
+                    max_objects=stream_dict.get('max_objects', 10),
+                    detection_classes=stream_dict.get('detection_classes'),
+                )
+                self.frame_filter.configure_stream(stream_id, asdict(risk_cfg))
 
             # 如果流已存在于管理器中，则可能需要更新间隔
             if override_interval is not None and self.stream_manager.get_stream(stream_id):
@@ -754,6 +1089,7 @@ class StreamService:
             success = self.stream_manager.start_stream(stream_id)
             if success:
                 self.stats['active_streams'] += 1
+                self._schedule_wake.set()
                 return {'success': True}
             else:
                 return {'success': False, 'error': '流启动失败'}
@@ -767,6 +1103,7 @@ class StreamService:
             success = self.stream_manager.stop_stream(stream_id)
             if success:
                 self.stats['active_streams'] = max(0, self.stats['active_streams'] - 1)
+                self._schedule_wake.set()
                 return {'success': True}
             else:
                 return {'success': False, 'error': '流停止失败'}
@@ -786,121 +1123,363 @@ class StreamService:
             target=self._stats_update_loop, daemon=True
         )
         self.stats_thread.start()
+        
+        # 预览抓帧连接池回收线程
+        self.cap_reaper_thread = threading.Thread(
+            target=self._capture_reaper_loop, daemon=True
+        )
+        self.cap_reaper_thread.start()
+    
+    @staticmethod
+    def _open_capture(url: str):
+        """打开 VideoCapture；网络流限制连接超时，避免预览请求长时间挂起"""
+        if '://' not in url:
+            return cv2.VideoCapture(url)
+        params = []
+        open_timeout = getattr(cv2, 'CAP_PROP_OPEN_TIMEOUT_MSEC', None)
+        if open_timeout is not None:
+            params = [open_timeout, 2000]
+        try:
+            return cv2.VideoCapture(url, cv2.CAP_FFMPEG, params)
+        except TypeError:
+            # OpenCV < 4.5.2 不支持 params 参数
+            return cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+    
+    def _grab_pooled_frame(self, url: str):
+        """从共享的 VideoCapture 抓取一帧；同一 URL 的并发请求串行复用同一连接"""
+        with self._cap_pool_lock:
+            entry = self._cap_pool.get(url)
+            if entry is None:
+                entry = self._cap_pool[url] = [None, 0.0, threading.Lock()]
+            # 取出时即刷新使用时间，回收线程据此跳过即将被使用的连接
+            entry[1] = time.time()
+        
+        with entry[2]:
+            frame = None
+            # 已有连接读取失败（断流、文件读到末尾）时重新打开一次
+            for _ in range(2):
+                if entry[0] is None or not entry[0].isOpened():
+                    entry[0] = self._open_capture(url)
+                ret, cap_frame = entry[0].read()
+                if ret:
+                    frame = cap_frame
+                    break
+                entry[0].release()
+                entry[0] = None
+            entry[1] = time.time()
+            return frame
     
+    def _capture_reaper_loop(self):
+        """定期关闭空闲超时的预览 VideoCapture"""
+        while not self.stop_event.wait(self._cap_idle_timeout / 3):
+            deadline = time.time() - self._cap_idle_timeout
+            with self._cap_pool_lock:
+                idle = [(url, entry) for url, entry in self._cap_pool.items() if entry[1] < deadline]
+            for url, entry in idle:
+                # 正在抓帧的连接跳过，下一轮再检查
+                if not entry[2].acquire(blocking=False):
+                    continue
+                try:
+                    with self._cap_pool_lock:
+                        if entry[1] >= deadline or self._cap_pool.get(url) is not entry:
+                            continue
+                        del self._cap_pool[url]
+                    if entry[0] is not None:
+                        entry[0].release()
+                        entry[0] = None
+                except Exception as e:
+                    self.logger.warning(f'关闭空闲预览连接失败: {e}')
+                finally:
+                    entry[2].release()
+    
+    # 流已到期但缓冲区暂无帧时的重试间隔（纳秒）
+    FRAME_RETRY_DELAY_NS = 50_000_000
+
+    def _build_send_schedule(self) -> List[Tuple[float, str]]:
+        """按 (下次应发送时间 monotonic_ns, stream_id) 为所有运行中的流重建最小堆"""
+        heap = [
+            (info.last_sent_ns + int(info.interval * 1e9), sid)
+            for sid, info in self.stream_manager.get_running_streams()
+        ]
+        heapq.heapify(heap)
+        return heap
+
     def _frame_processing_loop(self):
-        """核心处理循环 - 从缓冲区获取帧并发送到检测服务"""
+        """核心处理循环 - 按最小堆调度，仅在最早到期的流到点时醒来取帧并发送到检测服务"""
+        heap: List[Tuple[int, str]] = []
+        status_version = -1
+        wall_base = time.time() - time.monotonic_ns() / 1e9
         while not self.stop_event.is_set():
             try:
-                # 从所有运行中的流中轮流获取帧
-                active_streams_items = self.stream_manager.get_running_streams()
-                
-                if not active_streams_items:
-                    time.sleep(0.5)
+                # 新流启动、间隔调整或运行状态变化时整体重建调度堆，O(K) 只发生在变化时
+                current_version = self.stream_manager.status_version
+                if self._schedule_wake.is_set() or current_version != status_version:
+                    self._schedule_wake.clear()
+                    status_version = current_version
+                    heap = self._build_send_schedule()
+                    # 重建时校准墙钟与单调时钟的差值，吸收期间的系统时钟调整
+                    wall_base = time.time() - time.monotonic_ns() / 1e9
+
+                if not heap:
+                    # 没有运行中的流时一直睡到有流启动或状态变化
+                    self._schedule_wake.wait()
                     continue
 
-                for stream_id, stream_info in active_streams_items:
-                    # 使用属性访问
-                    if not stream_info.is_running():
-                        continue
-                    
-                    # 根据最后一次发送的时间决定是否发送，避免被读取频率影响
-                    last_sent = getattr(stream_info, "_last_sent_ts", 0)
-                    if time.time() - last_sent < stream_info.interval:
-                        continue
-                        
-                    frame = self.stream_manager.get_frame_from_buffer(stream_id)
-                    if frame is not None:
-                        self.stats['total_frames_received'] += 1
-                        
-                        # 直接异步提交到线程池，节流逻辑由 _last_sent_ts 控制
-                        self.send_executor.submit(
-                            self._send_to_detection_service,
-                            {
-                                'stream_id': stream_id,
-                                'frame': frame,
-                                'timestamp': time.time(),
-                                'risk_config': self.frame_filter.get_stream_config(stream_id)
-                            }
-                        )
-                        # 记录本次发送时间
-                        stream_info._last_sent_ts = time.time()
-                
-                # 避免CPU空转
-                time.sleep(0.01)
+                # 每个调度周期只读一次单调时钟（整数纳秒，不受系统时钟回拨影响），本周期所有到期流共用
+                now_ns = time.monotonic_ns()
+                due = heap[0][0]
+                if due > now_ns:
+                    # 精确睡到最早到期的流；期间有流启停、状态或配置变化会被唤醒
+                    self._schedule_wake.wait((due - now_ns) / 1e9)
+                    continue
+
+                # 先取出本周期全部到期项再处理，重新入堆的项不会在同一周期被再次取出
+                due_ids = []
+                while heap and heap[0][0] <= now_ns:
+                    due_ids.append(heapq.heappop(heap)[1])
+                # 对外的帧时间戳由墙钟基准换算，不再逐帧读取 time.time()
+                timestamp = wall_base + now_ns / 1e9
+                for stream_id in due_ids:
+                    self._dispatch_due_stream(heap, stream_id, now_ns, timestamp)
 
             except Exception as e:
                 self.logger.error(f"帧处理循环错误: {e}", exc_info=True)
+                # 已出堆但未处理的到期项会丢失，下一轮整体重建调度堆
+                self._schedule_wake.set()
                 time.sleep(1) # 发生错误时暂停一下
     
-    def _capture_frame_from_stream(self, stream_id: str, stream_info: Any) -> Optional[Dict[str, Any]]:
-        """从单个视频流捕获帧"""
-        try:
-            # stream_info 现在是 StreamInfo 对象
-            if not stream_info.is_running() or not stream_info.capture:
-                return None
-            
-            ret, frame = stream_info.capture.read()
-            if not ret:
-                stream_info.error_count += 1
-                if stream_info.error_count > 100: # 连续100次失败则停止
-                    self.logger.warning(f"流 {stream_id} 连续读取失败，将停止该流")
-                    self._stop_single_stream(stream_id)
-                return None
-            
-            stream_info.error_count = 0
-            return frame
+    def _dispatch_due_stream(self, heap: List[Tuple[int, str]], stream_id: str,
+                             now_ns: int, timestamp: float):
+        """取一个到期流的最新帧提交发送，并按其间隔重新排入调度堆"""
+        stream_info = self.stream_manager.get_stream(stream_id)
+        if not stream_info or not stream_info.is_running():
+            return
+
+        frame = self.stream_manager.get_frame_from_buffer(stream_id)
+        if frame is None:
+            heapq.heappush(heap, (now_ns + self.FRAME_RETRY_DELAY_NS, stream_id))
+            return
+
+        self.stats['total_frames_received'] += 1
+        # 直接异步提交到线程池，节流逻辑由调度堆控制；在途已满时本周期丢帧，仍按间隔排入下一次
+        self._submit_frame({
+            'stream_id': stream_id,
+            'frame': frame,
+            'timestamp': timestamp,
+            'risk_config': self.frame_filter.get_stream_config(stream_id)
+        })
+        # 记录本次发送时间并排入下一次
+        stream_info.last_sent_ns = now_ns
+        heapq.heappush(heap, (now_ns + int(stream_info.interval * 1e9), stream_id))
+
+    def _init_jpeg_encoder(self, name: str) -> str:
+        """确定发送帧使用的 JPEG 编码器，依赖不可用时回退到 opencv"""
+        if name == 'nvjpeg':
+            try:
+                from nvjpeg import NvJpeg
+                self._nvjpeg = NvJpeg()
+                self.logger.info("发送帧使用 nvJPEG GPU 编码")
+                return 'nvjpeg'
+            except Exception as e:
+                self.logger.warning(f"nvJPEG 不可用，回退到 opencv 编码: {e}")
+        elif name == 'turbojpeg':
+            if TURBOJPEG_AVAILABLE:
+                return 'turbojpeg'
+            self.logger.warning("未安装 PyTurboJPEG，回退到 opencv 编码")
+        return 'opencv'
+
+    def _encode_frame_jpeg(self, frame) -> bytes:
+        """编码待检测帧；关闭 Huffman 优化以缩短编码时间"""
+        if self.jpeg_encoder == 'nvjpeg':
+            # 输入 BGR ndarray，上传/编码/回传均在库内完成
+            return self._nvjpeg.encode(frame, self.send_jpeg_quality)
+        if self.jpeg_encoder == 'turbojpeg':
+            return _turbo.encode(frame, quality=self.send_jpeg_quality, jpeg_subsample=TJSAMP_420)
+        _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.send_jpeg_quality,
+                                                 int(cv2.IMWRITE_JPEG_OPTIMIZE), 0])
+        return buffer.tobytes()
+
+    def _encode_stream_frame(self, stream_id: str, frame) -> bytes:
+        """编码某个流的待检测帧；画面与上一帧完全相同（静止场景）时直接复用上次的 JPEG"""
+        if not self.jpeg_dedup:
+            return self._encode_frame_jpeg(frame)
+        digest = _frame_digest(frame)
+        cached = self._last_jpeg.get(stream_id)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        jpeg = self._encode_frame_jpeg(frame)
+        self._last_jpeg[stream_id] = (digest, jpeg)
+        return jpeg
+
+    @staticmethod
+    def _frame_meta(frame_data: Dict[str, Any]) -> Dict[str, Any]:
+        """检测请求的元数据部分"""
+        return {
+            'stream_id': frame_data['stream_id'],
+            'timestamp': frame_data['timestamp'],
+            'config': frame_data.get('risk_config', {})
+        }
 
-        except Exception as e:
-            self.logger.error(f"捕获流 {stream_id} 的帧时出错: {e}")
-            stream_info.error_count += 1
+    @staticmethod
+    def _raw_frame_headers(meta: Dict[str, Any]) -> Dict[str, str]:
+        """raw 传输方式下承载元数据的请求头"""
+        return {
+            'Content-Type': 'image/jpeg',
+            'X-Stream-Id': str(meta['stream_id']),
+            'X-Timestamp': repr(meta['timestamp']),
+            'X-Config': json.dumps(meta['config']),
+        }
+
+    def _record_send_result(self, stream_id: str, status_code: int):
+        """记录检测服务响应"""
+        if status_code == 200:
+            self.stats['total_frames_processed'] += 1
+            self.logger.info(f"帧发送成功: {stream_id}")
+        else:
+            self.logger.warning(f"检测服务响应错误: {status_code}")
+
+    def _submit_frame(self, frame_data: Dict[str, Any]) -> bool:
+        """提交一帧到发送通道：启用异步发送时进入事件循环，否则进入线程池；在途已满时丢弃并返回 False"""
+        if not self._send_slots.acquire(blocking=False):
+            self.stats['frames_dropped'] += 1
+            return False
+        if self._async_loop is not None:
+            asyncio.run_coroutine_threadsafe(self._async_send_to_detection_service(frame_data), self._async_loop)
+        else:
+            self.send_executor.submit(self._send_to_detection_service, frame_data)
+        return True
+
+    def _post_shm_frame(self, frame_data: Dict[str, Any]):
+        """共享内存传输：帧拷入槽位后只发送槽位位置；槽位不可用或检测服务拒绝时返回 None，由调用方改走 JPEG"""
+        # 取局部引用：其他发送线程可能因检测服务拒绝而同时关闭共享内存传输
+        pool = self.frame_pool
+        if pool is None:
             return None
-    
+        frame = frame_data['frame']
+        slot = pool.acquire(frame)
+        if slot is None:
+            return None
+        idx, offset = slot
+        frame_data.pop('frame')
+        headers = self._raw_frame_headers(self._frame_meta(frame_data))
+        headers.update({
+            'Content-Type': 'application/x-shm-frame',
+            'X-Shm-Name': pool.name,
+            'X-Shm-Offset': str(offset),
+            'X-Frame-Shape': ','.join(str(v) for v in frame.shape),
+            'X-Frame-Dtype': str(frame.dtype),
+        })
+        try:
+            response = self.http.post(f"{self.detection_service_url}/api/detect/frame", headers=headers, timeout=(1, 5))
+        except Exception:
+            # 超时/连接中断时检测服务可能仍在读取该槽位（零拷贝视图），暂扣而不是立即复用
+            pool.quarantine(idx)
+            raise
+        # 收到响应说明检测服务已读完槽位，可以归还
+        pool.release(idx)
+        if response.status_code == 415:
+            # 检测服务未开启 processing.accept_shm_frames：本帧与后续帧改走 JPEG
+            self.logger.warning("检测服务不接受共享内存帧，改用 raw 传输")
+            self.frame_pool = None
+            self.frame_transport = 'raw'
+            frame_data['frame'] = frame
+            return None
+        return response
+
     def _send_to_detection_service(self, frame_data: Dict[str, Any]):
         """将帧数据异步发送到检测服务"""
         try:
-            # 编码帧数据
-            frame = frame_data['frame']
-            _, buffer = cv2.imencode('.jpg', frame)
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            
-            # 构建请求数据
-            payload = {
-                'stream_id': frame_data['stream_id'],
-                'image': frame_base64,
-                'timestamp': frame_data['timestamp'],
-                'config': frame_data.get('risk_config', {})
-            }
+            if self.frame_pool is not None:
+                response = self._post_shm_frame(frame_data)
+                if response is not None:
+                    self._record_send_result(frame_data['stream_id'], response.status_code)
+                    return
+
+            # 编码后立即释放整帧引用，网络等待期间不再占用内存
+            jpeg = self._encode_stream_frame(frame_data['stream_id'], frame_data.pop('frame'))
+            meta = self._frame_meta(frame_data)
+            url = f"{self.detection_service_url}/api/detect/frame"
             
             # 异步发送到检测服务
-            response = requests.post(
-                f"{self.detection_service_url}/api/detect/frame",
-                json=payload,
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                self.stats['total_frames_processed'] += 1
-                self.logger.info(f"帧发送成功: {frame_data['stream_id']}")
+            if self.frame_transport == 'multipart':
+                # JPEG 原始字节走 multipart，元数据单独作为 JSON 字段
+                response = self.http.post(
+                    url,
+                    data={'meta': json.dumps(meta)},
+                    files={'frame': ('frame.jpg', jpeg, 'image/jpeg')},
+                    timeout=(1, 5)
+                )
+            elif self.frame_transport == 'base64':
+                # 兼容未升级的检测服务
+                meta['image'] = base64.b64encode(jpeg).decode('utf-8')
+                response = self.http.post(url, json=meta, timeout=(1, 5))
             else:
-                self.logger.warning(f"检测服务响应错误: {response.status_code}")
+                # 请求体即 JPEG，元数据放在头部，无需 multipart 组包
+                response = self.http.post(url, data=jpeg, headers=self._raw_frame_headers(meta), timeout=(1, 5))
+            
+            self._record_send_result(frame_data['stream_id'], response.status_code)
                 
         except Exception as e:
             self.logger.error(f"发送到检测服务失败: {e}")
+        finally:
+            self._send_slots.release()
+    
+    def _start_async_sender(self, encode_workers: int, limit: int):
+        """启动异步发送事件循环线程；编码仍在小线程池中执行"""
+        loop = asyncio.new_event_loop()
+        self._encode_pool = ThreadPoolExecutor(max_workers=encode_workers, thread_name_prefix='frame-encode')
+
+        async def setup():
+            # ClientSession 需在事件循环内创建
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=limit, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=5, sock_connect=1),
+            )
+            self._aio_limit = asyncio.Semaphore(limit)
+
+        threading.Thread(target=loop.run_forever, name='frame-sender', daemon=True).start()
+        asyncio.run_coroutine_threadsafe(setup(), loop).result()
+        self._async_loop = loop
+        self.logger.info(f"启用 aiohttp 异步发送，最大并发 {limit}")
+
+    async def _async_send_to_detection_service(self, frame_data: Dict[str, Any]):
+        """_send_to_detection_service 的 aiohttp 版本：单线程事件循环承载所有在途请求"""
+        try:
+            loop = asyncio.get_running_loop()
+            jpeg = await loop.run_in_executor(self._encode_pool, self._encode_stream_frame,
+                                              frame_data['stream_id'], frame_data.pop('frame'))
+            meta = self._frame_meta(frame_data)
+            url = f"{self.detection_service_url}/api/detect/frame"
+
+            if self.frame_transport == 'multipart':
+                form = aiohttp.FormData()
+                form.add_field('meta', json.dumps(meta))
+                form.add_field('frame', jpeg, filename='frame.jpg', content_type='image/jpeg')
+                kwargs = {'data': form}
+            elif self.frame_transport == 'base64':
+                meta['image'] = base64.b64encode(jpeg).decode('utf-8')
+                kwargs = {'json': meta}
+            else:
+                kwargs = {'data': jpeg, 'headers': self._raw_frame_headers(meta)}
+
+            async with self._aio_limit:
+                async with self._aio_session.post(url, **kwargs) as response:
+                    await response.read()
+                    status_code = response.status
+            self._record_send_result(frame_data['stream_id'], status_code)
+
+        except Exception as e:
+            self.logger.error(f"发送到检测服务失败: {e}")
+        finally:
+            self._send_slots.release()
     
     def _stats_update_loop(self):
         """定期更新统计信息"""
         while not self.stop_event.is_set():
             try:
+                # 流状态由 StreamWorker 在启动/异常时通过 _set_status 维护，此处只汇总
                 self.stats['active_streams'] = self.stream_manager.get_active_stream_count()
                 
-                # 更新每个流的状态
-                for stream_info in self.stream_manager.streams.values():
-                    if stream_info.process and stream_info.process.is_alive():
-                        stream_info.status = 'running'
-                    else:
-                        if stream_info.status == 'running':
-                            stream_info.status = 'stopped' # 如果进程不在了，更新状态
-                
                 time.sleep(5) # 每5秒更新一次
             except Exception as e:
                 self.logger.error(f"统计更新错误: {e}", exc_info=True)
@@ -910,19 +1489,20 @@ class StreamService:
         """获取当前服务的统计信息"""
         filter_stats = self.frame_filter.get_all_stats()
         
-        # 生成每个流的健康信息
+        # 生成每个流的健康信息；发送时间内部按 monotonic_ns 记录，对外换算为墙钟时间戳
         per_stream = {}
+        now = time.time()
+        now_ns = time.monotonic_ns()
         for sid, sinfo in self.stream_manager.streams.items():
+            last_sent_ns = sinfo.last_sent_ns
+            since_sent = (now_ns - last_sent_ns) / 1e9 if last_sent_ns else None
             per_stream[sid] = {
                 'status': sinfo.status.value,
-                'last_sent_ts': getattr(sinfo, '_last_sent_ts', None),
-                'time_since_last_sent': (
-                    time.time() - getattr(sinfo, '_last_sent_ts', 0)
-                    if getattr(sinfo, '_last_sent_ts', None) else None
-                ),
+                'last_sent_ts': now - since_sent if since_sent is not None else None,
+                'time_since_last_sent': since_sent,
                 'last_frame_time': sinfo.last_frame_time,
                 'time_since_last_read': (
-                    time.time() - sinfo.last_frame_time if sinfo.last_frame_time else None
+                    now - sinfo.last_frame_time if sinfo.last_frame_time else None
                 ),
             }
 
@@ -933,6 +1513,7 @@ class StreamService:
                 'total_received': self.stats['total_frames_received'],
                 'total_filtered': self.stats['total_frames_filtered'],
                 'total_processed': self.stats['total_frames_processed'],
+                'dropped': self.stats['frames_dropped'],
                 'filter_efficiency': (
                     self.stats['total_frames_filtered'] / max(1, self.stats['total_frames_received'])
                 ) * 100
@@ -970,6 +1551,28 @@ class StreamService:
             return path
         return os.path.join(self.media_base_dir, path)
 
+    def _thumbnail_path(self, stream_id: str) -> str:
+        """本地文件流缩略图的落盘路径：<media>/thumbs/<sid>.jpg"""
+        return os.path.join(self.media_base_dir, 'thumbs', f'{secure_filename(stream_id) or "_"}.jpg')
+
+    def _thumbnail_fresh(self, thumb_path: str) -> bool:
+        """缩略图存在且未超过有效期"""
+        try:
+            return time.time() - os.path.getmtime(thumb_path) < self._thumbnail_ttl
+        except OSError:
+            return False
+
+    def _write_thumbnail(self, thumb_path: str, jpeg: bytes):
+        """写穿缩略图；先写临时文件再原子替换，避免并发请求读到半个文件"""
+        try:
+            os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+            tmp_path = f'{thumb_path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(jpeg)
+            os.replace(tmp_path, thumb_path)
+        except OSError as e:
+            self.logger.warning(f'写入缩略图失败: {e}')
+
 def main():
     """视频流服务启动入口"""
     import argparse
@@ -7,67 +7,105 @@
 
 import time
 import logging
+import threading
+from collections import namedtuple
 from typing import Dict, Optional, Any
 import cv2
 import numpy as np
 
+# 单个流的抽帧配置（不可变），更新时整体替换
+StreamCfg = namedtuple('StreamCfg', 'frame_interval risk_level enabled')
+
+class _StreamTimer:
+    """单个流的最后处理时间（time.monotonic_ns() 整数纳秒，0 表示尚未处理过）"""
+    __slots__ = ('last_ns',)
+
+    def __init__(self):
+        self.last_ns = 0
+
+# 抽帧判断所需的不可变快照: 间隔（纳秒）/ 是否启用 / 计时单元；重新配置时沿用同一计时单元
+_Gate = namedtuple('_Gate', 'interval_ns enabled timer')
+
 class FrameFilter:
     """帧预过滤器 - 核心抽帧逻辑"""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        # 记录每个流的最后处理时间
-        self.last_process_time = {}
-        # 流配置缓存
-        self.stream_configs = {}
+        # 流配置缓存: stream_id -> StreamCfg；写入方持锁复制后整体替换，读取方无需加锁
+        self.stream_configs: Dict[str, StreamCfg] = {}
+        # 抽帧判断快照: stream_id -> _Gate，与 stream_configs 一同发布，should_process_frame 无锁读取
+        self._gates: Dict[str, _Gate] = {}
+        self._lock = threading.Lock()
         
     def configure_stream(self, stream_id: str, config: Dict[str, Any]):
         """配置流的抽帧参数"""
-        self.stream_configs[stream_id] = {
-            'frame_interval': config.get('frame_interval', 2.0),  # 默认2秒抽1帧
-            'risk_level': config.get('risk_level', 'MEDIUM'),
-            'enabled': config.get('enabled', True)
-        }
+        cfg = StreamCfg(
+            frame_interval=config.get('frame_interval', 2.0),  # 默认2秒抽1帧
+            risk_level=config.get('risk_level', 'MEDIUM'),
+            enabled=config.get('enabled', True)
+        )
         
-        # 初始化时间记录
-        if stream_id not in self.last_process_time:
-            self.last_process_time[stream_id] = 0
+        with self._lock:
+            self._publish_config(stream_id, cfg)
         
         self.logger.info(f"配置流 {stream_id} 抽帧间隔: {config.get('frame_interval', 2.0)}秒")
     
-    def should_process_frame(self, stream_id: str, current_time: float = None) -> bool:
+    def _publish_config(self, stream_id: str, cfg: Optional[StreamCfg]):
+        """写时复制后整体替换配置表与判断快照，cfg 为 None 表示删除（调用方持有锁）"""
+        configs = dict(self.stream_configs)
+        gates = dict(self._gates)
+        if cfg is None:
+            configs.pop(stream_id, None)
+            gates.pop(stream_id, None)
+        else:
+            configs[stream_id] = cfg
+            # 已有流重新配置时沿用计时单元，保留最后处理时间
+            old = gates.get(stream_id)
+            gates[stream_id] = _Gate(int(cfg.frame_interval * 1e9), bool(cfg.enabled),
+                                     old.timer if old else _StreamTimer())
+        self.stream_configs = configs
+        self._gates = gates
+    
+    def should_process_frame(self, stream_id: str, now_ns: int = None) -> bool:
         """
         判断是否应该处理当前帧
         
         Args:
             stream_id: 流ID
-            current_time: 当前时间戳，如果为None则使用当前时间
+            now_ns: 当前 time.monotonic_ns()（整数纳秒，可按位置或关键字传入），如果为None则现取
             
         Returns:
             bool: True表示应该处理该帧，False表示跳过
+        
+        Raises:
+            TypeError: now_ns 不是整数。第二个参数原为 current_time（time.time() 浮点秒），
+                旧调用方按位置传入浮点秒时会直接报错，需改为传 time.monotonic_ns() 或省略
         """
-        if current_time is None:
-            current_time = time.time()
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        elif not isinstance(now_ns, int):
+            # 误传 time.time() 浮点秒会让该流永远不到期，直接报错
+            raise TypeError(f"now_ns 须为 time.monotonic_ns() 整数纳秒，收到 {type(now_ns).__name__}")
         
-        # 获取流配置
-        stream_config = self.stream_configs.get(stream_id)
-        if not stream_config or not stream_config.get('enabled', True):
+        # 无锁读取已发布的不可变快照；同一流的帧只由其采集线程判断，读-改-写无需加锁
+        gate = self._gates.get(stream_id)
+        if gate is None or not gate.enabled:
             return False
         
-        frame_interval = stream_config.get('frame_interval', 2.0)
-        
-        # 获取最后处理时间
-        last_time = self.last_process_time.get(stream_id, 0)
-        
-        # 判断是否达到间隔时间
-        if current_time - last_time >= frame_interval:
-            # 更新最后处理时间
-            self.last_process_time[stream_id] = current_time
-            
-            self.logger.debug(f"流 {stream_id} 通过时间过滤 - 间隔: {current_time - last_time:.2f}s")
-            return True
+        # 判断是否达到间隔时间，到达则更新最后处理时间（全程整数运算）
+        timer = gate.timer
+        last_ns = timer.last_ns
+        if now_ns - last_ns < gate.interval_ns:
+            return False
+        timer.last_ns = now_ns
         
-        return False
+        self.logger.debug(f"流 {stream_id} 通过时间过滤 - 间隔: {(now_ns - last_ns) / 1e9:.2f}s")
+        return True
+    
+    def _last_ns_of(self, stream_id: str) -> int:
+        """读取流的最后处理时间（monotonic_ns），未配置或未处理过返回 0"""
+        gate = self._gates.get(stream_id)
+        return gate.timer.last_ns if gate else 0
     
     def filter_frame(self, stream_id: str, frame: np.ndarray, timestamp: float = None) -> Optional[Dict[str, Any]]:
         """
@@ -76,7 +114,8 @@ class FrameFilter:
         Args:
             stream_id: 流ID
             frame: 帧数据
-            timestamp: 时间戳
+            timestamp: 写入帧数据包的墙钟时间戳，默认当前时间；不参与间隔判断，
+                       间隔按 time.monotonic_ns() 计算
             
         Returns:
             Dict: 如果通过过滤返回帧数据包，否则返回None
@@ -84,8 +123,8 @@ class FrameFilter:
         if timestamp is None:
             timestamp = time.time()
         
-        # 预过滤检查
-        if not self.should_process_frame(stream_id, timestamp):
+        # 预过滤检查（间隔按单调时钟判断，timestamp 仅作为帧数据包的墙钟时间）
+        if not self.should_process_frame(stream_id):
             return None
         
         # 构建帧数据包
@@ -98,64 +137,74 @@ class FrameFilter:
         }
         
         # 记录统计信息
-        stream_config = self.stream_configs.get(stream_id, {})
+        cfg = self.stream_configs.get(stream_id)
         frame_data['config'] = {
-            'frame_interval': stream_config.get('frame_interval', 2.0),
-            'risk_level': stream_config.get('risk_level', 'MEDIUM')
+            'frame_interval': cfg.frame_interval if cfg else 2.0,
+            'risk_level': cfg.risk_level if cfg else 'MEDIUM'
         }
         
         return frame_data
     
     def get_stream_stats(self, stream_id: str) -> Dict[str, Any]:
         """获取流的统计信息"""
-        config = self.stream_configs.get(stream_id, {})
-        last_time = self.last_process_time.get(stream_id, 0)
+        cfg = self.stream_configs.get(stream_id) or StreamCfg(2.0, 'MEDIUM', True)
+        last_ns = self._last_ns_of(stream_id)
         current_time = time.time()
+        # 对外仍输出墙钟时间戳：由单调时钟的间隔反推；未处理过时保持原语义（last=0）
+        if last_ns:
+            since = (time.monotonic_ns() - last_ns) / 1e9
+            last_time = current_time - since
+        else:
+            since = current_time
+            last_time = 0.0
         
         return {
             'stream_id': stream_id,
-            'frame_interval': config.get('frame_interval', 2.0),
-            'risk_level': config.get('risk_level', 'MEDIUM'),
-            'enabled': config.get('enabled', True),
+            'frame_interval': cfg.frame_interval,
+            'risk_level': cfg.risk_level,
+            'enabled': cfg.enabled,
             'last_process_time': last_time,
-            'time_since_last_process': current_time - last_time,
-            'next_process_in': max(0, config.get('frame_interval', 2.0) - (current_time - last_time))
+            'time_since_last_process': since,
+            'next_process_in': max(0, cfg.frame_interval - since)
         }
     
     def get_all_stats(self) -> Dict[str, Any]:
         """获取所有流的统计信息"""
+        # 取一次快照，遍历期间配置被替换也不受影响
+        configs = self.stream_configs
         stats = {
-            'total_streams': len(self.stream_configs),
-            'active_streams': len([s for s in self.stream_configs.values() if s.get('enabled', True)]),
+            'total_streams': len(configs),
+            'active_streams': sum(1 for cfg in configs.values() if cfg.enabled),
             'streams': {}
         }
         
-        for stream_id in self.stream_configs.keys():
+        for stream_id in configs:
             stats['streams'][stream_id] = self.get_stream_stats(stream_id)
         
         return stats
     
     def reset_stream_timer(self, stream_id: str):
         """重置流的计时器"""
-        if stream_id in self.last_process_time:
-            self.last_process_time[stream_id] = 0
-            self.logger.info(f"重置流 {stream_id} 计时器")
+        gate = self._gates.get(stream_id)
+        if gate is None:
+            return
+        gate.timer.last_ns = 0
+        self.logger.info(f"重置流 {stream_id} 计时器")
     
     def remove_stream(self, stream_id: str):
         """移除流配置"""
-        if stream_id in self.stream_configs:
-            del self.stream_configs[stream_id]
-        if stream_id in self.last_process_time:
-            del self.last_process_time[stream_id]
+        with self._lock:
+            self._publish_config(stream_id, None)
         self.logger.info(f"移除流 {stream_id} 配置")
 
-    def should_process(self, stream_id: str, frame=None, current_time: float = None) -> bool:
-        """兼容旧接口: 直接代理到 should_process_frame，仅保留签名以避免调用错误"""
-        return self.should_process_frame(stream_id, current_time)
+    def should_process(self, stream_id: str, frame=None, now_ns: int = None) -> bool:
+        """兼容旧接口: 直接代理到 should_process_frame；第三个参数原为 current_time 浮点秒，现须为整数纳秒"""
+        return self.should_process_frame(stream_id, now_ns=now_ns)
 
     def get_stream_config(self, stream_id: str) -> Dict[str, Any]:
         """兼容旧接口: 返回流的配置字典，如果不存在则返回空 dict"""
-        return self.stream_configs.get(stream_id, {}).copy()
+        cfg = self.stream_configs.get(stream_id)
+        return cfg._asdict() if cfg else {}
 
 class AdaptiveFrameFilter(FrameFilter):
     """自适应帧过滤器 - 根据风险等级动态调整"""
@@ -195,14 +244,14 @@ class AdaptiveFrameFilter(FrameFilter):
     
     def update_risk_level(self, stream_id: str, risk_level: str):
         """动态更新流的风险等级"""
-        if stream_id in self.stream_configs:
-            old_interval = self.stream_configs[stream_id].get('frame_interval', 2.0)
-            new_interval = self.risk_intervals.get(risk_level, 2.0)
-            
-            self.stream_configs[stream_id]['risk_level'] = risk_level
-            self.stream_configs[stream_id]['frame_interval'] = new_interval
-            
-            self.logger.info(f"更新流 {stream_id} 风险等级: {risk_level}, 间隔: {old_interval}s -> {new_interval}s")
+        new_interval = self.risk_intervals.get(risk_level, 2.0)
+        with self._lock:
+            cfg = self.stream_configs.get(stream_id)
+            if cfg is None:
+                return
+            self._publish_config(stream_id, cfg._replace(risk_level=risk_level, frame_interval=new_interval))
+        
+        self.logger.info(f"更新流 {stream_id} 风险等级: {risk_level}, 间隔: {cfg.frame_interval}s -> {new_interval}s")
     
     def get_risk_intervals(self) -> Dict[str, float]:
         """获取风险等级间隔配置"""
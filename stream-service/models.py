@@ -16,7 +16,9 @@ from sqlalchemy import (
     DateTime,
     Integer,
     create_engine,
+    event,
 )
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 
@@ -75,7 +77,25 @@ def init_engine(db_path: str | None = None):
         db_path = os.path.join(os.path.dirname(__file__), "streams.db")
 
     connect_str = f"sqlite:///{db_path}"
-    engine = create_engine(connect_str, connect_args={"check_same_thread": False})
+    # 文件库在 SQLAlchemy 1.4 下默认 NullPool，每个会话都重新打开文件；改为连接池复用
+    engine = create_engine(
+        connect_str,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=8,
+        max_overflow=8,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _record):
+        # WAL + NORMAL：提交时不再同步刷回滚日志，读写互不阻塞
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
     Base.metadata.create_all(engine)
     session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
     Session = scoped_session(session_factory)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享内存帧槽池 - Shared Frame Pool
+与检测服务部署在同一主机时，原始帧写入共享内存槽位，HTTP 请求只携带槽位位置，
+省去 JPEG 编码/解码与请求体传输。
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 帧槽池共享内存段的命名前缀；检测服务只 attach 该前缀的段（detection processing.shm_name_prefix）
+SHM_NAME_PREFIX = 'shipin_frames_'
+
+
+class SharedFramePool:
+    """固定大小的共享内存帧槽池
+
+    只有本进程写入，槽位分配用进程内队列即可；一个槽位从 acquire 到 release 的生命周期
+    覆盖整个同步 HTTP 请求，检测服务在返回响应前读完该槽位，因此无需跨进程的就绪标志。
+    请求超时或连接出错时检测服务可能仍在读取该槽位，调用方改用 quarantine 暂扣槽位，
+    到期后才重新分配。
+    """
+
+    # 超时请求的槽位暂扣时长（秒），应大于检测服务单帧推理的最长耗时
+    QUARANTINE_SECONDS = 60.0
+
+    def __init__(self, slots: int = 32, slot_bytes: int = 1920 * 1080 * 3):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        name = f"{SHM_NAME_PREFIX}{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=slots * slot_bytes)
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for idx in range(slots):
+            self._free.put(idx)
+        self._quarantined = []  # (到期 monotonic 时间, 槽位号)
+        self._quarantine_lock = threading.Lock()
+        logger.info(f"创建共享内存帧槽池 {self.shm.name}: {slots} x {slot_bytes} 字节")
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def acquire(self, frame: np.ndarray) -> Optional[Tuple[int, int]]:
+        """将帧拷入空闲槽位，返回 (槽位号, 字节偏移)；帧过大或无空闲槽位时返回 None"""
+        if frame.nbytes > self.slot_bytes:
+            return None
+        if self._quarantined:
+            self._reclaim_quarantined()
+        try:
+            idx = self._free.get_nowait()
+        except queue.Empty:
+            return None
+        offset = idx * self.slot_bytes
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf, offset=offset)
+        np.copyto(view, frame)
+        return idx, offset
+
+    def release(self, idx: int):
+        """归还槽位"""
+        self._free.put(idx)
+
+    def quarantine(self, idx: int):
+        """暂扣槽位: 对端可能仍在读取，QUARANTINE_SECONDS 后才归还"""
+        with self._quarantine_lock:
+            self._quarantined.append((time.monotonic() + self.QUARANTINE_SECONDS, idx))
+        logger.warning(f"帧槽位 {idx} 请求未正常结束，暂扣 {self.QUARANTINE_SECONDS:.0f} 秒")
+
+    def _reclaim_quarantined(self):
+        """归还已到期的暂扣槽位"""
+        now = time.monotonic()
+        with self._quarantine_lock:
+            expired = [idx for deadline, idx in self._quarantined if deadline <= now]
+            if not expired:
+                return
+            self._quarantined = [(d, idx) for d, idx in self._quarantined if d > now]
+        for idx in expired:
+            self._free.put(idx)
+
+    def close(self):
+        """关闭并删除共享内存段"""
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
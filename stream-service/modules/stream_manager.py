@@ -8,17 +8,41 @@ import asyncio
 import logging
 import time
 import uuid
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import threading
 import queue
+from collections import deque
+from itertools import islice
 import cv2
 from concurrent.futures import ThreadPoolExecutor
 import importlib.util, os, sys
 
+# 可选: ffmpegcv 解码后端（支持 NVDEC 硬件解码），未安装时回退到 OpenCV
+try:
+    import ffmpegcv
+    FFMPEGCV_AVAILABLE = True
+except ImportError:
+    ffmpegcv = None
+    FFMPEGCV_AVAILABLE = False
+
+# 可选: PyAV，用于只解码关键帧的长间隔抽帧
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    av = None
+    PYAV_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# 抽帧间隔覆盖的帧数达到该值时才启用关键帧解码（典型 GOP 为 12~30 帧）
+KEYFRAME_MIN_SPAN = 8
+
+# Python 3.10+ 的 dataclass 支持 slots：实例不带 __dict__，属性访问为固定偏移
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
 class StreamStatus(Enum):
     """流状态枚举"""
     STOPPED = "stopped"
@@ -35,7 +59,7 @@ class StreamType(Enum):
     FILE = "file"
     CAMERA = "camera"
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class StreamInfo:
     """流信息数据类"""
     stream_id: str
@@ -52,6 +76,7 @@ class StreamInfo:
     frame_count: int = 0
     last_frame_time: Optional[float] = None
     process: Optional[Any] = None  # 占位，用于兼容进程/线程句柄
+    last_sent_ns: int = 0  # 帧调度器最近一次提交该流帧的 time.monotonic_ns()，0 表示尚未发送
     # 新增: 保存任意运行时配置，默认空字典
     config: Dict[str, Any] = field(default_factory=dict)
 
@@ -62,7 +87,8 @@ class StreamInfo:
 class StreamWorker:
     """流处理工作器"""
     
-    def __init__(self, stream_info: StreamInfo, frame_callback=None, frame_filter=None):
+    def __init__(self, stream_info: StreamInfo, frame_callback=None, frame_filter=None,
+                 decoder: str = 'opencv', status_callback=None):
         default_filter = None
         if frame_filter is None:
             # 尝试动态加载 filters/frame_filter.py（位于上级目录）
@@ -90,6 +116,10 @@ class StreamWorker:
 
         self.stream_info = stream_info
         self.frame_callback = frame_callback
+        # 状态变更回调 (stream_id, StreamStatus)，由 StreamManager 注入用于推送变更通知
+        self.status_callback = status_callback
+        # 解码后端: opencv / ffmpegcv / nvdec
+        self.decoder = decoder
         self.is_running = False
         self.capture = None
         self.thread = None
@@ -122,67 +152,138 @@ class StreamWorker:
     def _process_stream(self):
         """处理视频流的主循环"""
         try:
-            # 根据流类型初始化捕获器
-            if self.stream_info.stream_type == StreamType.CAMERA:
-                self.capture = cv2.VideoCapture(int(self.stream_info.url))
-            else:
-                self.capture = cv2.VideoCapture(self.stream_info.url)
+            # 根据流类型与解码后端初始化捕获器
+            self.capture = self._open_capture()
             
             if not self.capture.isOpened():
                 raise Exception(f"无法打开视频流: {self.stream_info.url}")
             
-            self.stream_info.status = StreamStatus.RUNNING
-            last_process_time = 0
+            self._set_status(StreamStatus.RUNNING)
+            stream_id = self.stream_info.stream_id
+            # 下一次抽帧的截止时间，处理一帧后再按间隔推进，循环内只需一次比较
+            next_due = 0.0
+            # ffmpegcv 等后端没有 grab()，此时退化为逐帧 read()
+            grab = getattr(self.capture, 'grab', None)
+            # 实时流的 read() 本身按源帧率阻塞，无需额外休眠；本地文件按源 FPS 定时，避免空转读完整个文件
+            frame_period = self._file_frame_period()
+            next_frame_at = time.time()
             
             while self.is_running:
-                ret, frame = self.capture.read()
+                # 根据间隔决定是否处理帧
+                due = time.time() >= next_due
+                
+                # 未到抽帧时间的帧只 grab() 推进解码位置，跳过 retrieve 的像素转换与拷贝
+                if due or grab is None:
+                    ret, frame = self.capture.read()
+                else:
+                    ret, frame = grab(), None
                 if not ret:
-                    logger.warning(f"[{self.stream_info.stream_id}] read frame failed")
+                    logger.warning(f"[{stream_id}] read frame failed")
                     time.sleep(0.1)
                     continue
                 
-                logger.debug(f"[{self.stream_info.stream_id}] read ok")
+                logger.debug("[%s] read ok", stream_id)
                 
                 current_time = time.time()
                 self.stream_info.frame_count += 1
                 self.stream_info.last_frame_time = current_time
                 
-                # 根据间隔决定是否处理帧
-                if current_time - last_process_time >= self.stream_info.interval:
+                if due:
                     try:
                         # 将帧放入队列
                         if not self.frame_queue.full():
                             self.frame_queue.put({
                                 'frame': frame,
                                 'timestamp': current_time,
-                                'stream_id': self.stream_info.stream_id
+                                'stream_id': stream_id
                             }, block=False)
                         
                         # 调用回调函数
                         if self.frame_callback:
-                            self.frame_callback(frame, self.stream_info.stream_id, current_time)
+                            self.frame_callback(frame, stream_id, current_time)
                         
-                        last_process_time = current_time
+                        next_due = current_time + self.stream_info.interval
                         
-                        if self.frame_filter.should_process(self.stream_info.stream_id, frame):
-                            logger.debug(f"[{self.stream_info.stream_id}] enqueue to detection")
+                        if self.frame_filter.should_process(stream_id, frame):
+                            logger.debug("[%s] enqueue to detection", stream_id)
                         else:
-                            logger.debug(f"[{self.stream_info.stream_id}] filtered")
+                            logger.debug("[%s] filtered", stream_id)
                         
                     except Exception as e:
                         logger.error(f"处理帧异常: {e}")
                 
-                # 控制帧率
-                time.sleep(0.033)  # 约30fps
+                # 控制帧率: 按截止时间休眠，扣除解码与回调耗时
+                if frame_period:
+                    next_frame_at += frame_period
+                    delay = next_frame_at - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_frame_at = time.time()
                 
         except Exception as e:
             logger.error(f"流处理异常: {e}")
-            self.stream_info.status = StreamStatus.ERROR
             self.stream_info.error_message = str(e)
+            self._set_status(StreamStatus.ERROR)
         finally:
             if self.capture:
                 self.capture.release()
 
+    def _set_status(self, status: StreamStatus):
+        self.stream_info.status = status
+        if self.status_callback:
+            self.status_callback(self.stream_info.stream_id, status)
+
+    def _file_frame_period(self) -> float:
+        """本地文件按源帧率回放的帧间隔（秒）；实时流返回 0 表示不休眠"""
+        if self.stream_info.stream_type != StreamType.FILE:
+            return 0.0
+        if isinstance(self.capture, _KeyframeCapture):
+            # 关键帧捕获器按 pts 自行定时
+            return 0.0
+        fps = 0.0
+        try:
+            fps = float(self.capture.get(cv2.CAP_PROP_FPS) or 0)
+        except Exception:
+            # ffmpegcv 捕获器通过 fps 属性暴露帧率
+            fps = float(getattr(self.capture, 'fps', 0) or 0)
+        return 1.0 / fps if fps > 0 else 0.033
+
+    def _open_capture(self):
+        """打开视频源：优先使用配置的 ffmpegcv/NVDEC 后端，失败或不可用时回退到 OpenCV"""
+        url = self.stream_info.url
+        stream_type = self.stream_info.stream_type
+
+        if self.decoder == 'keyframe' and stream_type == StreamType.FILE:
+            if PYAV_AVAILABLE:
+                try:
+                    capture = _KeyframeCapture(url)
+                    if capture.fps * self.stream_info.interval >= KEYFRAME_MIN_SPAN:
+                        return capture
+                    capture.release()
+                except Exception as e:
+                    logger.warning(f"[{self.stream_info.stream_id}] PyAV 打开失败，回退到 OpenCV: {e}")
+            else:
+                logger.warning(f"[{self.stream_info.stream_id}] PyAV 未安装，回退到 OpenCV 解码")
+
+        if self.decoder in ('ffmpegcv', 'nvdec') and stream_type != StreamType.CAMERA:
+            if FFMPEGCV_AVAILABLE:
+                try:
+                    if stream_type == StreamType.FILE:
+                        if self.decoder == 'nvdec':
+                            # NVDEC 硬件解码，释放 CPU 解码开销
+                            return ffmpegcv.VideoCaptureNV(url)
+                        return ffmpegcv.VideoCapture(url)
+                    return ffmpegcv.VideoCaptureStream(url)
+                except Exception as e:
+                    logger.warning(f"[{self.stream_info.stream_id}] ffmpegcv 打开失败，回退到 OpenCV: {e}")
+            else:
+                logger.warning(f"[{self.stream_info.stream_id}] ffmpegcv 未安装，回退到 OpenCV 解码")
+
+        if stream_type == StreamType.CAMERA:
+            return cv2.VideoCapture(int(url))
+        return cv2.VideoCapture(url)
+
     def _create_dummy_filter(self):
         """创建一个最小实现，避免因缺失 filter 而报错"""
         class _Dummy:
@@ -194,16 +295,105 @@ class StreamWorker:
 
         return _Dummy()
 
+class _KeyframeCapture:
+    """基于 PyAV 的关键帧捕获器（skip_frame=NONKEY），提供与 cv2.VideoCapture 兼容的最小接口
+
+    抽帧间隔大于 GOP 时，中间的非关键帧无需解码；按 pts 以源时间轴回放。
+    """
+
+    def __init__(self, url: str):
+        self.container = av.open(url)
+        self.stream = self.container.streams.video[0]
+        self.stream.codec_context.skip_frame = 'NONKEY'
+        self.fps = float(self.stream.average_rate or 0)
+        self._frames = self.container.decode(self.stream)
+        self._start_wall = None
+        self._start_pts = None
+
+    def isOpened(self) -> bool:
+        return self.container is not None
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0
+
+    def read(self):
+        try:
+            frame = next(self._frames)
+        except Exception:  # StopIteration 或 PyAV 解码错误
+            return False, None
+        # 按关键帧 pts 定时，保持与原视频一致的时间轴
+        if frame.time is not None:
+            if self._start_wall is None:
+                self._start_wall, self._start_pts = time.time(), frame.time
+            delay = (frame.time - self._start_pts) - (time.time() - self._start_wall)
+            if delay > 0:
+                time.sleep(delay)
+        return True, frame.to_ndarray(format='bgr24')
+
+    def release(self):
+        if self.container is not None:
+            self.container.close()
+            self.container = None
+
 class StreamManager:
     """流管理器主类"""
     
-    def __init__(self, max_concurrent_streams: int = 10):
+    def __init__(self, max_concurrent_streams: int = 10, decoder: str = 'opencv'):
         self.streams: Dict[str, StreamInfo] = {}
         self.workers: Dict[str, StreamWorker] = {}
         self.max_concurrent_streams = max_concurrent_streams
+        self.decoder = decoder
         self.executor = ThreadPoolExecutor(max_workers=max_concurrent_streams)
         self._lock = threading.Lock()
+        # 状态变更通知: 版本号单调递增，变更日志供订阅方按版本取增量
+        self._status_cond = threading.Condition()
+        self._status_version = 0
+        self._status_log = deque(maxlen=1024)  # (版本, stream_id, StreamStatus 或 None 表示已删除)
+        self._status_listeners: List[Callable[[], None]] = []
         
+    def add_status_listener(self, callback: Callable[[], None]):
+        """注册状态变更回调（在变更线程中同步调用，回调应当轻量，例如 Event.set）"""
+        self._status_listeners.append(callback)
+    
+    def _notify_status(self, stream_id: str, status: Optional[StreamStatus]):
+        """记录一次状态变更并唤醒等待中的订阅方"""
+        with self._status_cond:
+            self._status_version += 1
+            self._status_log.append((self._status_version, stream_id, status))
+            self._status_cond.notify_all()
+        for callback in self._status_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"状态变更回调失败: {e}")
+    
+    @property
+    def status_version(self) -> int:
+        return self._status_version
+    
+    def wait_status_changes(self, since_version: int, timeout: float
+                            ) -> Tuple[int, Optional[Dict[str, Optional[StreamStatus]]]]:
+        """阻塞至 since_version 之后出现状态变更或超时
+
+        返回 (当前版本, {stream_id: 最新状态})；超时返回空字典。订阅方落后过多、
+        变更日志已被覆盖时返回 None，调用方应改用全量快照。
+        """
+        with self._status_cond:
+            self._status_cond.wait_for(lambda: self._status_version > since_version, timeout)
+            version = self._status_version
+            if version == since_version:
+                return version, {}
+            if not self._status_log or self._status_log[0][0] > since_version + 1:
+                return version, None
+            # 版本号连续，从队尾倒取 version - since_version 条，只遍历新增的变更
+            recent = list(islice(reversed(self._status_log), version - since_version))
+            changes = {}
+            for _, stream_id, status in reversed(recent):
+                changes[stream_id] = status
+            return version, changes
+    
     def add_stream(self, stream_config: Dict[str, Any]) -> str:
         """添加新的视频流"""
         try:
@@ -277,6 +467,7 @@ class StreamManager:
                 # 删除流信息
                 del self.streams[stream_id]
             
+            self._notify_status(stream_id, None)
             logger.info(f"删除视频流: {stream_id}")
             return True
             
@@ -304,15 +495,21 @@ class StreamManager:
                     global_filter = None
 
                 # 创建并启动工作器
-                worker = StreamWorker(stream_info, frame_callback, frame_filter=global_filter)
+                worker = StreamWorker(stream_info, frame_callback, frame_filter=global_filter,
+                                      decoder=self.decoder, status_callback=self._notify_status)
+                # 先置为 STARTING 再启动线程，避免覆盖工作线程随后写入的 RUNNING
+                previous_status = stream_info.status
+                stream_info.status = StreamStatus.STARTING
+                self._notify_status(stream_id, StreamStatus.STARTING)
                 if worker.start():
                     self.workers[stream_id] = worker
-                    stream_info.status = StreamStatus.STARTING
                     stream_info.updated_at = time.time()
                     
                     logger.info(f"启动视频流: {stream_id}")
                     return True
                 else:
+                    stream_info.status = previous_status
+                    self._notify_status(stream_id, previous_status)
                     return False
                     
         except Exception as e:
@@ -336,6 +533,7 @@ class StreamManager:
                 stream_info.status = StreamStatus.STOPPED
                 stream_info.updated_at = time.time()
             
+            self._notify_status(stream_id, StreamStatus.STOPPED)
             logger.info(f"停止视频流: {stream_id}")
             return True
             
@@ -351,6 +549,11 @@ class StreamManager:
         """获取所有流信息"""
         return list(self.streams.values())
     
+    def snapshot_statuses(self) -> Dict[str, str]:
+        """一次性取出所有流的状态值 {stream_id: status.value}"""
+        with self._lock:
+            return {sid: info.status.value for sid, info in self.streams.items()}
+    
     def get_stream_status(self, stream_id: str) -> Optional[StreamStatus]:
         """获取流状态"""
         stream_info = self.streams.get(stream_id)
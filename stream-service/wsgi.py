@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视频流服务 WSGI 入口 - 供 gunicorn 部署
+
+    gunicorn -w 1 -k gthread --threads 64 -b 0.0.0.0:8081 wsgi:app
+
+说明:
+- 只能使用单个 worker：流采集线程、帧处理循环与状态变更日志都在进程内，多 worker 会重复拉流。
+- 使用 gthread 而非 gevent：采集线程在 cv2.VideoCapture.read() 等 C 调用中阻塞，
+  gevent 打补丁后会把这些线程变为协程并卡住整个事件循环。SSE 长连接各占一个线程，
+  阻塞在 Condition.wait 上不占 CPU，按并发浏览器数量调整 --threads 即可。
+- 配置文件路径可通过环境变量 STREAM_CONFIG 指定。
+"""
+
+import os
+
+from app import StreamService
+
+service = StreamService(os.environ.get('STREAM_CONFIG', 'config/stream_config.json'))
+app = service.app
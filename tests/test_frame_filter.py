@@ -0,0 +1,97 @@
+import importlib.util
+import os
+import sys
+
+# Provide dummy modules for optional dependencies
+sys.modules.setdefault('cv2', type('cv2', (), {})())
+
+spec = importlib.util.spec_from_file_location(
+    'frame_filter',
+    os.path.join(os.path.dirname(__file__), '../stream-service/filters/frame_filter.py'),
+)
+frame_filter = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(frame_filter)
+AdaptiveFrameFilter = frame_filter.AdaptiveFrameFilter
+
+SECOND = 1_000_000_000
+
+
+def test_interval_gating():
+    ff = AdaptiveFrameFilter()
+    ff.configure_stream('cam1', {'frame_interval': 2.0})
+    start = 100 * SECOND
+
+    assert ff.should_process_frame('cam1', now_ns=start) is True
+    assert ff.should_process_frame('cam1', now_ns=start + SECOND) is False
+    assert ff.should_process_frame('cam1', now_ns=start + 2 * SECOND) is True
+
+    ff.reset_stream_timer('cam1')
+    assert ff.should_process_frame('cam1', now_ns=start + 2 * SECOND + 1) is True
+
+
+def test_disabled_and_unknown_streams_are_skipped():
+    ff = AdaptiveFrameFilter()
+    ff.configure_stream('cam1', {'frame_interval': 1.0, 'enabled': False})
+
+    assert ff.should_process_frame('cam1', now_ns=10 * SECOND) is False
+    assert ff.should_process_frame('missing', now_ns=10 * SECOND) is False
+
+
+def test_configure_and_remove_many_streams():
+    ff = AdaptiveFrameFilter()
+    now = 100 * SECOND
+    for i in range(200):
+        ff.configure_stream(f'cam{i}', {'frame_interval': 1.0})
+    assert all(ff.should_process_frame(f'cam{i}', now_ns=now) for i in range(200))
+
+    for i in range(0, 200, 2):
+        ff.remove_stream(f'cam{i}')
+    assert ff.get_all_stats()['total_streams'] == 100
+    assert ff.should_process_frame('cam0', now_ns=now + 2 * SECOND) is False
+
+    # Re-added streams start fresh; reconfiguring keeps the last processed time
+    ff.configure_stream('cam0', {'frame_interval': 1.0})
+    ff.configure_stream('cam1', {'frame_interval': 5.0})
+    assert ff.should_process_frame('cam0', now_ns=now) is True
+    assert ff.should_process_frame('cam1', now_ns=now + 2 * SECOND) is False
+
+
+def test_risk_level_updates_interval():
+    ff = AdaptiveFrameFilter()
+    ff.configure_stream('cam1', {'risk_level': 'HIGH'})
+    assert ff.get_stream_config('cam1')['frame_interval'] == 0.5
+
+    ff.update_risk_level('cam1', 'LOW')
+    start = 100 * SECOND
+    assert ff.should_process_frame('cam1', now_ns=start) is True
+    assert ff.should_process_frame('cam1', now_ns=start + 4 * SECOND) is False
+    assert ff.should_process_frame('cam1', now_ns=start + 5 * SECOND) is True
+
+
+def test_reader_does_not_block_on_writer_lock():
+    ff = AdaptiveFrameFilter()
+    ff.configure_stream('cam1', {'frame_interval': 1.0})
+
+    # Readers only see the published snapshot, so a held writer lock must not block them
+    with ff._lock:
+        assert ff.should_process_frame('cam1', now_ns=10 * SECOND) is True
+        assert ff.should_process_frame('cam1', now_ns=10 * SECOND + 1) is False
+
+
+def test_now_ns_positional_and_float_rejected():
+    ff = AdaptiveFrameFilter()
+    ff.configure_stream('cam1', {'frame_interval': 1.0})
+
+    assert ff.should_process_frame('cam1', 10 * SECOND) is True
+    assert ff.should_process('cam1', None, 10 * SECOND + 1) is False
+    assert ff.should_process('cam1', None, 11 * SECOND) is True
+
+    # Legacy callers passing time.time() float seconds get an explicit error
+    for call in (lambda: ff.should_process_frame('cam1', 12.0),
+                 lambda: ff.should_process('cam1', None, 12.0)):
+        try:
+            call()
+        except TypeError:
+            pass
+        else:
+            raise AssertionError('float timestamp should be rejected')
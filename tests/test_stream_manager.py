@@ -20,3 +20,15 @@ def test_risk_level_mapping():
     stream_id = manager.add_stream({'name': 'cam1', 'url': 'rtsp://example', 'type': 'rtsp', 'risk_level': '高'})
     stream = manager.get_stream(stream_id)
     assert stream.risk_level == 'high'
+
+
+def test_status_change_notifications():
+    manager = StreamManager(max_concurrent_streams=1)
+    stream_id = manager.add_stream({'name': 'cam1', 'url': 'rtsp://example', 'type': 'rtsp'})
+    version = manager.status_version
+
+    assert manager.wait_status_changes(version, timeout=0.01) == (version, {})
+
+    manager.stop_stream(stream_id)
+    version, changes = manager.wait_status_changes(version, timeout=0.01)
+    assert changes == {stream_id: stream_manager.StreamStatus.STOPPED}